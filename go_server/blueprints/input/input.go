@@ -19,6 +19,7 @@ func AddHandleFunc() {
 	Utils.CreateHandleFunc(prePath+"/apply_pcaDB/", handleApplyPCADB)
 	Utils.CreateHandleFunc(prePath+"/compute_correlationsDB/", handleComputeCorrelationsDB)
 	Utils.CreateHandleFunc(prePath+"/compute_spearmanDB/", handleComputeSpearmanDB)
+	Utils.CreateHandleFunc(prePath+"/prune_correlated_columns_DB/", handlePruneCorrelatedColumnsDB)
 	Utils.CreateHandleFunc(prePath+"/create_tags/", handleCreateTags)
 	Utils.CreateHandleFunc(prePath+"/handle_pkl/", handlePKL)
 	Utils.CreateHandleFunc(prePath+"/delete_columns/", deleteColumns)
@@ -133,6 +134,18 @@ func handleComputeSpearmanDB(jsonConfig string, id string) (string, error) {
 	return response, nil
 }
 
+// handlePruneCorrelatedColumnsDB handles the request to prune the columns correlated with another column
+// It returns the response from the python script
+func handlePruneCorrelatedColumnsDB(jsonConfig string, id string) (string, error) {
+	log.Println("Prune correlated columns", id)
+	response, err := Utils.StartPythonScripts(jsonConfig, "../pythonCode/modules/input/prune_correlated_columnsDB.py", id)
+	Utils.RemoveIdFromScripts(id)
+	if err != nil {
+		return "", err
+	}
+	return response, nil
+}
+
 // handleProgress handles the request to get the progress of the experiment
 // It returns the progress of the experiment
 func handleProgress(jsonConfig string, id string) (string, error) {
@@ -4,24 +4,39 @@ import (
 	"bufio"
 	"bytes"
 	"encoding/json"
+	"errors"
 	"io"
 	"log"
+	"net"
 	"net/http"
 	"os"
 	"os/exec"
 	"path/filepath"
+	"strconv"
 	"strings"
 	"sync"
 )
 
 type ScriptInfo struct {
 	Cmd      *exec.Cmd
+	Conn     net.Conn // set instead of Cmd when the script runs in the python worker
+	Pid      int      // pid of the process forked by the python worker for the script
 	Progress string
 }
 
 var Mu sync.Mutex // guards balance
 var Scripts = make(map[string]ScriptInfo)
 
+// maxArgvJsonParamSize is the size above which the json params are sent on stdin instead of the command line
+const maxArgvJsonParamSize = 16 * 1024
+
+// maxOutputLineSize is the maximum size of a line printed by a python script (response chunks are 1MB)
+const maxOutputLineSize = 16 * 1024 * 1024
+
+var pythonWorkerOnce sync.Once
+var pythonWorkerAddress string
+var pythonWorkerErr error
+
 // RequestData is the data sent in the request
 type RequestData struct {
 	Message string `json:"message"`
@@ -163,6 +178,17 @@ func StartPythonScripts(jsonParam string, filename string, id string) (string, e
 	}
 	log.Println("Conda env: " + condaEnv)
 
+	if GetDotEnvVariable("PYTHON_WORKER") == "1" {
+		Mu.Unlock()
+		response, err := runScriptInWorker(condaEnv, script, jsonParam, id)
+		if err == nil {
+			log.Println("Finished running script in python worker: " + filename + " with id: " + id)
+			return response, nil
+		}
+		log.Println("Python worker unavailable, starting a new process: " + err.Error())
+		Mu.Lock()
+	}
+
 	// UNCOMMENT TO WRITE JSON PARAM TO FILE FOR DEBUGGING
 	// jsonParamBytes := []byte(jsonParam)
 	// err = os.WriteFile("jsonParam.txt", jsonParamBytes, 0644)
@@ -171,8 +197,16 @@ func StartPythonScripts(jsonParam string, filename string, id string) (string, e
 	// 	return "", err
 	// }
 
+	var cmd *exec.Cmd
+	if len(jsonParam) > maxArgvJsonParamSize {
+		// Big payloads would exceed the command line length limit, they are streamed on stdin instead
+		cmd = exec.Command(condaEnv, "-u", script, "--json-param-file", "-", "--id", id)
+		cmd.Stdin = strings.NewReader(jsonParam)
+	} else {
+		cmd = exec.Command(condaEnv, "-u", script, "--json-param", jsonParam, "--id", id)
+	}
 	Scripts[id] = ScriptInfo{
-		Cmd:      exec.Command(condaEnv, "-u", script, "--json-param", jsonParam, "--id", id),
+		Cmd:      cmd,
 		Progress: "",
 	}
 	stdout, err := Scripts[id].Cmd.StdoutPipe()
@@ -196,8 +230,18 @@ func StartPythonScripts(jsonParam string, filename string, id string) (string, e
 		return "", err
 	}
 	response := ""
-	go copyOutput(stdout, &response)
-	go copyOutput(stderr, &response)
+	// The outputs must be fully read before waiting for the command, Wait closes the pipes
+	var outputWg sync.WaitGroup
+	outputWg.Add(2)
+	go func() {
+		defer outputWg.Done()
+		copyOutput(stdout, &response)
+	}()
+	go func() {
+		defer outputWg.Done()
+		copyOutput(stderr, &response)
+	}()
+	outputWg.Wait()
 	err = Scripts[id].Cmd.Wait()
 	if err != nil {
 		log.Println("Error waiting for command to finish")
@@ -207,13 +251,110 @@ func StartPythonScripts(jsonParam string, filename string, id string) (string, e
 	return response, nil
 }
 
+// getPythonWorkerAddress starts the warm python worker on first use and returns its address
+func getPythonWorkerAddress(condaEnv string, script string) (string, error) {
+	pythonWorkerOnce.Do(func() {
+		index := strings.LastIndex(script, "pythonCode")
+		if index == -1 {
+			pythonWorkerErr = errors.New("could not locate the pythonCode folder from " + script)
+			return
+		}
+		workerScript := filepath.Join(script[:index+len("pythonCode")], "med_libs", "go_worker.py")
+		cmd := exec.Command(condaEnv, "-u", workerScript, "--port", "0")
+		stdout, err := cmd.StdoutPipe()
+		if err != nil {
+			pythonWorkerErr = err
+			return
+		}
+		cmd.Stderr = os.Stderr
+		err = cmd.Start()
+		if err != nil {
+			pythonWorkerErr = err
+			return
+		}
+		log.Println("Started python worker: " + workerScript)
+		scanner := bufio.NewScanner(stdout)
+		for scanner.Scan() {
+			lineText := scanner.Text()
+			if strings.Contains(lineText, "worker-ready*_*") {
+				port := strings.Split(lineText, "*_*")[1]
+				pythonWorkerAddress = "127.0.0.1:" + strings.TrimSuffix(port, "\"")
+				break
+			}
+			log.Println("Python worker: " + lineText)
+		}
+		if pythonWorkerAddress == "" {
+			pythonWorkerErr = errors.New("the python worker exited before being ready")
+			return
+		}
+		go func() {
+			for scanner.Scan() {
+				log.Println("Python worker: " + scanner.Text())
+			}
+		}()
+	})
+	return pythonWorkerAddress, pythonWorkerErr
+}
+
+// runScriptInWorker runs the python script in the warm python worker
+// The job output is streamed back on the connection and parsed like the output of a spawned script
+func runScriptInWorker(condaEnv string, script string, jsonParam string, id string) (string, error) {
+	address, err := getPythonWorkerAddress(condaEnv, script)
+	if err != nil {
+		return "", err
+	}
+	conn, err := net.Dial("tcp", address)
+	if err != nil {
+		return "", err
+	}
+	defer conn.Close()
+	request, err := json.Marshal(map[string]string{"script": script, "json_param": jsonParam, "id": id})
+	if err != nil {
+		return "", err
+	}
+	_, err = conn.Write(append(request, '\n'))
+	if err != nil {
+		return "", err
+	}
+	Mu.Lock()
+	Scripts[id] = ScriptInfo{
+		Conn:     conn,
+		Progress: "",
+	}
+	Mu.Unlock()
+	response := ""
+	copyOutput(conn, &response)
+	return response, nil
+}
+
 // It is used to transfer stdout and stderr to the terminal
+// The response is either streamed in chunks tagged with the job id or written in a file whose path is sent
 func copyOutput(r io.Reader, response *string) {
 	scanner := bufio.NewScanner(r)
+	scanner.Buffer(make([]byte, 64*1024), maxOutputLineSize)
+	responseChunks := make(map[string]*strings.Builder)
 	lineText := ""
 	for scanner.Scan() {
 		lineText = scanner.Text()
-		if strings.Contains(lineText, "response-ready*_*") {
+		// The frames are searched inside the line, output printed without a newline can precede them
+		if index := strings.Index(lineText, "response-chunk*_*"); index >= 0 {
+			parts := strings.SplitN(lineText[index:], "*_*", 3)
+			if len(parts) < 3 {
+				continue
+			}
+			if responseChunks[parts[1]] == nil {
+				responseChunks[parts[1]] = &strings.Builder{}
+			}
+			responseChunks[parts[1]].WriteString(parts[2])
+		} else if index := strings.Index(lineText, "response-end*_*"); index >= 0 {
+			id := strings.Split(lineText[index:], "*_*")[1]
+			if responseChunks[id] != nil {
+				*response = responseChunks[id].String()
+				delete(responseChunks, id)
+			} else {
+				*response = ""
+			}
+		} else if strings.Contains(lineText, "response-ready*_*") {
 			path := strings.Split(lineText, "*_*")[1]
 			path = path[:len(path)-1]
 			*response = ReadFile(path)
@@ -222,19 +363,36 @@ func copyOutput(r io.Reader, response *string) {
 			if err != nil {
 				log.Println(err)
 			}
+		} else if index := strings.Index(lineText, "worker-pid*_*"); index >= 0 {
+			parts := strings.Split(strings.TrimSuffix(lineText[index:], "\""), "*_*")
+			if len(parts) < 3 {
+				continue
+			}
+			pid, err := strconv.Atoi(parts[2])
+			if err != nil {
+				log.Println("Invalid python worker pid: " + parts[2])
+				continue
+			}
+			Mu.Lock()
+			scriptInfo := Scripts[parts[1]]
+			scriptInfo.Pid = pid
+			Scripts[parts[1]] = scriptInfo
+			Mu.Unlock()
 		} else if strings.Contains(lineText, "progress*_*") {
 			id := strings.Split(lineText, "*_*")[1]
 			progress := strings.Split(lineText, "*_*")[2]
 			progress = progress[:len(progress)-1]
 			log.Println("Progress: " + progress)
 			Mu.Lock()
-			Scripts[id] = ScriptInfo{
-				Cmd:      Scripts[id].Cmd,
-				Progress: progress,
-			}
+			scriptInfo := Scripts[id]
+			scriptInfo.Progress = progress
+			Scripts[id] = scriptInfo
 			Mu.Unlock()
 		}
 	}
+	if err := scanner.Err(); err != nil {
+		log.Println("Error reading script output: " + err.Error())
+	}
 }
 
 // ReadFile reads a file and returns its content as a string
@@ -269,7 +427,7 @@ func RemoveIdFromScripts(id string) {
 func WriteScriptId(data string, id string) error {
 	Mu.Lock()
 	script, ok := Scripts[id]
-	if ok {
+	if ok && script.Cmd != nil {
 		stdin, err := script.Cmd.StdinPipe()
 		if err != nil {
 			return err
@@ -294,7 +452,21 @@ func KillScript(id string) bool {
 				return
 			}
 		}()
-		if script.Cmd != nil { // Check if script.Cmd is not nil
+		if script.Conn != nil { // The script runs in a process forked by the python worker
+			if script.Pid > 0 {
+				process, err := os.FindProcess(script.Pid)
+				if err == nil {
+					err = process.Kill()
+				}
+				if err != nil {
+					log.Print("Error killing python worker job: ", err.Error())
+				}
+			}
+			err := script.Conn.Close()
+			if err != nil {
+				log.Print("Error closing worker connection: ", err.Error())
+			}
+		} else if script.Cmd != nil { // Check if script.Cmd is not nil
 			if script.Cmd.ProcessState != nil && script.Cmd.ProcessState.Exited() {
 				log.Println("Script can be killed")
 				err := script.Cmd.Process.Kill()
@@ -324,9 +496,13 @@ func HandlePanic() {
 func ClearAllScripts() {
 	Mu.Lock()
 	for id, script := range Scripts {
-		err := script.Cmd.Process.Kill()
-		if err != nil {
-			log.Print("Error killing process: ", err.Error())
+		if script.Conn != nil {
+			script.Conn.Close()
+		} else if script.Cmd != nil && script.Cmd.Process != nil {
+			err := script.Cmd.Process.Kill()
+			if err != nil {
+				log.Print("Error killing process: ", err.Error())
+			}
 		}
 		delete(Scripts, id)
 	}
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PYTHON_CODE_PATH = Path(os.path.dirname(os.path.abspath(__file__))).parent
+sys.path.append(str(PYTHON_CODE_PATH))
+
+# Heavy dependencies that a script should only import when it really needs them
+HEAVY_MODULES = ["pandas", "sklearn", "pycaret", "flask", "torch", "transformers", "tsfresh", "dtale", "explainerdashboard"]
+
+
+def find_scripts(modules_path: Path) -> list:
+    """
+    Finds the scripts started from Go, i.e. the python files registering a GoExecutionScript with run_script
+
+    Args:
+        modules_path: The folder containing the scripts
+
+    Returns:
+        The sorted list of the script paths
+    """
+    scripts = []
+    for path in sorted(modules_path.rglob("*.py")):
+        if "__pycache__" in path.parts or path.name == "__init__.py":
+            continue
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            if "run_script(" in f.read():
+                scripts.append(path)
+    return scripts
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Gets the peak resident set size of the current process
+
+    Returns:
+        The peak RSS in MB, None if it can't be measured on this system
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak / (1024.0 ** 2) if sys.platform == "darwin" else peak / 1024.0
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024.0 ** 2)
+    except (ImportError, AttributeError):
+        return None
+
+
+def measure_script(script_path: str) -> dict:
+    """
+    Imports a script the way the python worker does, without running its job, and measures it
+
+    Args:
+        script_path: The path of the script
+
+    Returns:
+        The import time, the peak RSS and the heavy modules loaded by the import
+    """
+    start = time.perf_counter()
+    error = None
+    try:
+        from med_libs.go_worker import load_script
+        load_script(script_path)
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+    import_time = time.perf_counter() - start
+    return {
+        "import_time_s": round(import_time, 4),
+        "peak_rss_mb": get_peak_rss_mb(),
+        "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+        "modules_count": len(sys.modules),
+        "error": error
+    }
+
+
+def run_benchmark(scripts: list, repeat: int = 1) -> list:
+    """
+    Measures every script in a fresh interpreter
+
+    Args:
+        scripts: The script paths
+        repeat: The number of measures of each script, the fastest one is kept
+
+    Returns:
+        The list of the measures of each script
+    """
+    results = []
+    for script in scripts:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            process = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", str(script)],
+                capture_output=True, text=True, cwd=str(PYTHON_CODE_PATH)
+            )
+            wall_time = time.perf_counter() - start
+            try:
+                # The measure is the last line, the script may have printed before
+                measure = json.loads(process.stdout.strip().splitlines()[-1])
+            except (IndexError, ValueError):
+                measure = {"error": process.stderr.strip()[-500:] or "no measure returned"}
+            measure["wall_time_s"] = round(wall_time, 4)
+            if best is None or measure.get("import_time_s", float("inf")) < best.get("import_time_s", float("inf")):
+                best = measure
+        best["script"] = str(Path(script).relative_to(PYTHON_CODE_PATH))
+        results.append(best)
+        print(f"{best['script']}: {best.get('import_time_s')} s, {best.get('peak_rss_mb')} MB", file=sys.stderr)
+    return results
+
+
+def compare_to_baseline(results: list, baseline: list, tolerance: float) -> list:
+    """
+    Compares the measures to the ones of a previous report
+
+    Args:
+        results: The current measures
+        baseline: The measures of the previous report
+        tolerance: The allowed relative increase (e.g. 0.2 for 20%)
+
+    Returns:
+        The list of the regressions found
+    """
+    baseline = {entry["script"]: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        previous = baseline.get(entry["script"])
+        if previous is None:
+            continue
+        for key in ("import_time_s", "peak_rss_mb"):
+            if entry.get(key) is None or previous.get(key) is None:
+                continue
+            if entry[key] > previous[key] * (1 + tolerance):
+                regressions.append({"script": entry["script"], "measure": key, "baseline": previous[key], "current": entry[key]})
+        new_heavy = sorted(set(entry.get("heavy_modules", [])) - set(previous.get("heavy_modules", [])))
+        if new_heavy:
+            regressions.append({"script": entry["script"], "measure": "heavy_modules", "baseline": previous.get("heavy_modules", []), "current": entry.get("heavy_modules", [])})
+    return regressions
+
+
+def main():
+    """
+    Measures the import time and memory of every script under pythonCode/modules
+
+    Description:
+        Each script is imported in a fresh interpreter without running its job (like a job with a no-op config),
+        so the measures only reflect what the script and the med_libs modules import at load time.
+        The report is printed as json or saved with --output. With --baseline, the command fails if an import
+        time or a peak RSS grew by more than --tolerance, or if a script started importing a heavy dependency.
+    """
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of the MEDomics python scripts")
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--filter", type=str, default="", help="Only measure the scripts whose path contains this string")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", type=str, default=None, help="Path of the json report")
+    parser.add_argument("--baseline", type=str, default=None, help="Path of a previous json report to compare to")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(measure_script(args.child)))
+        return
+
+    scripts = [path for path in find_scripts(PYTHON_CODE_PATH / "modules") if args.filter in str(path)]
+    report = {
+        "python": sys.version,
+        "platform": sys.platform,
+        "results": run_benchmark(scripts, args.repeat)
+    }
+    exit_code = 0
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            report["regressions"] = compare_to_baseline(report["results"], json.load(f)["results"], args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PYTHON_CODE_PATH = Path(os.path.dirname(os.path.abspath(__file__))).parent
+sys.path.append(str(PYTHON_CODE_PATH))
+
+from benchmarks.input_ops import (COLLECTION_PREFIX, TableSpec, generate_chunks, get_git_commit, insert_table,
+                                  parse_sizes, use_in_process_mongo)
+
+# Sizes benchmarked by default, as (rows, columns)
+DEFAULT_SIZES = [(100000, 50), (20000, 500)]
+
+
+def get_readers(args) -> dict:
+    """
+    Gets the functions reading a collection as a DataFrame, by name
+
+    Description:
+        "find_list" is the path used before the loader (a list of every document then a DataFrame), the other ones
+        are the loader with one cursor, the parallel reader with each engine and a read of the snapshot.
+    """
+    import pandas as pd
+    from med_libs.dataset_loader import load_dataset
+    from med_libs.mongodb_utils import connect_to_mongo
+    from med_libs.parallel_reader import read_dataset_parallel
+
+    def find_list(collection_name):
+        return pd.DataFrame(list(connect_to_mongo()[collection_name].find({}, {'_id': False})))
+
+    readers = {
+        "find_list": find_list,
+        "loader": lambda name: load_dataset(name, use_cache=False, max_workers=1),
+        "parallel_pandas": lambda name: read_dataset_parallel(name, max_workers=args.workers, engine="pandas"),
+        "parallel_pymongoarrow": lambda name: read_dataset_parallel(name, max_workers=args.workers, engine="pymongoarrow"),
+        "snapshot": load_dataset,
+    }
+    return {name: reader for name, reader in readers.items() if name in args.readers}
+
+
+def measure(reader, collection_name: str, repeat: int, memory: bool) -> dict:
+    """
+    Times a reader, the fastest run is kept
+
+    Returns:
+        The duration, the DataFrame read and its peak memory if measured
+    """
+    best = None
+    df = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = reader(collection_name)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    result = {"seconds": round(best, 4), "df": df}
+    if memory:
+        # Separate run, tracemalloc slows down the allocations
+        tracemalloc.start()
+        reader(collection_name)
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+        tracemalloc.stop()
+    return result
+
+
+def run_size(db, n_rows: int, n_columns: int, readers: dict, args) -> list:
+    """
+    Loads a synthetic table of a size and reads it with every reader
+
+    Returns:
+        The measures of every reader
+    """
+    import pandas as pd
+    name = f"{COLLECTION_PREFIX}read_{n_rows}x{n_columns}"
+    db.drop_collection(name)
+    insert_table(db, name, generate_chunks(TableSpec(n_columns, args.categorical_rate, args.seed), n_rows, args.missing_rate))
+
+    results = []
+    reference = None
+    try:
+        for reader_name, reader in readers.items():
+            entry = {"reader": reader_name, "rows": n_rows, "columns": n_columns}
+            try:
+                if reader_name == "snapshot":
+                    # Saves the snapshot, only its reads are timed
+                    reader(name)
+                result = measure(reader, name, args.repeat, args.memory)
+            except ImportError as e:
+                entry.update(status="skipped", error=str(e))
+                results.append(entry)
+                continue
+            df = result.pop("df")
+            if df is None:
+                entry.update(status="skipped", error="collection too small to be split, see --min-partition-rows")
+                results.append(entry)
+                continue
+            if reference is None:
+                reference = df
+            entry.update(result)
+            entry["status"] = "ok"
+            entry["rows_per_second"] = round(n_rows / result["seconds"], 1) if result["seconds"] else None
+            # Same content as the first reader, the parallel readers sort the rows by _id
+            entry["same_content"] = bool(df.shape == reference.shape and pd.DataFrame.equals(
+                df.reset_index(drop=True), reference[df.columns].reset_index(drop=True)))
+            results.append(entry)
+            print(f"{n_rows}x{n_columns} {reader_name}: {entry['seconds']} s", file=sys.stderr)
+    finally:
+        if not args.keep:
+            db.drop_collection(name)
+    return results
+
+
+def main():
+    """
+    Compares the ways of reading a dataset collection as a DataFrame
+
+    Description:
+        Uses the mongod of the app (port 54017) or, with --backend mongomock, an in-process stand-in whose numbers
+        are only comparable with other mongomock runs. The snapshots are saved in a temporary folder.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the MEDomics dataset readers")
+    parser.add_argument("--sizes", type=str, default="", help="Comma separated <rows>x<columns>, e.g. 100000x50,20000x500")
+    parser.add_argument("--readers", type=str, default="find_list,loader,parallel_pandas,parallel_pymongoarrow,snapshot")
+    parser.add_argument("--backend", type=str, choices=["mongod", "mongomock"], default="mongod")
+    parser.add_argument("--workers", type=int, default=4, help="Number of _id ranges read concurrently")
+    parser.add_argument("--min-partition-rows", type=int, default=None, help="Overrides parallel_reader.MIN_PARTITION_ROWS")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--memory", action="store_true", help="Also measure the peak memory of every reader")
+    parser.add_argument("--missing-rate", type=float, default=0.1)
+    parser.add_argument("--categorical-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    parser.add_argument("--output", type=str, default=None, help="Path of the json report")
+    args = parser.parse_args()
+    args.readers = args.readers.split(",")
+
+    if args.backend == "mongomock":
+        use_in_process_mongo()
+    os.environ["MED_TMP"] = tempfile.mkdtemp(prefix="med_reader_benchmark_")
+    from med_libs import parallel_reader
+    from med_libs.mongodb_utils import connect_to_mongo
+    if args.min_partition_rows is not None:
+        parallel_reader.MIN_PARTITION_ROWS = args.min_partition_rows
+    db = connect_to_mongo()
+    readers = get_readers(args)
+
+    report = {
+        "meta": {
+            "python": sys.version,
+            "platform": sys.platform,
+            "commit": get_git_commit(),
+            "backend": args.backend,
+            "workers": args.workers,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": []
+    }
+    try:
+        for n_rows, n_columns in parse_sizes(args.sizes) if args.sizes else DEFAULT_SIZES:
+            report["results"].extend(run_size(db, n_rows, n_columns, readers, args))
+    finally:
+        shutil.rmtree(os.environ["MED_TMP"], ignore_errors=True)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
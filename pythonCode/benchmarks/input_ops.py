@@ -0,0 +1,501 @@
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+import traceback
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PYTHON_CODE_PATH = Path(os.path.dirname(os.path.abspath(__file__))).parent
+sys.path.append(str(PYTHON_CODE_PATH))
+
+# Sizes benchmarked by default, as (rows, columns), bigger ones are given with --sizes (e.g. 1000000x5000)
+DEFAULT_SIZES = [(10000, 50), (100000, 50), (10000, 500)]
+
+# Tags prefixed to the feature names, like the columns of the MEDomics standard (<tag>_|_<feature>)
+TAGS = ["demographics", "labs", "vitals", "medications"]
+
+# Categories of the categorical columns
+CATEGORIES = np.array(["A", "B", "C", "D", "E"], dtype=object)
+
+# Number of rows generated and inserted at once
+CHUNK_ROWS = 10000
+
+# Prefix of every collection created by the benchmark
+COLLECTION_PREFIX = "benchmark_"
+
+ID_COLUMN = "patient_id"
+TARGET_COLUMN = "target"
+
+
+class TableSpec:
+    """
+    This class is used to describe the columns of a synthetic clinical table
+
+    Args:
+        n_columns: The number of feature columns
+        categorical_rate: The fraction of categorical columns
+        seed: The seed of the random generator
+
+    Description:
+        The features are split in complete numeric columns (no missing values, used by the PCA and
+        correlation operations), sparse numeric columns, categorical columns and exact copies of
+        complete columns (found by the duplicate detection).
+    """
+
+    def __init__(self, n_columns: int, categorical_rate: float = 0.1, seed: int = 0):
+        n_duplicates = max(1, n_columns // 50)
+        n_categorical = max(1, int(n_columns * categorical_rate))
+        n_complete = max(2, (n_columns - n_duplicates - n_categorical) // 2)
+        n_sparse = max(0, n_columns - n_duplicates - n_categorical - n_complete)
+        self.seed = seed
+        self.complete = [self._name(i, "num") for i in range(n_complete)]
+        self.sparse = [self._name(n_complete + i, "sparse") for i in range(n_sparse)]
+        offset = n_complete + n_sparse
+        self.categorical = [self._name(offset + i, "cat") for i in range(n_categorical)]
+        offset += n_categorical
+        self.duplicates = {self._name(offset + i, "copy"): self.complete[i % n_complete] for i in range(n_duplicates)}
+
+    @staticmethod
+    def _name(index: int, kind: str) -> str:
+        return f"{TAGS[index % len(TAGS)]}_|_{kind}_{index}"
+
+    @property
+    def numeric(self) -> list:
+        return self.complete + self.sparse
+
+    @property
+    def columns(self) -> list:
+        return [ID_COLUMN, TARGET_COLUMN] + self.complete + self.sparse + self.categorical + list(self.duplicates)
+
+
+def generate_chunks(spec: TableSpec, n_rows: int, missing_rate: float = 0.1, chunk_rows: int = CHUNK_ROWS):
+    """
+    Generates a synthetic clinical table by chunks of rows, so that tables bigger than the memory can be loaded
+
+    Args:
+        spec: The description of the columns
+        n_rows: The number of rows
+        missing_rate: The fraction of missing values of the sparse and categorical columns
+        chunk_rows: The number of rows of each chunk
+
+    Returns:
+        A generator of DataFrames
+    """
+    for chunk_index, start in enumerate(range(0, n_rows, chunk_rows)):
+        rng = np.random.default_rng(spec.seed * 100003 + chunk_index)
+        size = min(chunk_rows, n_rows - start)
+        data = {
+            ID_COLUMN: np.arange(start, start + size),
+            TARGET_COLUMN: rng.integers(0, 2, size)
+        }
+        for column in spec.complete:
+            data[column] = rng.normal(rng.uniform(-10, 10), rng.uniform(0.5, 5), size)
+        for column in spec.sparse:
+            values = rng.normal(0, 1, size)
+            values[rng.random(size) < missing_rate] = np.nan
+            data[column] = values
+        for column in spec.categorical:
+            values = CATEGORIES[rng.integers(0, len(CATEGORIES), size)]
+            values[rng.random(size) < missing_rate] = None
+            data[column] = values
+        for column, source in spec.duplicates.items():
+            data[column] = data[source]
+        yield pd.DataFrame(data, columns=spec.columns)
+
+
+def insert_table(db, collection_name: str, chunks) -> int:
+    """
+    Inserts the chunks of a table in a collection, missing values are stored as null
+
+    Args:
+        db: The MongoDB database
+        collection_name: The name of the collection
+        chunks: The DataFrames to insert
+
+    Returns:
+        The number of inserted rows
+    """
+    collection = db[collection_name]
+    n_rows = 0
+    for chunk in chunks:
+        records = chunk.astype(object).where(chunk.notna(), None).to_dict(orient="records")
+        collection.insert_many(records, ordered=False)
+        n_rows += len(records)
+    return n_rows
+
+
+def _merge_chunks(spec: TableSpec, n_rows: int, missing_rate: float):
+    """
+    Generates the second table of the merge operation, it shares the id column with the first one
+    """
+    renamed = {column: column.replace("_|_", "_|_merged_") for column in spec.columns[2:]}
+    renamed[TARGET_COLUMN] = "merged_" + TARGET_COLUMN
+    for chunk in generate_chunks(spec, n_rows, missing_rate):
+        yield chunk.rename(columns=renamed)
+
+
+# The benchmarked operations: name, script (relative to modules/input) and the function building its json config
+# from the benchmark context. The output collections of a config are the values of its keys listed in "outputs".
+OPERATIONS = [
+    {
+        "name": "clean_columns",
+        "script": "cleanDB.py",
+        "outputs": ["newDatasetName"],
+        "config": lambda ctx: {
+            "type": "columns", "cleanMethod": "mean fill", "overwrite": False, "startWith": "Columns",
+            "collectionName": ctx["collection"], "newDatasetName": ctx["output"] + "clean_columns",
+            "columnsToClean": list(ctx["spec"].sparse), "rowsToClean": []
+        }
+    },
+    {
+        "name": "clean_rows",
+        "script": "cleanDB.py",
+        "outputs": ["newDatasetName"],
+        "config": lambda ctx: {
+            "type": "rows", "cleanMethod": "drop", "overwrite": False, "startWith": "Rows",
+            "collectionName": ctx["collection"], "newDatasetName": ctx["output"] + "clean_rows",
+            "columnsToClean": [], "rowsToClean": [str(row) for row in range(0, ctx["rows"], 100)]
+        }
+    },
+    {
+        "name": "merge",
+        "script": "mergeDB.py",
+        "outputs": ["newCollectionName"],
+        "config": lambda ctx: {
+            "collection1": ctx["collection"], "collection2": ctx["merge_collection"], "mergeType": "left",
+            "columns": [ID_COLUMN], "newCollectionName": ctx["output"] + "merge"
+        }
+    },
+    {
+        "name": "normalize",
+        "script": "normalizeDB.py",
+        "outputs": ["newDatasetName"],
+        "config": lambda ctx: {
+            "collection": ctx["collection"], "columns": list(ctx["spec"].numeric), "method": "zscore",
+            "overwrite": False, "newDatasetName": ctx["output"] + "normalize"
+        }
+    },
+    {
+        "name": "create_pca",
+        "script": "create_pcaDB.py",
+        "outputs": ["newCollectionName", "newPCATransformationName"],
+        "config": lambda ctx: {
+            "collectionName": ctx["collection"], "columns": list(ctx["spec"].complete),
+            "nComponents": min(5, len(ctx["spec"].complete)), "columnPrefix": "pca",
+            "keepUnselectedColumns": False, "overwrite": False, "exportTransformation": True,
+            "newCollectionName": ctx["output"] + "pca", "newPCATransformationName": ctx["output"] + "pca_transformation"
+        }
+    },
+    {
+        "name": "apply_pca",
+        "script": "apply_pcaDB.py",
+        "outputs": ["newCollectionName"],
+        "requires": "create_pca",
+        "config": lambda ctx: {
+            "collectionName": ctx["collection"], "columns": list(ctx["spec"].complete),
+            "keepUnselectedColumns": False, "overwrite": False, "newCollectionName": ctx["output"] + "apply_pca",
+            "transformationCollection": ctx["output"] + "pca_transformation"
+        }
+    },
+    {
+        "name": "eigenvalues",
+        "script": "compute_eigenvaluesDB.py",
+        "outputs": [],
+        "config": lambda ctx: {"collectionName": ctx["collection"], "columns": list(ctx["spec"].complete)}
+    },
+    {
+        "name": "correlations",
+        "script": "compute_correlationsDB.py",
+        "outputs": [],
+        "config": lambda ctx: {
+            "collection": ctx["collection"], "columns": list(ctx["spec"].complete), "target": TARGET_COLUMN
+        }
+    },
+    {
+        "name": "prune_correlated",
+        "script": "prune_correlated_columnsDB.py",
+        "outputs": ["newCollectionName"],
+        "config": lambda ctx: {
+            "collectionName": ctx["collection"], "columns": list(ctx["spec"].numeric), "target": TARGET_COLUMN,
+            "threshold": 0.9, "method": "pearson", "overwrite": False, "newCollectionName": ctx["output"] + "pruned"
+        }
+    },
+    {
+        "name": "missing_values",
+        "script": "get_row_column_missing_values.py",
+        "outputs": [],
+        "config": lambda ctx: {"collectionName": ctx["collection"]}
+    },
+    {
+        "name": "duplicates",
+        "script": "find_duplicate_columnsDB.py",
+        "outputs": [],
+        "config": lambda ctx: {"collectionName": ctx["collection"]}
+    },
+    {
+        "name": "holdout",
+        "script": "create_holdout_set_DB.py",
+        "outputs": ["name", "name2"],
+        "config": lambda ctx: {
+            "collectionName": ctx["collection"], "holdoutSetSize": 20, "shuffle": True, "stratify": True,
+            "columnsToStratifyWith": [TARGET_COLUMN], "randomState": 42, "nanMethod": "drop",
+            "name": ctx["output"] + "learning", "name2": ctx["output"] + "holdout"
+        }
+    },
+]
+
+
+def use_in_process_mongo():
+    """
+    Replaces pymongo's MongoClient by mongomock's one, so the operations run without a mongod
+
+    Description:
+        Must be called before the med_libs modules and the scripts are imported. mongomock runs the queries
+        in python, so the numbers it gives are only comparable with other mongomock numbers.
+    """
+    import mongomock
+    import pymongo
+    from mongomock.store import ServerStore
+
+    # Every client opened by the scripts must see the same databases
+    store = ServerStore()
+
+    class SharedMongoClient(mongomock.MongoClient):
+        def __init__(self, *args, **kwargs):
+            kwargs.setdefault("_store", store)
+            super().__init__(*args, **kwargs)
+
+    pymongo.MongoClient = SharedMongoClient
+
+
+def load_operation(script_path: Path):
+    """
+    Imports the script of an operation
+
+    Args:
+        script_path: The path of the script
+
+    Returns:
+        A function running the operation with a json config and returning its results
+    """
+    from med_libs.go_worker import load_script
+    with open(script_path, "r", encoding="utf-8") as f:
+        is_go_execution_script = "run_script(" in f.read()
+    if is_go_execution_script:
+        script_class, kwargs = load_script(str(script_path))
+
+        def run(config: dict):
+            script = script_class(config, "benchmark", **kwargs)
+            try:
+                return script._custom_process(config)
+            finally:
+                # The progress not sent yet is written now, under the stdout redirect of the caller, and the
+                # bus stays closed so that the later phases of the process don't write
+                script._progress_bus.close()
+        return run
+
+    # Standalone scripts reading their config from the command line
+    spec = importlib.util.spec_from_file_location("benchmark_" + script_path.stem, script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    def run(config: dict):
+        argv = sys.argv
+        sys.argv = [str(script_path), "--json-param", json.dumps(config), "--id", "benchmark"]
+        try:
+            return module.main()
+        finally:
+            sys.argv = argv
+    return run
+
+
+def get_rss_mb() -> float:
+    """
+    Gets the resident set size of the benchmark process in MB, None if psutil is not installed
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024.0 ** 2)
+
+
+def run_operation(operation: dict, ctx: dict) -> dict:
+    """
+    Runs an operation end to end (read from MongoDB, compute, write to MongoDB) and measures it
+
+    Args:
+        operation: One of OPERATIONS
+        ctx: The benchmark context
+
+    Returns:
+        The measure of the operation
+    """
+    result = {"operation": operation["name"], "rows": ctx["rows"], "columns": ctx["columns"]}
+    config = operation["config"](ctx)
+    try:
+        run = load_operation(PYTHON_CODE_PATH / "modules" / "input" / operation["script"])
+        # The scripts print their progress and debug messages, they are not part of the measure
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            run(config)
+            seconds = time.perf_counter() - start
+        result.update({
+            "status": "ok",
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(ctx["rows"] / seconds, 1) if seconds > 0 else None
+        })
+    except BaseException as e:
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        result.update({"status": "error", "error": f"{type(e).__name__}: {e}", "trace": traceback.format_exc(limit=5)})
+    result["rss_mb"] = get_rss_mb()
+    for key in operation["outputs"]:
+        ctx["created"].add(config[key])
+    return result
+
+
+def run_size(db, n_rows: int, n_columns: int, args) -> list:
+    """
+    Loads the synthetic tables of a size and runs the selected operations on them
+
+    Returns:
+        The measures of the loading and of the operations
+    """
+    spec = TableSpec(n_columns, args.categorical_rate, args.seed)
+    name = f"{COLLECTION_PREFIX}{n_rows}x{n_columns}"
+    ctx = {
+        "rows": n_rows, "columns": n_columns, "spec": spec,
+        "collection": name, "merge_collection": name + "_right", "output": name + "_",
+        "created": {name, name + "_right"}
+    }
+    for collection_name in ctx["created"]:
+        db.drop_collection(collection_name)
+
+    results = []
+    start = time.perf_counter()
+    insert_table(db, ctx["collection"], generate_chunks(spec, n_rows, args.missing_rate))
+    results.append({"operation": "load", "rows": n_rows, "columns": n_columns, "status": "ok",
+                    "seconds": round(time.perf_counter() - start, 4)})
+    if "merge" in args.operations:
+        merge_spec = TableSpec(min(n_columns, 10), args.categorical_rate, args.seed + 1)
+        insert_table(db, ctx["merge_collection"], _merge_chunks(merge_spec, n_rows, args.missing_rate))
+
+    statuses = {}
+    try:
+        for operation in OPERATIONS:
+            if operation["name"] not in args.operations:
+                continue
+            required = operation.get("requires")
+            if required is not None and statuses.get(required) != "ok":
+                results.append({"operation": operation["name"], "rows": n_rows, "columns": n_columns,
+                                "status": "skipped", "error": f"requires {required}"})
+                continue
+            result = run_operation(operation, ctx)
+            statuses[operation["name"]] = result["status"]
+            results.append(result)
+            print(f"{n_rows}x{n_columns} {operation['name']}: {result['status']} {result.get('seconds', '')}",
+                  file=sys.stderr)
+    finally:
+        if not args.keep:
+            for collection_name in ctx["created"]:
+                db.drop_collection(collection_name)
+    return results
+
+
+def parse_sizes(sizes: str) -> list:
+    """
+    Parses a list of sizes such as "10000x50,100000x500"
+    """
+    if not sizes:
+        return DEFAULT_SIZES
+    return [tuple(int(value) for value in size.lower().split("x")) for size in sizes.split(",")]
+
+
+def get_git_commit() -> str:
+    """
+    Gets the commit of the benchmarked code, None if it can't be found
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=str(PYTHON_CODE_PATH)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_to_baseline(results: list, baseline: list) -> None:
+    """
+    Adds to every measure its speedup compared to the same operation and size of a previous report
+    """
+    previous = {(entry["operation"], entry["rows"], entry["columns"]): entry for entry in baseline}
+    for entry in results:
+        old = previous.get((entry["operation"], entry["rows"], entry["columns"]))
+        if old is not None and old.get("seconds") and entry.get("seconds"):
+            entry["baseline_seconds"] = old["seconds"]
+            entry["speedup"] = round(old["seconds"] / entry["seconds"], 3)
+
+
+def main():
+    """
+    Benchmarks the modules/input operations on synthetic clinical tables
+
+    Description:
+        The tables are loaded in the "data" database of the local mongod used by the app (port 54017) or,
+        with --backend mongomock, in an in-process stand-in. Every operation runs end to end in this process
+        and the report (json) gives its duration, its throughput and the memory of the process.
+        The collections created by the benchmark are prefixed with "benchmark_" and dropped at the end.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark of the MEDomics input operations")
+    parser.add_argument("--sizes", type=str, default="", help="Comma separated <rows>x<columns>, e.g. 10000x50,1000000x5000")
+    parser.add_argument("--operations", type=str, default=",".join(op["name"] for op in OPERATIONS))
+    parser.add_argument("--backend", type=str, choices=["mongod", "mongomock"], default="mongod")
+    parser.add_argument("--missing-rate", type=float, default=0.1)
+    parser.add_argument("--categorical-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    parser.add_argument("--output", type=str, default=None, help="Path of the json report")
+    parser.add_argument("--baseline", type=str, default=None, help="Path of a previous json report to compare to")
+    args = parser.parse_args()
+    args.operations = set(args.operations.split(","))
+
+    if args.backend == "mongomock":
+        use_in_process_mongo()
+    from med_libs.mongodb_utils import connect_to_mongo
+    db = connect_to_mongo()
+
+    report = {
+        "meta": {
+            "python": sys.version,
+            "platform": sys.platform,
+            "commit": get_git_commit(),
+            "backend": args.backend,
+            "missing_rate": args.missing_rate,
+            "categorical_rate": args.categorical_rate,
+            "seed": args.seed,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": []
+    }
+    for n_rows, n_columns in parse_sizes(args.sizes):
+        report["results"].extend(run_size(db, n_rows, n_columns, args))
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            compare_to_baseline(report["results"], json.load(f)["results"])
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
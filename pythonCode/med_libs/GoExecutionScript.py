@@ -1,10 +1,42 @@
 import json
 import os
+import re
 import sys
 import traceback
 from abc import ABC, abstractmethod
 import argparse
-from .server_utils import go_print
+from .profiling import JobProfiler, get_profile_destination
+from .progress_bus import ProgressBus, ProgressPhase
+from .response_encoding import encode_response, iter_response_encoding
+from .server_utils import go_print, go_print_frame
+
+# Size (in characters) of the response chunks streamed to the Go server
+RESPONSE_CHUNK_SIZE = 1024 * 1024
+
+# Maps the absolute path of every imported script module to its GoExecutionScript subclass and constructor kwargs
+SCRIPTS_REGISTRY = {}
+
+
+def load_json_params(stream) -> dict:
+    """
+    Loads the json params from a stream
+
+    Args:
+        stream: A binary file-like object containing the json params
+
+    Returns:
+        The json params
+
+    Description:
+        If ijson is installed, the top level entries are decoded incrementally while the stream is read,
+        so the raw text of big payloads (e.g. long lists of records or file paths) is never held in memory
+        next to the decoded objects.
+    """
+    try:
+        import ijson
+    except ImportError:
+        return json.load(stream)
+    return {key: value for key, value in ijson.kvitems(stream, "", use_float=True)}
 
 
 def parse_arguments() -> tuple[dict, str]:
@@ -13,14 +45,30 @@ def parse_arguments() -> tuple[dict, str]:
 
     Returns:
         A tuple of the json params and the id
+
+    Description:
+        The json params are given either as a string with --json-param, or with --json-param-file
+        as the path of a json file, "-" meaning that they are streamed on stdin.
+        --profile (optionally followed by "file" or "mongo") is the same as setting the MED_PROFILE
+        environment variable, see GoExecutionScript.start.
     """
     parser = argparse.ArgumentParser()
     parser.add_argument('--debug', type=bool, default=False)
     parser.add_argument('--json-param', type=str, default='.')
+    parser.add_argument('--json-param-file', type=str, default=None)
     parser.add_argument('--id', type=str, default='.')
+    parser.add_argument('--profile', type=str, nargs='?', const='file', default=None)
     args = parser.parse_args()
+    if args.profile is not None:
+        os.environ["MED_PROFILE"] = args.profile
     if not args.debug:
-        json_params = json.loads(args.json_param)
+        if args.json_param_file == "-":
+            json_params = load_json_params(sys.stdin.buffer)
+        elif args.json_param_file is not None:
+            with open(args.json_param_file, 'rb') as f:
+                json_params = load_json_params(f)
+        else:
+            json_params = json.loads(args.json_param)
         id_ = args.id
         return json_params, id_
     else:
@@ -28,6 +76,29 @@ def parse_arguments() -> tuple[dict, str]:
             return json.load(f), '1234-4567-debug-id'
 
 
+def run_script(script_class, **kwargs):
+    """
+    Registers a GoExecutionScript subclass and starts it if its module is the one being executed
+
+    Args:
+        script_class: The GoExecutionScript subclass defined by the module
+        **kwargs: Additional keyword arguments given to the script constructor
+
+    Returns:
+        The started script if the module was executed directly, None if it was only imported (e.g. by the worker)
+    """
+    module = sys.modules[script_class.__module__]
+    script_path = os.path.abspath(module.__file__)
+    SCRIPTS_REGISTRY[script_path] = (script_class, kwargs)
+    if script_class.__module__ != "__main__":
+        return None
+    json_params, id_ = parse_arguments()
+    go_print(f"running {os.path.basename(script_path)}:{id_}")
+    script = script_class(json_params, id_, **kwargs)
+    script.start()
+    return script
+
+
 def get_response_from_error(e=None, toast=None) -> dict:
     """
     Gets the response from an error
@@ -71,28 +142,62 @@ class GoExecutionScript(ABC):
         self._error_handler = None
         self._progress = {"now": 0, "currentLabel": ""}
         self._id = _id
+        self._progress_bus = ProgressBus(str(_id))
         self._debug = debug
+        # Encoding of the DataFrames returned by _custom_process, a client can opt in a binary one
+        self._response_encoding = json_params.get("responseEncoding", "json") if isinstance(json_params, dict) else "json"
         if self._debug:
             # save json_params_dict to a file
             with open('json_params_dict.json', 'w') as f:
                 json.dump(json_params, f, indent=4)
 
-    def start(self):
+    def start(self, profile: str = None):
         """
         Starts the process
+
+        Args:
+            profile: "file" or "mongo" to profile the process, the MED_PROFILE environment variable is used if None
+
+        Description:
+            A profiled process runs under cProfile and tracemalloc, its profile and a summary (phase timers,
+            top functions, peak memory, bytes read and written) are saved once it is done, see JobProfiler.
         """
         try:
             self.push_progress()
-            results = self._custom_process(self._json_params)
+            results = self._profiled_process(get_profile_destination(profile))
             if self._debug:
                 with open("results.json", "w") as f:
-                    f.write(json.dumps(results, indent=4))
+                    f.write(encode_response(results))
             self.send_response(results)
         except BaseException as e:
             if self._error_handler is not None:
                 self._error_handler(e)
             self.send_response(get_response_from_error(e))
 
+    def _profiled_process(self, destination: str = None) -> dict:
+        """
+        Runs _custom_process, profiled if a destination is given
+
+        Args:
+            destination: "file", "mongo" or None
+
+        Returns:
+            The results of _custom_process
+        """
+        if destination is None:
+            return self._custom_process(self._json_params)
+        profiler = JobProfiler(self._id, destination)
+        profiler.start()
+        try:
+            return self._custom_process(self._json_params)
+        finally:
+            profiler.stop()
+            try:
+                go_print(f"profile of {self._id} saved to {profiler.save()}")
+            except Exception as e:
+                # The job results must be sent even if its profile can't be saved
+                go_print(f"could not save the profile of {self._id}: {e}")
+
     def _set_error_handler(self, error_handler: callable):
         """
         Sets the error handler function, so what to do when an error occurs in the process
@@ -134,33 +239,85 @@ class GoExecutionScript(ABC):
         """
         return get_response_from_error(toast="No process function was provided")
 
+    def start_phase(self, label: str, total: int = None, start: float = None, end: float = None) -> ProgressPhase:
+        """
+        Starts a phase whose items are reported with ProgressPhase.advance (e.g. one item per patient)
+
+        Args:
+            label: The label of the phase, it becomes the current label
+            total: The number of items of the phase if known
+            start: The progress at the beginning of the phase, the progress is left unchanged if None
+            end: The progress at the end of the phase
+
+        Returns:
+            The phase, it can be used as a context manager
+        """
+        self._progress["currentLabel"] = label
+        return self._progress_bus.start_phase(label, total, start, end)
+
     def push_progress(self):
         """
         handle pushing the progress to the Go server
+
+        Description:
+            The progress is sent by the progress bus thread, so this never waits for stdout and the
+            updates pushed in a short time are coalesced.
         """
-        print(self._id, json.dumps(self._progress))
-        msg = "progress*_*" + self._id + "*_*" + json.dumps(self._progress)
-        go_print(msg)
+        self._progress_bus.publish(self._progress)
 
     def send_response(self, response: dict):
         """
         handle sending the response to the Go server
 
         Args:
-            response: The response to send
+            response: The response to send, DataFrames it contains are encoded with the requested response encoding
 
+        Description:
+            The response is streamed on stdout in chunks tagged with the job id, followed by an end message.
+            The chunks are sent while the response is serialized, so the serialized response is never held
+            in memory as a whole. If the MED_RESPONSE_TRANSPORT environment variable is set to "file", the
+            response is written to a file unique to the job and its path is sent instead.
         """
-        to_send = json.dumps(response)
+        pieces = iter_response_encoding(response, self._response_encoding)
+
+        if os.environ.get("MED_RESPONSE_TRANSPORT", "stream") == "file":
+            self._send_response_file(pieces)
+            return
 
-        file_path = os.path.expanduser(os.path.join(os.environ.get("MED_TMP", "~"), "temp_requests.txt")) # Before was -> file_path = os.path.join(os.getcwd(), "temp_requests.txt")
-        # test validity of the path file
-        # if not os.path.exists(os.path.dirname(file_path)):
-        #     file_path = os.path.join(os.getcwd(), "temp_requests.txt")
+        n_chunks = 0
+        buffer, buffered = [], 0
+        for piece in pieces:
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered < RESPONSE_CHUNK_SIZE:
+                continue
+            pending = "".join(buffer)
+            end = len(pending) - len(pending) % RESPONSE_CHUNK_SIZE
+            for start in range(0, end, RESPONSE_CHUNK_SIZE):
+                go_print_frame(f"response-chunk*_*{self._id}*_*{pending[start:start + RESPONSE_CHUNK_SIZE]}")
+                n_chunks += 1
+            buffer, buffered = [pending[end:]], len(pending) - end
+        if buffered:
+            go_print_frame(f"response-chunk*_*{self._id}*_*{''.join(buffer)}")
+            n_chunks += 1
+        self.set_progress(label="Done", now=100)
+        self._progress_bus.close()
+        go_print_frame(f"response-end*_*{self._id}*_*{n_chunks}")
+
+    def _send_response_file(self, pieces):
+        """
+        handle sending the response to the Go server through a file unique to the job
+
+        Args:
+            pieces: The pieces of the serialized response, see iter_response_encoding
+        """
+        file_name = "temp_requests_" + re.sub(r"[^A-Za-z0-9_.-]", "_", str(self._id)) + ".txt"
+        file_path = os.path.expanduser(os.path.join(os.environ.get("MED_TMP", "~"), file_name))
 
         # Fixing the permission denied error on Mac
         go_print("FILE PATH: " + file_path)
-        f = open(file_path, "w")
-        f.write(to_send)
-        f.close()
+        with open(file_path, "w") as f:
+            f.writelines(pieces)
         self.set_progress(label="Done", now=100)
+        self._progress_bus.close()
         go_print(f"response-ready*_*{file_path}")
@@ -410,11 +410,6 @@ class MEDexperiment(ABC):
                         return_dict[key] = value
                     except TypeError:
                         pass
-                    try:
-                        json.dumps(value)
-                        return_dict[key] = value
-                    except TypeError:
-                        pass
         return return_dict
 
     def add_only_object(self, next_item: Union[dict, list]) -> dict:
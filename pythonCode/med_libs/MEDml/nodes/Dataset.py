@@ -7,8 +7,8 @@ from typing import Union
 
 import numpy as np
 import pandas as pd
-import pymongo
 
+from ...mongodb_utils import get_dataset_as_pd_df
 from ...server_utils import go_print
 from .NodeObj import *
 
@@ -50,10 +50,6 @@ class Dataset(Node):
         """
         This function is used to execute the node.
         """
-        # MongoDB setup
-        mongo_client = pymongo.MongoClient("mongodb://localhost:54017/")
-        database = mongo_client["data"]
-
         # Update code
         self.CodeHandler.add_line("code", "# MongoDB setup")
         self.CodeHandler.add_line("code", "mongo_client = pymongo.MongoClient('mongodb://localhost:54017/')")
@@ -66,9 +62,7 @@ class Dataset(Node):
             self.dfs_combinations = self._merge_dfs(self.settings['time-point'],
                                                     self.settings['split_experiment_by_institutions']) """
         elif self.entry_file_type == FILE:
-            collection = database[self.settings['files']["id"]]
-            collection_data = collection.find({}, {'_id': False})
-            self.df = pd.DataFrame(list(collection_data))
+            self.df = get_dataset_as_pd_df(self.settings['files']["id"])
             self.CodeHandler.add_line("code", f"collection = database['{str(self.settings['files']['id'])}']",)
             self.CodeHandler.add_line("code", "collection_data = collection.find({}, {'_id': False})")
             self.CodeHandler.add_line("code", "df = pd.DataFrame(list(collection_data))")
@@ -89,9 +83,7 @@ class Dataset(Node):
                     elif T_in_name:
                         break
                 if len(number) > 0:
-                    collection = database[df_ids_list[i]]
-                    collection_data = collection.find({}, {'_id': False})
-                    df_dict['_T' + number] = pd.DataFrame(list(collection_data))
+                    df_dict['_T' + number] = get_dataset_as_pd_df(df_ids_list[i])
             first_col = df_dict['_T' + number].columns[0]
             target = self.settings['target']
 
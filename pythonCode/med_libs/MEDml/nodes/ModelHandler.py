@@ -8,6 +8,7 @@ from colorama import Fore
 from pycaret.classification import *
 from pycaret.utils.generic import check_metric
 
+from ...progress_bus import start_phase
 from .NodeObj import Node
 
 DATAFRAME_LIKE = Union[dict, list, tuple, np.ndarray, pd.DataFrame]
@@ -85,6 +86,7 @@ class ModelHandler(Node):
         self.CodeHandler.add_line("code", f"optimization_metric = '{optimization_metric}'")
         
         # Iterate through each fold and train the model
+        phase = start_phase(f"{self.username}: training folds", total=len(folds))
         for fold_data in folds:
             fold_num = fold_data['fold']
             train_indices = fold_data['train_indices']
@@ -155,6 +157,8 @@ class ModelHandler(Node):
 
             # Store Results for the fold
             trained_models.append(model)
+            phase.advance(item=f"Fold {fold_num}")
+        phase.close()
 
         # Update code handler with training loop
         self.CodeHandler.add_line("code", f"\n# Training and evaluating models for {len(folds)} folds")
@@ -14,11 +14,11 @@ from colorama import Fore
 from .NodeObj import Node, format_model
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from MEDDataObject import MEDDataObject
-from mongodb_utils import (get_child_id_by_name,
-                           get_pickled_model_from_collection,
-                           insert_med_data_object_if_not_exists,
-                           overwrite_med_data_object_content)
+from ...MEDDataObject import MEDDataObject
+from ...mongodb_utils import (get_child_id_by_name,
+                              get_pickled_model_from_collection,
+                              insert_med_data_object_if_not_exists,
+                              overwrite_med_data_object_content)
 
 DATAFRAME_LIKE = Union[dict, list, tuple, np.ndarray, pd.DataFrame]
 TARGET_LIKE = Union[int, str, list, tuple, np.ndarray, pd.Series]
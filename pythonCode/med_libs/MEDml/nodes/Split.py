@@ -5,8 +5,7 @@ from typing import Tuple, Union
 
 import numpy as np
 import pandas as pd
-from bson import ObjectId
-from mongodb_utils import connect_to_mongo
+from ...row_index import get_row_positions
 from utils.data_split_utils import (get_cv_stratification_details,
                                     get_subsampling_details)
 
@@ -175,24 +174,22 @@ class Split(Node):
             else:
                 if not isinstance(experiment_df, pd.DataFrame):
                     experiment_df = pd.DataFrame(experiment_df)
-                collection = connect_to_mongo()[collection_id]
-                for (row_id, tag) in row_tags_map.items():
+                tagged_rows = [(row_id, tag) for (row_id, tag) in row_tags_map.items() if tag in row_tags]
+                # Positions of all the tagged rows in the dataset, resolved at once
+                positions = get_row_positions(collection_id, [row_id for (row_id, _) in tagged_rows])
+                for (row_id, _), index in zip(tagged_rows, positions):
+                    if index < 0:
+                        raise ValueError(f"Document with _id {row_id} not found in collection {collection_id}.")
+                tags = pd.Series([tag for (_, tag) in tagged_rows], dtype=object)
+                for tag in tags.unique():
+                    # Create the one-hot encoded column for the tag
                     tag_column_name = f"rowtag_{tag}"
-                    if tag in row_tags:
-                        # Create the one-hot encoded column for the tag
-                        if tag_column_name not in experiment_df.columns:
-                            experiment_df[tag_column_name] = 0
-                        # Get the document
-                        doc = collection.find_one({"_id": ObjectId(row_id)})
-                        if doc:
-                            # To get the index/position in collection (can be slow on large collections)
-                            index = list(collection.find()).index(doc)
-                            experiment_df.at[index, tag_column_name] = 1
-                            if tag_column_name not in stratify_columns:
-                                stratify_columns.append(tag_column_name)
-                                strat_classes_name += f"_XTAGX{tag}"
-                        else:
-                            raise ValueError(f"Document with _id {row_id} not found in collection {collection_id}.")
+                    if tag_column_name not in experiment_df.columns:
+                        experiment_df[tag_column_name] = 0
+                    experiment_df.loc[positions[(tags == tag).to_numpy()], tag_column_name] = 1
+                    if tag_column_name not in stratify_columns:
+                        stratify_columns.append(tag_column_name)
+                        strat_classes_name += f"_XTAGX{tag}"
 
         # Create a composite column before setup
         if isinstance(stratify_columns, list) and len(stratify_columns) > 1:
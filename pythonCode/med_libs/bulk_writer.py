@@ -0,0 +1,355 @@
+import datetime
+import os
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+
+from .progress_bus import start_phase
+
+# Number of rows sent by each insert_many
+DEFAULT_CHUNK_ROWS = 5000
+
+# Number of insert_many running concurrently, can be changed with the MED_WRITER_WORKERS environment variable
+DEFAULT_WRITE_WORKERS = 4
+
+# Marks the collections receiving the new content of an overwritten collection
+STAGING_SUFFIX = "__staging_"
+
+# Index options that are not creation options
+_INDEX_INFO_KEYS = ("key", "v", "ns")
+
+
+def get_write_workers() -> int:
+    """
+    Gets the number of insert_many running concurrently
+    """
+    try:
+        return max(int(os.environ.get("MED_WRITER_WORKERS", DEFAULT_WRITE_WORKERS)), 1)
+    except ValueError:
+        return DEFAULT_WRITE_WORKERS
+
+
+def _to_bson_value(value):
+    """
+    Converts a value of an object column to a value BSON can encode
+    """
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float):
+        return None if value != value else value
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and value != value:
+            return None
+        return value
+    if isinstance(value, (pd.Timedelta, datetime.timedelta)):
+        return str(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+_to_bson_values = np.frompyfunc(_to_bson_value, 1, 1)
+
+
+def to_bson_column(values: pd.Series) -> np.ndarray:
+    """
+    Converts a column to Python values BSON can encode, the missing values (NaN, NaT, NA) become None
+
+    Args:
+        values: The column
+
+    Returns:
+        An object array
+    """
+    dtype = values.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+        # astype(object) gives Python numbers
+        column = values.to_numpy().astype(object)
+        if dtype.kind == "f":
+            column[np.isnan(values.to_numpy())] = None
+        return column
+    if isinstance(dtype, np.dtype) and dtype.kind == "M" or isinstance(dtype, pd.DatetimeTZDtype):
+        # Timestamps are datetimes
+        return np.where(values.isna().to_numpy(), None, values.to_numpy(dtype=object))
+    if isinstance(dtype, np.dtype) and dtype.kind == "m":
+        # BSON has no durations
+        return np.where(values.isna().to_numpy(), None, values.astype(str).to_numpy(dtype=object))
+    # Object and extension dtypes (strings, categories, nullable numbers), the NaN comparisons are expected
+    with np.errstate(invalid="ignore"):
+        if isinstance(dtype, np.dtype) and dtype == object:
+            return _to_bson_values(values.to_numpy())
+        return _to_bson_values(values.to_numpy(dtype=object, na_value=None))
+
+
+def iter_bson_records(df: pd.DataFrame, chunk_rows: int = DEFAULT_CHUNK_ROWS, stats=None):
+    """
+    Converts a DataFrame to BSON-safe documents chunk by chunk
+
+    Args:
+        df: The DataFrame
+        chunk_rows: The number of rows of each chunk
+        stats: A stats_catalog.DatasetStatsAccumulator receiving the chunks, if any
+
+    Returns:
+        A generator of lists of documents, with increasing _id in the order of the rows if the DataFrame has no _id column
+    """
+    names = [str(column) for column in df.columns]
+    add_ids = "_id" not in names
+    if add_ids:
+        names = ["_id"] + names
+    for offset in range(0, len(df), chunk_rows):
+        chunk = df.iloc[offset:offset + chunk_rows]
+        if stats is not None:
+            stats.add(chunk)
+        columns = [to_bson_column(chunk.iloc[:, i]) for i in range(chunk.shape[1])]
+        if add_ids:
+            columns.insert(0, [ObjectId() for _ in range(len(chunk))])
+        yield [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _iter_record_chunks(records: list, chunk_rows: int):
+    """
+    Splits documents in chunks, the documents without _id get increasing _id in the order of the list
+    """
+    for offset in range(0, len(records), chunk_rows):
+        chunk = records[offset:offset + chunk_rows]
+        for record in chunk:
+            if "_id" not in record:
+                record["_id"] = ObjectId()
+        yield chunk
+
+
+def _write_chunks(collection, chunks, total: int, max_workers: int = None, label: str = None) -> int:
+    """
+    Inserts chunks of documents with unordered insert_many calls running on a thread pool
+
+    Args:
+        collection: The destination collection
+        chunks: An iterable of lists of documents, consumed as the inserts complete
+        total: The number of documents, for the progress
+        max_workers: The number of insert_many running concurrently, get_write_workers() if None
+        label: The label of the progress phase
+
+    Returns:
+        The number of documents inserted
+    """
+    max_workers = max_workers or get_write_workers()
+    phase = start_phase(label or f"Writing {collection.name}", total=total)
+    inserted = 0
+    pending = set()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for documents in chunks:
+                if not documents:
+                    continue
+                # At most one converted chunk waits per worker, the memory doesn't depend on the dataset size
+                while len(pending) >= 2 * max_workers:
+                    inserted += _collect(wait(pending, return_when=FIRST_COMPLETED).done, pending, phase)
+                pending.add(executor.submit(_insert, collection, documents))
+            while pending:
+                inserted += _collect(wait(pending, return_when=FIRST_COMPLETED).done, pending, phase)
+    finally:
+        phase.close()
+    return inserted
+
+
+def _insert(collection, documents: list) -> int:
+    """
+    Inserts a chunk of documents
+    """
+    collection.insert_many(documents, ordered=False)
+    return len(documents)
+
+
+def _collect(done: set, pending: set, phase) -> int:
+    """
+    Gets the number of documents inserted by the completed inserts, raises their errors
+    """
+    inserted = 0
+    for future in done:
+        pending.discard(future)
+        count = future.result()
+        inserted += count
+        phase.advance(count)
+    return inserted
+
+
+def write_dataframe(collection, df: pd.DataFrame, chunk_rows: int = DEFAULT_CHUNK_ROWS, max_workers: int = None,
+                    label: str = None) -> int:
+    """
+    Inserts the rows of a DataFrame in a collection
+
+    Args:
+        collection: The destination collection
+        df: The DataFrame, its missing values are stored as null
+        chunk_rows: The number of rows of each insert_many
+        max_workers: The number of insert_many running concurrently, get_write_workers() if None
+        label: The label of the progress phase, its throughput is the number of rows written per second
+
+    Returns:
+        The number of documents inserted
+
+    Description:
+        The rows are converted column-wise one chunk at a time instead of converting the whole DataFrame
+        to records, and the chunks are inserted concurrently without order. The _id are generated before
+        the inserts so that their order is the order of the rows (see dataset_loader.ROW_ORDER).
+        The column statistics of the rows are computed on the way and saved in the statistics catalog
+        when the version of the collection is bumped (see stats_catalog).
+    """
+    return write_dataframes(collection, [df], len(df), chunk_rows, max_workers, label)
+
+
+def write_dataframes(collection, dfs, total: int = None, chunk_rows: int = DEFAULT_CHUNK_ROWS, max_workers: int = None,
+                     label: str = None) -> int:
+    """
+    Inserts the rows of DataFrames produced one after the other in a collection, see write_dataframe
+
+    Args:
+        collection: The destination collection
+        dfs: An iterable of DataFrames, e.g. a generator, only the DataFrame being converted is held
+        total: The number of rows of all the DataFrames if known, for the progress
+        chunk_rows: The number of rows of each insert_many
+        max_workers: The number of insert_many running concurrently, get_write_workers() if None
+        label: The label of the progress phase
+
+    Returns:
+        The number of documents inserted, in the order of the DataFrames and of their rows
+    """
+    from .mongodb_utils import get_dataset_version
+    from .stats_catalog import DatasetStatsAccumulator, set_pending_stats
+    offset = collection.estimated_document_count()
+    base_version = get_dataset_version(collection.name, collection.database.name) if offset else None
+    stats = DatasetStatsAccumulator(offset)
+    chunks = (chunk for df in dfs for chunk in iter_bson_records(df, chunk_rows, stats))
+    count = _write_chunks(collection, chunks, total, max_workers, label)
+    set_pending_stats(collection, stats, base_version)
+    return count
+
+
+def write_records(collection, records: list, chunk_rows: int = DEFAULT_CHUNK_ROWS, max_workers: int = None,
+                  label: str = None) -> int:
+    """
+    Inserts documents in a collection, see write_dataframe
+
+    Args:
+        collection: The destination collection
+        records: The documents, they must already be BSON-safe
+        chunk_rows: The number of documents of each insert_many
+        max_workers: The number of insert_many running concurrently, get_write_workers() if None
+        label: The label of the progress phase
+
+    Returns:
+        The number of documents inserted
+    """
+    return _write_chunks(collection, _iter_record_chunks(records, chunk_rows), len(records), max_workers, label)
+
+
+def _copy_indexes(source, destination):
+    """
+    Creates the indexes of a collection on another collection
+    """
+    for name, info in source.index_information().items():
+        if name == "_id_":
+            continue
+        options = {key: value for key, value in info.items() if key not in _INDEX_INFO_KEYS}
+        destination.create_index(info["key"], name=name, **options)
+
+
+def replace_collection(collection, write) -> int:
+    """
+    Replaces the content of a collection by the content written in a staging collection
+
+    Args:
+        collection: The collection to overwrite
+        write: A function writing the new content in the staging collection it receives, returns the number of documents
+
+    Returns:
+        The number of documents of the collection
+    """
+    from .stats_catalog import discard_pending_stats, rename_pending_stats
+    db = collection.database
+    staging_name = f"{collection.name}{STAGING_SUFFIX}{uuid.uuid4().hex}"
+    exists = collection.name in db.list_collection_names(filter={"name": collection.name})
+    try:
+        # Same options (validator, collation...) as the overwritten collection
+        staging = db.create_collection(staging_name, **(collection.options() if exists else {}))
+        count = write(staging)
+        # The indexes are built once the documents are written, faster than maintaining them on every insert
+        if exists:
+            _copy_indexes(collection, staging)
+        staging.rename(collection.name, dropTarget=True)
+    except BaseException:
+        db.drop_collection(staging_name)
+        discard_pending_stats(db.name, staging_name)
+        raise
+    rename_pending_stats(db.name, staging_name, collection.name)
+    return count
+
+
+def overwrite_dataframe(collection, df: pd.DataFrame, chunk_rows: int = DEFAULT_CHUNK_ROWS, max_workers: int = None,
+                        label: str = None) -> int:
+    """
+    Replaces the content of a collection by the rows of a DataFrame, see write_dataframe
+
+    Args:
+        collection: The collection to overwrite, created if it doesn't exist
+        df: The DataFrame, its missing values are stored as null
+        chunk_rows: The number of rows of each insert_many
+        max_workers: The number of insert_many running concurrently, get_write_workers() if None
+        label: The label of the progress phase
+
+    Returns:
+        The number of documents of the collection
+
+    Description:
+        The rows are written in a staging collection that replaces the collection in one renameCollection,
+        with the indexes and options of the collection. Readers see the old content until the swap, and
+        the collection is left unchanged if the job stops before.
+    """
+    label = label or f"Writing {collection.name}"
+    return replace_collection(collection, lambda staging: write_dataframe(staging, df, chunk_rows, max_workers, label))
+
+
+def overwrite_dataframes(collection, dfs, total: int = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                         max_workers: int = None, label: str = None) -> int:
+    """
+    Replaces the content of a collection by the rows of DataFrames produced one after the other,
+    see overwrite_dataframe and write_dataframes
+
+    Args:
+        collection: The collection to overwrite, created if it doesn't exist
+        dfs: An iterable of DataFrames, it can read the collection since it is only replaced at the end
+        total: The number of rows of all the DataFrames if known, for the progress
+        chunk_rows: The number of rows of each insert_many
+        max_workers: The number of insert_many running concurrently, get_write_workers() if None
+        label: The label of the progress phase
+
+    Returns:
+        The number of documents of the collection
+    """
+    label = label or f"Writing {collection.name}"
+    return replace_collection(collection,
+                              lambda staging: write_dataframes(staging, dfs, total, chunk_rows, max_workers, label))
+
+
+def overwrite_records(collection, records: list, chunk_rows: int = DEFAULT_CHUNK_ROWS, max_workers: int = None,
+                      label: str = None) -> int:
+    """
+    Replaces the content of a collection by documents, see overwrite_dataframe
+
+    Args:
+        collection: The collection to overwrite, created if it doesn't exist
+        records: The documents, they must already be BSON-safe
+        chunk_rows: The number of documents of each insert_many
+        max_workers: The number of insert_many running concurrently, get_write_workers() if None
+        label: The label of the progress phase
+
+    Returns:
+        The number of documents of the collection
+    """
+    label = label or f"Writing {collection.name}"
+    return replace_collection(collection, lambda staging: write_records(staging, records, chunk_rows, max_workers, label))
@@ -0,0 +1,248 @@
+import math
+
+from .bulk_writer import replace_collection
+
+# Cleaning methods computed by the database, the other ones need the rows in pandas
+SERVER_FILL_METHODS = ("mean fill", "median fill", "mode fill")
+
+# Normalization methods computed by the database
+SCALING_METHODS = ("zscore", "minmax", "robust")
+
+# Statistics of get_column_stats computed by an accumulator
+_ACCUMULATORS = {"mean": "$avg", "std": "$stdDevPop", "min": "$min", "max": "$max", "sum": "$sum"}
+
+# MongoDB compares NaN as equal to NaN, so it can be matched like a value
+_NAN = float("nan")
+
+
+def is_plain_field(column: str) -> bool:
+    """
+    Checks if a column can be used as a field path in an aggregation expression (no dot, no leading $)
+    """
+    return isinstance(column, str) and bool(column) and "." not in column and not column.startswith("$")
+
+
+def _number(column: str) -> dict:
+    """
+    Gets the expression of the value of a column if it is a number, the booleans are 0 or 1 like in pandas,
+    null otherwise (missing, null, NaN or another type)
+    """
+    field = "$" + column
+    # The comparison of MongoDB distinguishes the booleans from the numbers 0 and 1
+    return {"$cond": [{"$in": [field, [True, False]]}, {"$cond": [field, 1, 0]},
+                      {"$cond": [{"$and": [{"$isNumber": field}, {"$ne": [field, _NAN]}]}, field, None]}]}
+
+
+def _is_missing(column: str) -> dict:
+    """
+    Gets the expression checking if the value of a column is missing (no field, null or NaN), like pandas isna
+    """
+    field = "$" + column
+    return {"$or": [{"$eq": [{"$ifNull": [field, None]}, None]}, {"$eq": [field, _NAN]}]}
+
+
+def get_column_stats(collection, columns: list, stats: tuple = ("count", "mean", "std", "min", "max")) -> dict:
+    """
+    Computes statistics of the numeric values of columns in one $group
+
+    Args:
+        collection: The collection
+        columns: The columns, see is_plain_field
+        stats: The statistics among "count" (numbers), "non_numeric" (values that are neither missing nor numbers),
+            "mean", "std" (population), "min", "max" and "sum"
+
+    Returns:
+        A dict mapping each column to a dict of its statistics, None when the column has no number
+
+    Description:
+        The values that are not numbers are ignored, like pandas ignores the missing values, the booleans
+        are counted as numbers. $isNumber and $stdDevPop need MongoDB 4.4, older servers raise OperationFailure.
+    """
+    group = {"_id": None}
+    for i, column in enumerate(columns):
+        number = _number(column)
+        for stat in stats:
+            key = f"{stat}_{i}"
+            if stat == "count":
+                group[key] = {"$sum": {"$cond": [{"$eq": [number, None]}, 0, 1]}}
+            elif stat == "non_numeric":
+                group[key] = {"$sum": {"$cond": [{"$and": [{"$eq": [number, None]}, {"$not": [_is_missing(column)]}]}, 1, 0]}}
+            else:
+                group[key] = {_ACCUMULATORS[stat]: number}
+    result = next(collection.aggregate([{"$group": group}], allowDiskUse=True), {})
+    return {column: {stat: result.get(f"{stat}_{i}", 0 if stat in ("count", "non_numeric") else None) for stat in stats}
+            for i, column in enumerate(columns)}
+
+
+def get_column_quantiles(collection, column: str, quantiles: list, count: int = None) -> list:
+    """
+    Computes quantiles of the numeric values of a column, with the linear interpolation of pandas
+
+    Args:
+        collection: The collection
+        column: The column, see is_plain_field
+        quantiles: The quantiles, between 0 and 1
+        count: The number of numeric values of the column, computed if None
+
+    Returns:
+        The list of quantiles, None if the column has no number
+
+    Description:
+        Each quantile reads at most two values from a server-side sort of the numbers (booleans as 0 or 1).
+    """
+    if count is None:
+        count = get_column_stats(collection, [column], ("count",))[column]["count"]
+    if not count:
+        return [None] * len(quantiles)
+    values = []
+    for quantile in quantiles:
+        position = quantile * (count - 1)
+        lower = math.floor(position)
+        pipeline = [
+            {"$project": {"_id": 0, "value": _number(column)}},
+            {"$match": {"value": {"$ne": None}}},
+            {"$sort": {"value": 1}},
+            {"$skip": lower},
+            {"$limit": 2}
+        ]
+        bounds = [document["value"] for document in collection.aggregate(pipeline, allowDiskUse=True)]
+        if len(bounds) > 1 and position > lower:
+            values.append(bounds[0] + (bounds[1] - bounds[0]) * (position - lower))
+        else:
+            values.append(bounds[0])
+    return values
+
+
+def get_column_modes(collection, columns: list) -> dict:
+    """
+    Computes the most frequent value of columns in one aggregation
+
+    Args:
+        collection: The collection
+        columns: The columns, see is_plain_field
+
+    Returns:
+        A dict mapping each column to its most frequent value (the smallest one if tied, like pandas),
+        None when the column has only missing values
+    """
+    facets = {
+        f"mode_{i}": [
+            {"$match": {column: {"$nin": [None, _NAN]}}},
+            {"$group": {"_id": "$" + column, "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": 1}
+        ]
+        for i, column in enumerate(columns)
+    }
+    result = next(collection.aggregate([{"$facet": facets}], allowDiskUse=True), {})
+    return {column: result[f"mode_{i}"][0]["_id"] if result.get(f"mode_{i}") else None for i, column in enumerate(columns)}
+
+
+def get_fill_values(collection, columns: list, method: str) -> dict:
+    """
+    Computes the values replacing the missing values of columns
+
+    Args:
+        collection: The collection
+        columns: The columns, see is_plain_field
+        method: One of SERVER_FILL_METHODS
+
+    Returns:
+        A dict mapping each column to its fill value, None when the column can't be filled
+    """
+    if method == "mean fill":
+        stats = get_column_stats(collection, columns, ("mean",))
+        return {column: stats[column]["mean"] for column in columns}
+    if method == "median fill":
+        stats = get_column_stats(collection, columns, ("count",))
+        return {column: get_column_quantiles(collection, column, [0.5], stats[column]["count"])[0] for column in columns}
+    if method == "mode fill":
+        return get_column_modes(collection, columns)
+    raise ValueError(f"Unsupported fill method: {method}")
+
+
+def get_fill_expressions(collection, columns: list, method: str) -> dict:
+    """
+    Gets the $set expressions replacing the missing values of columns, see get_fill_values
+
+    Returns:
+        A dict mapping each column that can be filled to its expression
+    """
+    return {column: {"$cond": [_is_missing(column), value, "$" + column]}
+            for column, value in get_fill_values(collection, columns, method).items() if value is not None}
+
+
+def get_scaling_expressions(collection, columns: list, method: str) -> dict:
+    """
+    Gets the $set expressions normalizing columns, like the scikit-learn scalers
+
+    Args:
+        collection: The collection
+        columns: The columns, see is_plain_field
+        method: One of SCALING_METHODS, "zscore" (StandardScaler), "minmax" (MinMaxScaler) or "robust" (RobustScaler)
+
+    Returns:
+        A dict mapping each column that has numbers to its expression, the missing values are left unchanged
+        and the booleans are normalized as 0 or 1
+    """
+    if method not in SCALING_METHODS:
+        raise ValueError(f"Unsupported normalization method: {method}")
+    stats = get_column_stats(collection, columns, ("count", "non_numeric", "mean", "std", "min", "max"))
+    non_numeric = [column for column in columns if stats[column]["non_numeric"]]
+    if non_numeric:
+        raise ValueError(f"Normalization failed: the columns {non_numeric} have values that are not numbers")
+
+    expressions = {}
+    for column in columns:
+        column_stats = stats[column]
+        if not column_stats["count"]:
+            continue
+        if method == "zscore":
+            center, scale = column_stats["mean"], column_stats["std"]
+        elif method == "minmax":
+            center, scale = column_stats["min"], column_stats["max"] - column_stats["min"]
+        else:
+            q1, median, q3 = get_column_quantiles(collection, column, [0.25, 0.5, 0.75], column_stats["count"])
+            center, scale = median, q3 - q1
+        # Constant columns are only centered, like scikit-learn does
+        if not scale:
+            scale = 1
+        number = _number(column)
+        expressions[column] = {"$cond": [{"$eq": [number, None]}, "$" + column,
+                                         {"$divide": [{"$subtract": [number, center]}, scale]}]}
+    return expressions
+
+
+def _aggregate_to(collection, pipeline: list, destination_name: str) -> int:
+    """
+    Writes the output of a pipeline in a collection of the same database with $out
+
+    Returns:
+        The number of documents of the destination collection
+    """
+    collection.aggregate(pipeline + [{"$out": destination_name}], allowDiskUse=True)
+    return collection.database[destination_name].estimated_document_count()
+
+
+def apply_column_expressions(collection, expressions: dict, destination_name: str = None) -> int:
+    """
+    Sets columns to the result of expressions on every document, without moving the documents out of the database
+
+    Args:
+        collection: The collection
+        expressions: A dict mapping columns to aggregation expressions, all set in one pass
+        destination_name: The collection receiving the result, the collection itself if None
+
+    Returns:
+        The number of documents written
+
+    Description:
+        The documents go through a $set stage and a $out stage. When the collection is transformed in place,
+        the output is swapped in like bulk_writer.overwrite_dataframe does, so a failure leaves it unchanged.
+    """
+    pipeline = [{"$set": expressions}] if expressions else []
+    if destination_name is None or destination_name == collection.name:
+        if not expressions:
+            return collection.estimated_document_count()
+        return replace_collection(collection, lambda staging: _aggregate_to(collection, pipeline, staging.name))
+    return _aggregate_to(collection, pipeline, destination_name)
@@ -0,0 +1,258 @@
+import math
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .column_ops import is_plain_field
+from .dataset_loader import DEFAULT_BATCH_SIZE, iter_dataset_chunks, load_dataset
+from .mongodb_utils import DATABASE_NAME, connect_to_mongo
+from .progress_bus import start_phase
+from .stats_catalog import get_dataset_stats
+
+# Joins of mergeDB, like the how argument of pandas.merge
+JOIN_TYPES = ("inner", "outer", "left", "right", "cross")
+
+# Number of values of the two sides of a partition and of the output of each merge held in memory
+PARTITION_CELLS = 20000000
+
+# The partitions are files written on the way, one per partition and side
+MAX_PARTITIONS = 256
+
+
+def _normalize_keys(df: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """
+    Gets the keys of rows as strings, equal for the keys pandas matches (e.g. 1 and 1.0), empty when missing
+    """
+    normalized = {}
+    for key in keys:
+        values = df[key] if key in df else pd.Series(None, index=df.index, dtype=object)
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            numbers = values.astype(np.float64)
+        else:
+            numbers = pd.to_numeric(values, errors="coerce")
+        text = np.where(numbers.notna(), numbers.astype(str), np.where(values.isna(), "", values.astype(str)))
+        normalized[key] = text
+    return pd.DataFrame(normalized, index=df.index)
+
+
+def hash_keys(df: pd.DataFrame, keys: list) -> np.ndarray:
+    """
+    Hashes the join keys of rows, the rows of two datasets that pandas can match have the same hash
+
+    Returns:
+        The uint64 hashes, in the order of the rows
+    """
+    return pd.util.hash_pandas_object(_normalize_keys(df, keys), index=False).to_numpy()
+
+
+def get_key_counts(collection_name: str, keys: list, database_name: str = DATABASE_NAME) -> pd.Series:
+    """
+    Counts the rows of each key of a dataset collection
+
+    Args:
+        collection_name: The name of the collection containing the data
+        keys: The key columns
+        database_name: The name of the database
+
+    Returns:
+        The numbers of rows indexed by key hash (see hash_keys)
+
+    Description:
+        The rows are grouped by the database, only the keys and their counts are read. Keys that
+        are not field paths are read column by column instead.
+    """
+    if all(is_plain_field(key) for key in keys):
+        collection = connect_to_mongo(database_name)[collection_name]
+        group_id = {f"k{i}": "$" + key for i, key in enumerate(keys)}
+        documents = list(collection.aggregate([{"$group": {"_id": group_id, "count": {"$sum": 1}}}],
+                                              allowDiskUse=True))
+        groups = pd.DataFrame([document["_id"] for document in documents], columns=list(group_id))
+        groups.columns = keys
+        counts = pd.Series([document["count"] for document in documents], dtype=np.int64)
+        # Different values grouped apart by the database can have the same key for pandas, e.g. null and NaN
+        return counts.groupby(hash_keys(groups, keys)).sum()
+
+    counts = pd.Series(dtype=np.int64)
+    for chunk in iter_dataset_chunks(collection_name, keys, database_name=database_name):
+        counts = counts.add(pd.Series(hash_keys(chunk, keys)).value_counts(), fill_value=0)
+    return counts.astype(np.int64)
+
+
+def estimate_join_rows(left_counts: pd.Series, right_counts: pd.Series, how: str) -> int:
+    """
+    Computes the number of rows of a join from the numbers of rows of each key of its sides
+
+    Args:
+        left_counts: The numbers of rows of the left dataset, see get_key_counts
+        right_counts: The numbers of rows of the right dataset
+        how: One of JOIN_TYPES
+
+    Returns:
+        The exact number of rows of the join
+    """
+    if how == "cross":
+        return int(left_counts.sum()) * int(right_counts.sum())
+    left, right = left_counts.align(right_counts, fill_value=0)
+    matched = int((left * right).sum())
+    if how == "inner":
+        return matched
+    left_only, right_only = int(left[right == 0].sum()), int(right[left == 0].sum())
+    if how == "left":
+        return matched + left_only
+    if how == "right":
+        return matched + right_only
+    if how == "outer":
+        return matched + left_only + right_only
+    raise ValueError(f"The merge type is not valid: {how}")
+
+
+def _spill_partitions(collection_name: str, keys: list, partitions: int, folder: str, side: str,
+                      database_name: str):
+    """
+    Writes the rows of a dataset in one file per partition of their keys, as pickled chunks
+    """
+    total = connect_to_mongo(database_name)[collection_name].estimated_document_count()
+    phase = start_phase(f"Partitioning {collection_name}", total=total)
+    try:
+        for chunk in iter_dataset_chunks(collection_name, database_name=database_name):
+            chunk_partitions = hash_keys(chunk, keys) % np.uint64(partitions)
+            for partition in np.unique(chunk_partitions):
+                with open(os.path.join(folder, f"{side}_{partition}.pkl"), "ab") as f:
+                    pickle.dump(chunk[chunk_partitions == partition], f, protocol=pickle.HIGHEST_PROTOCOL)
+            phase.advance(len(chunk))
+    finally:
+        phase.close()
+
+
+def _read_partition(folder: str, side: str, partition: int, columns: list) -> pd.DataFrame:
+    """
+    Reads the rows of a partition written by _spill_partitions, an empty DataFrame with the columns if none
+    """
+    path = os.path.join(folder, f"{side}_{partition}.pkl")
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns)
+    chunks = []
+    with open(path, "rb") as f:
+        while True:
+            try:
+                chunks.append(pickle.load(f))
+            except EOFError:
+                break
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _align_key_dtypes(empty: pd.DataFrame, other: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """
+    Gives the keys of a side without rows the dtypes of the other side, pandas refuses to merge object and numeric keys
+    """
+    if len(empty) or not len(other):
+        return empty
+    return empty.astype({key: other[key].dtype for key in keys if key in other and key in empty})
+
+
+def _merge_partition(left: pd.DataFrame, right: pd.DataFrame, keys: list, how: str, max_fanout: int,
+                     n_columns: int):
+    """
+    Joins the two sides of a partition by slices of rows, so that each output is bounded by PARTITION_CELLS
+
+    Returns:
+        A generator of DataFrames
+    """
+    left = _align_key_dtypes(left, right, keys)
+    right = _align_key_dtypes(right, left, keys)
+    slice_rows = max(1, PARTITION_CELLS // max(1, n_columns * max_fanout))
+    # The output rows of a row of the sliced side only depend on that row
+    if how == "right":
+        for start in range(0, len(right), slice_rows):
+            yield pd.merge(left, right.iloc[start:start + slice_rows], on=keys, how="right")
+        return
+    for start in range(0, len(left), slice_rows):
+        yield pd.merge(left.iloc[start:start + slice_rows], right, on=keys, how="left" if how == "outer" else how)
+    if how == "outer":
+        matched = pd.MultiIndex.from_frame(left[keys]) if len(left) else pd.MultiIndex.from_arrays([[]] * len(keys))
+        unmatched = right[~pd.MultiIndex.from_frame(right[keys]).isin(matched)] if len(right) else right
+        if len(unmatched):
+            yield pd.merge(left.iloc[:0], unmatched, on=keys, how="right")
+
+
+def _iter_cross_join(left_name: str, right_name: str, n_columns: int, database_name: str):
+    """
+    Joins every row of a dataset with every row of another by blocks of rows of both datasets
+    """
+    right_rows = connect_to_mongo(database_name)[right_name].estimated_document_count()
+    block_rows = max(1, min(DEFAULT_BATCH_SIZE, int(math.sqrt(PARTITION_CELLS / max(1, n_columns)))))
+    if right_rows <= block_rows:
+        right = load_dataset(right_name, database_name=database_name)
+        for left in iter_dataset_chunks(left_name, batch_size=block_rows, database_name=database_name):
+            yield pd.merge(left, right, how="cross")
+        return
+    for left in iter_dataset_chunks(left_name, batch_size=block_rows, database_name=database_name):
+        for right in iter_dataset_chunks(right_name, batch_size=block_rows, database_name=database_name):
+            yield pd.merge(left, right, how="cross")
+
+
+def iter_join(left_name: str, right_name: str, keys: list, how: str, left_counts: pd.Series = None,
+              right_counts: pd.Series = None, database_name: str = DATABASE_NAME):
+    """
+    Joins two dataset collections like pandas.merge, with a bounded memory
+
+    Args:
+        left_name: The name of the left collection
+        right_name: The name of the right collection
+        keys: The columns to join on, ignored for the cross join
+        how: One of JOIN_TYPES
+        left_counts: The numbers of rows of each key of the left collection, see get_key_counts
+        right_counts: The numbers of rows of each key of the right collection
+        database_name: The name of the database
+
+    Returns:
+        A generator of the DataFrames of the joined rows
+
+    Description:
+        When the two datasets don't fit in PARTITION_CELLS, the rows of both are written in partitions of their
+        key hashes on the local disk, then each partition is joined in memory. The rows of a partition are joined
+        by slices small enough for their most frequent key. The rows are not in the order pandas gives them.
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError(f"The merge type is not valid: {how}")
+    left_columns = [column for column in get_dataset_stats(left_name, database_name).index if column != "_id"]
+    right_columns = [column for column in get_dataset_stats(right_name, database_name).index if column != "_id"]
+    n_columns = len(left_columns) + len(right_columns)
+    if how == "cross":
+        yield from _iter_cross_join(left_name, right_name, n_columns, database_name)
+        return
+
+    if left_counts is None:
+        left_counts = get_key_counts(left_name, keys, database_name)
+    if right_counts is None:
+        right_counts = get_key_counts(right_name, keys, database_name)
+    # A row of the side joined by slices has at most as many output rows as the largest key count of the other side
+    other_counts = left_counts if how == "right" else right_counts
+    max_fanout = int(other_counts.max()) if len(other_counts) else 1
+    cells = int(left_counts.sum()) * len(left_columns) + int(right_counts.sum()) * len(right_columns)
+    partitions = min(MAX_PARTITIONS, max(1, math.ceil(cells / PARTITION_CELLS)))
+
+    if partitions == 1:
+        left = load_dataset(left_name, database_name=database_name)
+        right = load_dataset(right_name, database_name=database_name)
+        yield from _merge_partition(left, right, keys, how, max_fanout, n_columns)
+        return
+
+    temporary_folder = os.path.expanduser(os.environ.get("MED_TMP", tempfile.gettempdir()))
+    os.makedirs(temporary_folder, exist_ok=True)
+    folder = tempfile.mkdtemp(prefix="med_join_", dir=temporary_folder)
+    try:
+        _spill_partitions(left_name, keys, partitions, folder, "left", database_name)
+        _spill_partitions(right_name, keys, partitions, folder, "right", database_name)
+        for partition in range(partitions):
+            left = _read_partition(folder, "left", partition, left_columns)
+            right = _read_partition(folder, "right", partition, right_columns)
+            if (not len(left) and how in ("inner", "left")) or (not len(right) and how in ("inner", "right")):
+                continue
+            yield from _merge_partition(left, right, keys, how, max_fanout, n_columns)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
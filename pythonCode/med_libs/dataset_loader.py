@@ -0,0 +1,262 @@
+import numpy as np
+import pandas as pd
+
+from .mongodb_utils import DATABASE_NAME, connect_to_mongo, get_dataset_version
+from .snapshot_cache import iter_snapshot_batches, read_snapshot, write_snapshot
+
+# Number of documents fetched and converted at once
+DEFAULT_BATCH_SIZE = 10000
+
+# Order of the rows of a dataset, the bulk writer gives increasing _id to the rows of a DataFrame
+ROW_ORDER = [('_id', 1)]
+
+
+def _get_projection(columns: list = None) -> dict:
+    """
+    Gets the MongoDB projection of the requested columns, the _id is never returned
+    """
+    projection = {'_id': False}
+    if columns is not None:
+        projection.update({column: True for column in columns})
+    return projection
+
+
+def _is_numpy_dtype(dtype) -> bool:
+    """
+    Checks if a column dtype can be stored in a typed numpy array (numbers, booleans and dates)
+    """
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufcmM"
+
+
+def _get_missing_value(dtype: np.dtype):
+    """
+    Gets the value used for the missing values of a column array
+    """
+    if dtype.kind in "mM":
+        return np.datetime64("NaT") if dtype.kind == "M" else np.timedelta64("NaT")
+    if dtype.kind in "fc":
+        return np.nan
+    return None
+
+
+def _get_merged_dtype(array_dtype: np.dtype, values_dtype, has_missing: bool) -> np.dtype:
+    """
+    Gets the dtype of a column array that must receive new values, the same way pandas infers the dtype of a column
+
+    Args:
+        array_dtype: The dtype of the column array
+        values_dtype: The dtype of the new values
+        has_missing: Whether the column array or the new values contain missing values
+
+    Returns:
+        The dtype of the column array
+    """
+    if not _is_numpy_dtype(values_dtype) or array_dtype == object:
+        return np.dtype(object)
+    if array_dtype.kind in "mM" or values_dtype.kind in "mM":
+        return array_dtype if array_dtype == values_dtype else np.dtype(object)
+    if array_dtype.kind == "b" or values_dtype.kind == "b":
+        # Booleans are only kept as booleans when they are never missing nor mixed with numbers
+        return np.dtype(bool) if array_dtype.kind == values_dtype.kind and not has_missing else np.dtype(object)
+    dtype = np.result_type(array_dtype, values_dtype)
+    if has_missing and dtype.kind in "iu":
+        dtype = np.dtype(np.float64)
+    return dtype
+
+
+class _ColumnBuffer:
+    """
+    This class is used to fill the preallocated array of a column chunk by chunk
+
+    Args:
+        capacity: The number of rows of the array
+    """
+
+    def __init__(self, capacity: int):
+        self.array = None
+        self.capacity = capacity
+        # Rows filled so far, the rows before a column first appears are missing
+        self.filled = 0
+        self.has_missing = False
+        # Rows of the column that are None before its first value, pandas keeps a column of None as object
+        self.none_rows = 0
+
+    def _reallocate(self, dtype: np.dtype, capacity: int):
+        """
+        Moves the filled rows to a new array of another dtype or capacity
+        """
+        array = np.empty(capacity, dtype=dtype)
+        if self.array is not None and self.filled:
+            array[:self.filled] = self.array[:self.filled]
+        self.array = array
+        self.capacity = capacity
+
+    def put(self, offset: int, values, capacity: int):
+        """
+        Writes the values of a chunk, the missing rows before the offset are filled
+
+        Args:
+            offset: The position of the first row of the chunk
+            values: The values of the chunk (pandas Series), None if the column is missing in the chunk
+            capacity: The capacity required for the array
+        """
+        size = capacity - offset if values is None else len(values)
+        if values is not None and values.isna().all():
+            if self.array is None and values.dtype == object and offset == self.none_rows:
+                self.none_rows += size
+            values = None
+        if values is None and self.array is None:
+            # The type of a column is only known once it has a value
+            self.has_missing = True
+            return
+        missing_before = offset > self.filled
+        has_missing = self.has_missing or missing_before or values is None or bool(values.isna().any())
+        values_dtype = np.dtype(np.float64) if values is None else values.dtype
+
+        if self.array is None:
+            dtype = values_dtype if _is_numpy_dtype(values_dtype) else np.dtype(object)
+            self._reallocate(_get_merged_dtype(dtype, values_dtype, has_missing), max(capacity, self.capacity))
+        else:
+            dtype = _get_merged_dtype(self.array.dtype, values_dtype, has_missing)
+            if dtype != self.array.dtype or capacity > self.capacity:
+                self._reallocate(dtype, max(capacity, self.capacity))
+        if missing_before:
+            self.array[self.filled:offset] = _get_missing_value(self.array.dtype)
+
+        if values is None:
+            self.array[offset:offset + size] = _get_missing_value(self.array.dtype)
+        elif self.array.dtype == object:
+            self.array[offset:offset + size] = values.to_numpy(dtype=object, na_value=None)
+        else:
+            self.array[offset:offset + size] = values.to_numpy()
+        self.filled = offset + size
+        self.has_missing = has_missing
+
+    def get(self, size: int) -> np.ndarray:
+        """
+        Gets the values of the first rows of the column
+        """
+        if self.array is None:
+            return np.full(size, None, dtype=object) if self.none_rows == size else np.full(size, np.nan)
+        if self.filled < size:
+            self.put(self.filled, None, size)
+        return self.array[:size]
+
+
+def _iter_mongo_chunks(collection_name: str, columns: list, filters: dict, batch_size: int, database_name: str,
+                       sort: list = ROW_ORDER):
+    """
+    Reads a dataset collection from MongoDB chunk by chunk, see iter_dataset_chunks
+    """
+    collection = connect_to_mongo(database_name)[collection_name]
+    cursor = collection.find(filters or {}, _get_projection(columns), batch_size=batch_size)
+    if sort:
+        cursor = cursor.sort(sort)
+    documents = []
+    for document in cursor:
+        documents.append(document)
+        if len(documents) == batch_size:
+            yield pd.DataFrame(documents)
+            documents = []
+    if documents:
+        yield pd.DataFrame(documents)
+
+
+def stitch_chunks(chunks, capacity: int, columns: list = None) -> pd.DataFrame:
+    """
+    Concatenates DataFrame chunks into one DataFrame with a preallocated array per column
+
+    Args:
+        chunks: An iterable of DataFrames
+        capacity: The expected number of rows, the arrays grow if there are more rows
+        columns: The order of the columns, the order of their first appearance if None
+
+    Returns:
+        The DataFrame, with the dtypes pandas would infer from the documents of all the chunks
+    """
+    buffers = {}
+    size = 0
+    for chunk in chunks:
+        capacity = max(capacity, size + len(chunk))
+        for column in chunk.columns:
+            if column not in buffers:
+                buffers[column] = _ColumnBuffer(capacity)
+            buffers[column].put(size, chunk[column], capacity)
+        size += len(chunk)
+
+    names = [column for column in columns if column in buffers] if columns is not None else list(buffers)
+    return pd.DataFrame({column: buffers[column].get(size) for column in names}, columns=names, copy=False)
+
+
+def iter_dataset_chunks(collection_name: str, columns: list = None, filters: dict = None,
+                        batch_size: int = DEFAULT_BATCH_SIZE, database_name: str = DATABASE_NAME):
+    """
+    Reads a dataset collection chunk by chunk
+
+    Args:
+        collection_name: The name of the collection containing the data
+        columns: The columns to read, all the columns if None
+        filters: A MongoDB query selecting the rows to read, all the rows if None
+        batch_size: The number of rows of each chunk
+        database_name: The name of the database
+
+    Returns:
+        A generator of DataFrames of at most batch_size rows, in the order of the rows (see ROW_ORDER)
+
+    Description:
+        Only one chunk of documents is held in memory at once. Without filters, the chunks are read
+        from the snapshot of the dataset when there is an up-to-date one.
+    """
+    if not filters:
+        version = get_dataset_version(collection_name, database_name)
+        batches = iter_snapshot_batches(database_name, collection_name, version, columns, batch_size)
+        if batches is not None:
+            yield from batches
+            return
+
+    yield from _iter_mongo_chunks(collection_name, columns, filters, batch_size, database_name)
+
+
+def load_dataset(collection_name: str, columns: list = None, filters: dict = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, database_name: str = DATABASE_NAME,
+                 use_cache: bool = True, max_workers: int = None) -> pd.DataFrame:
+    """
+    Loads a dataset collection as a DataFrame
+
+    Args:
+        collection_name: The name of the collection containing the data
+        columns: The columns to load, all the columns if None
+        filters: A MongoDB query selecting the rows to load, all the rows if None
+        batch_size: The number of documents converted at once
+        database_name: The name of the database
+        use_cache: Whether to read the dataset from its snapshot when it didn't change
+        max_workers: The number of partitions of the collection read concurrently, see parallel_reader
+
+    Returns:
+        The DataFrame, its rows are in the order of ROW_ORDER and its columns in the order of the requested columns
+        or of their first appearance
+
+    Description:
+        The documents are converted chunk by chunk into a preallocated array per column instead of building
+        the list of all the documents, so the peak memory stays close to the size of the DataFrame.
+        Large collections are split in _id ranges read concurrently. Whole datasets are saved as snapshots,
+        see snapshot_cache.
+    """
+    from .parallel_reader import read_dataset_parallel
+    version = None
+    if use_cache and not filters:
+        version = get_dataset_version(collection_name, database_name)
+        df = read_snapshot(database_name, collection_name, version, columns)
+        if df is not None:
+            return df
+
+    collection = connect_to_mongo(database_name)[collection_name]
+    capacity = collection.count_documents(filters or {})
+    df = read_dataset_parallel(collection_name, columns, filters, capacity, batch_size=batch_size,
+                               max_workers=max_workers, database_name=database_name)
+    if df is None:
+        # The collection is too small to be split or its _id can't be split in ranges
+        df = stitch_chunks(_iter_mongo_chunks(collection_name, columns, filters, batch_size, database_name), capacity, columns)
+    if version is not None and columns is None:
+        write_snapshot(database_name, collection_name, version, df)
+    return df
@@ -0,0 +1,317 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from .dataset_loader import DEFAULT_BATCH_SIZE, iter_dataset_chunks, load_dataset
+from .mongodb_utils import DATABASE_NAME, connect_to_mongo, get_dataset_version
+from .progress_bus import start_phase
+from .snapshot_cache import read_snapshot, write_snapshot
+
+# Suffix of the database name under which the decompositions are cached, database names can't contain dots
+PCA_CACHE_SUFFIX = ".pca"
+
+# Number of features up to which all the eigenvalues are computed from the covariance matrix
+EXACT_MAX_FEATURES = 1000
+
+# Number of components of the truncated decompositions of the wider datasets when fewer are requested
+DEFAULT_TRUNCATED_COMPONENTS = 100
+
+# Number of values up to which the features are decomposed in memory, the larger datasets are streamed
+IN_MEMORY_CELLS = 50000000
+
+# Columns of the transformation collections that are not components, one row per feature
+TRANSFORMATION_COLUMNS = ("feature", "mean", "std")
+
+
+class PCADecomposition:
+    """
+    This class holds the principal components of standardized features
+
+    Args:
+        features: The features, the constant ones are excluded
+        means: The means of the features
+        stds: The standard deviations of the features (ddof=1, like pandas)
+        eigenvalues: The variances of the components, in decreasing order
+        components: The components, one column per component and one row per feature
+        total_variance: The variance of all the standardized features, for the explained variance
+    """
+
+    def __init__(self, features: list, means: np.ndarray, stds: np.ndarray, eigenvalues: np.ndarray,
+                 components: np.ndarray, total_variance: float):
+        self.features = list(features)
+        self.means = means
+        self.stds = stds
+        self.eigenvalues = eigenvalues
+        self.components = components
+        self.total_variance = total_variance
+
+    @property
+    def n_components(self) -> int:
+        return len(self.eigenvalues)
+
+    def get_explained_variance(self) -> list:
+        """
+        Gets the cumulative ratio of the variance explained by the components
+        """
+        if not self.total_variance:
+            return []
+        return (np.cumsum(self.eigenvalues) / self.total_variance).tolist()
+
+    def get_transformation(self, n_components: int, column_prefix: str) -> pd.DataFrame:
+        """
+        Gets the transformation saved in a collection and used by project
+
+        Args:
+            n_components: The number of components
+            column_prefix: The prefix of the names of the components
+
+        Returns:
+            A DataFrame with one row per feature, its name, mean and standard deviation and its coefficients
+        """
+        transformation = pd.DataFrame({"feature": self.features, "mean": self.means, "std": self.stds})
+        for i in range(min(n_components, self.n_components)):
+            transformation[column_prefix + '_attr' + str(i)] = self.components[:, i]
+        return transformation
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Converts the decomposition to a DataFrame, for the snapshot cache
+        """
+        frame = pd.DataFrame({"feature": self.features, "mean": self.means, "std": self.stds})
+        frame["eigenvalue"] = np.append(self.eigenvalues, [np.nan] * (len(self.features) - self.n_components))
+        frame["total_variance"] = self.total_variance
+        for i in range(self.n_components):
+            frame[f"component_{i}"] = self.components[:, i]
+        return frame
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "PCADecomposition":
+        """
+        Creates a decomposition from the DataFrame of to_frame
+        """
+        eigenvalues = frame["eigenvalue"].to_numpy()
+        n_components = int(np.count_nonzero(~np.isnan(eigenvalues)))
+        components = frame[[f"component_{i}" for i in range(n_components)]].to_numpy()
+        total_variance = float(frame["total_variance"].iloc[0]) if len(frame) else 0.0
+        return cls(frame["feature"].tolist(), frame["mean"].to_numpy(), frame["std"].to_numpy(),
+                   eigenvalues[:n_components], components, total_variance)
+
+
+def _get_values(df: pd.DataFrame, columns: list) -> np.ndarray:
+    """
+    Gets the values of columns as floats, NaN when missing or not a number
+    """
+    values = np.full((len(df), len(columns)), np.nan)
+    for i, column in enumerate(columns):
+        if column in df:
+            values[:, i] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return values
+
+
+def _standardize(values: np.ndarray, means: np.ndarray, stds: np.ndarray) -> np.ndarray:
+    """
+    Standardizes values, the missing values are replaced by the mean (0)
+    """
+    standardized = (values - means) / stds
+    standardized[np.isnan(standardized)] = 0.0
+    return standardized
+
+
+def _sort_components(eigenvalues: np.ndarray, components: np.ndarray):
+    """
+    Sorts the components by decreasing eigenvalue and gives them a deterministic sign, the largest
+    coefficient of each component is positive
+    """
+    order = np.argsort(eigenvalues)[::-1]
+    eigenvalues, components = eigenvalues[order], components[:, order]
+    signs = np.sign(components[np.abs(components).argmax(axis=0), np.arange(components.shape[1])])
+    signs[signs == 0] = 1
+    return np.clip(eigenvalues, 0, None), components * signs
+
+
+def _get_truncated_components(n_components: int, n_features: int, n_rows: int) -> int:
+    """
+    Gets the number of components of a truncated decomposition
+    """
+    return max(1, min(max(n_components or 0, DEFAULT_TRUNCATED_COMPONENTS), n_features, n_rows))
+
+
+def _fit_in_memory(df: pd.DataFrame, columns: list, n_components: int = None) -> PCADecomposition:
+    """
+    Computes the principal components of columns of a DataFrame
+    """
+    values = _get_values(df, columns)
+    means = np.nanmean(values, axis=0) if len(values) else np.full(len(columns), np.nan)
+    stds = np.nanstd(values, axis=0, ddof=1) if len(values) > 1 else np.full(len(columns), np.nan)
+    # The constant columns (e.g. only 0 values) have no direction
+    keep = np.isfinite(stds) & (stds > 0)
+    features, means, stds = [column for column, kept in zip(columns, keep) if kept], means[keep], stds[keep]
+    if not features:
+        return PCADecomposition([], means, stds, np.zeros(0), np.zeros((0, 0)), 0.0)
+
+    standardized = _standardize(values[:, keep], means, stds)
+    n_rows = len(standardized)
+    total_variance = float(np.square(standardized).sum() / (n_rows - 1))
+    if len(features) <= EXACT_MAX_FEATURES:
+        # The covariance matrix is symmetric, its eigenvalues are real
+        eigenvalues, components = np.linalg.eigh(standardized.T @ standardized / (n_rows - 1))
+    else:
+        from sklearn.utils.extmath import randomized_svd
+        k = _get_truncated_components(n_components, len(features), n_rows)
+        _, singular_values, vt = randomized_svd(standardized, k, random_state=0)
+        eigenvalues, components = singular_values ** 2 / (n_rows - 1), vt.T
+    eigenvalues, components = _sort_components(eigenvalues, components)
+    return PCADecomposition(features, means, stds, eigenvalues, components, total_variance)
+
+
+def _fit_streaming(collection_name: str, columns: list, n_components: int = None,
+                   database_name: str = DATABASE_NAME) -> PCADecomposition:
+    """
+    Computes the principal components of columns of a dataset collection in two passes over its rows: the means
+    and standard deviations, then the covariance matrix or an IncrementalPCA for the wide datasets
+    """
+    total = connect_to_mongo(database_name)[collection_name].estimated_document_count()
+    counts, means, squares = np.zeros(len(columns)), np.zeros(len(columns)), np.zeros(len(columns))
+    phase = start_phase(f"Standardizing {collection_name}", total=total)
+    try:
+        for chunk in iter_dataset_chunks(collection_name, columns, database_name=database_name):
+            values = _get_values(chunk, columns)
+            # Merges the moments of the chunk with the moments of the previous rows (Chan et al.)
+            chunk_counts = np.count_nonzero(~np.isnan(values), axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                chunk_means = np.where(chunk_counts > 0, np.nansum(values, axis=0) / chunk_counts, 0.0)
+                chunk_squares = np.nansum(np.square(values - chunk_means), axis=0)
+                merged_counts = counts + chunk_counts
+                deltas = chunk_means - means
+                means = np.where(merged_counts > 0, means + deltas * chunk_counts / merged_counts, 0.0)
+                squares = np.where(merged_counts > 0,
+                                   squares + chunk_squares + deltas ** 2 * counts * chunk_counts / merged_counts, 0.0)
+            counts = merged_counts
+            phase.advance(len(chunk))
+    finally:
+        phase.close()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        stds = np.sqrt(squares / (counts - 1))
+    keep = np.isfinite(stds) & (stds > 0) & (counts > 1)
+    features, means, stds = [column for column, kept in zip(columns, keep) if kept], means[keep], stds[keep]
+    if not features:
+        return PCADecomposition([], means, stds, np.zeros(0), np.zeros((0, 0)), 0.0)
+
+    exact = len(features) <= EXACT_MAX_FEATURES
+    k = len(features) if exact else _get_truncated_components(n_components, len(features), total)
+    if exact:
+        gram = np.zeros((len(features), len(features)))
+    else:
+        from sklearn.decomposition import IncrementalPCA
+        incremental_pca = IncrementalPCA(n_components=k)
+    n_rows, squared_sum, pending = 0, 0.0, None
+    phase = start_phase(f"Computing the principal components of {collection_name}", total=total)
+    try:
+        for chunk in iter_dataset_chunks(collection_name, features, batch_size=max(DEFAULT_BATCH_SIZE, k),
+                                         database_name=database_name):
+            standardized = _standardize(_get_values(chunk, features), means, stds)
+            n_rows += len(standardized)
+            squared_sum += float(np.square(standardized).sum())
+            if exact:
+                gram += standardized.T @ standardized
+            elif pending is not None and len(standardized) < k:
+                # IncrementalPCA needs at least k rows per batch, the last chunk is fitted with the one before
+                pending = np.vstack([pending, standardized])
+            else:
+                if pending is not None:
+                    incremental_pca.partial_fit(pending)
+                pending = standardized
+            phase.advance(len(chunk))
+        if pending is not None:
+            incremental_pca.partial_fit(pending)
+    finally:
+        phase.close()
+
+    if exact:
+        eigenvalues, components = np.linalg.eigh(gram / (n_rows - 1))
+    else:
+        eigenvalues, components = incremental_pca.explained_variance_, incremental_pca.components_.T
+    eigenvalues, components = _sort_components(eigenvalues, components)
+    return PCADecomposition(features, means, stds, eigenvalues, components, squared_sum / (n_rows - 1))
+
+
+def _get_cache_key(collection_name: str, columns: list) -> str:
+    """
+    Gets the name under which the decomposition of columns of a collection is cached
+    """
+    columns_hash = hashlib.sha1("\x1f".join(str(column) for column in columns).encode("utf-8")).hexdigest()[:16]
+    return f"{collection_name}.{columns_hash}"
+
+
+def fit_pca(collection_name: str, columns: list, n_components: int = None,
+            database_name: str = DATABASE_NAME) -> PCADecomposition:
+    """
+    Computes the principal components of standardized columns of a dataset collection
+
+    Args:
+        collection_name: The name of the collection containing the data
+        columns: The columns, the constant ones are ignored
+        n_components: The number of components needed, all of them if None when there are at most
+            EXACT_MAX_FEATURES columns, DEFAULT_TRUNCATED_COMPONENTS otherwise
+        database_name: The name of the database
+
+    Returns:
+        The decomposition
+
+    Description:
+        The missing values are replaced by the mean of their column. Up to EXACT_MAX_FEATURES columns, the
+        eigenvalues of the covariance matrix are computed with eigh, otherwise a randomized SVD (or an
+        IncrementalPCA for the datasets larger than IN_MEMORY_CELLS) computes the first components only.
+        The decomposition is saved with the snapshots of the dataset, so the eigenvalues computed for the
+        preview are reused by the PCA of the same columns until the dataset changes.
+    """
+    version = get_dataset_version(collection_name, database_name)
+    cache_name = database_name + PCA_CACHE_SUFFIX
+    cache_key = _get_cache_key(collection_name, columns)
+    cached = read_snapshot(cache_name, cache_key, version)
+    if cached is not None:
+        decomposition = PCADecomposition.from_frame(cached)
+        if n_components is None or decomposition.n_components >= min(n_components, len(decomposition.features)):
+            return decomposition
+
+    n_rows = connect_to_mongo(database_name)[collection_name].estimated_document_count()
+    if n_rows * len(columns) <= IN_MEMORY_CELLS:
+        decomposition = _fit_in_memory(load_dataset(collection_name, columns=columns, database_name=database_name),
+                                       columns, n_components)
+    else:
+        decomposition = _fit_streaming(collection_name, columns, n_components, database_name)
+    write_snapshot(cache_name, cache_key, version, decomposition.to_frame())
+    return decomposition
+
+
+def project(df: pd.DataFrame, transformation: pd.DataFrame, columns: list = None) -> pd.DataFrame:
+    """
+    Projects rows on the components of a transformation (see PCADecomposition.get_transformation)
+
+    Args:
+        df: The rows
+        transformation: The transformation, one row per feature
+        columns: The columns projected, in the order of the rows of the transformation, the "feature" column of
+            the transformation if None. They can have other names than the features the transformation was
+            computed on, e.g. to apply it on another dataset.
+
+    Returns:
+        The DataFrame of the components of the rows, with the index of df
+
+    Description:
+        The features are standardized with the mean and the standard deviation of the transformation and
+        their missing values are replaced by the mean. The transformations saved without them project the
+        values as they are.
+    """
+    features = list(columns) if columns is not None else transformation["feature"].tolist()
+    if len(features) != len(transformation):
+        raise ValueError(f"{len(features)} columns selected for a transformation of {len(transformation)} features")
+    component_columns = [column for column in transformation.columns if column not in TRANSFORMATION_COLUMNS]
+    values = _get_values(df, features)
+    if "mean" in transformation and "std" in transformation:
+        values = _standardize(values, transformation["mean"].to_numpy(dtype=np.float64),
+                              transformation["std"].to_numpy(dtype=np.float64))
+    projected = values @ transformation[component_columns].to_numpy(dtype=np.float64)
+    return pd.DataFrame(projected, columns=component_columns, index=df.index)
@@ -0,0 +1,315 @@
+import numpy as np
+import pandas as pd
+
+from .dataset_loader import DEFAULT_BATCH_SIZE, iter_dataset_chunks
+from .mongodb_utils import DATABASE_NAME
+from .progress_bus import start_phase
+from .stats_catalog import get_dataset_stats, get_missing_mask, hash_positions, hash_values
+
+# Default thresholds of the near-duplicate columns: absolute Pearson correlation of the numeric columns
+# and estimated fraction of equal rows of the other columns
+DEFAULT_CORRELATION_THRESHOLD = 0.95
+DEFAULT_SIMILARITY_THRESHOLD = 0.9
+
+# Number of bins of the MinHash signatures, the similarities are estimated within about 1 / sqrt(MINHASH_BINS)
+MINHASH_BINS = 128
+
+# Number of values of each chunk read, so that the chunks of wide tables fit in memory
+CHUNK_CELLS = 5000000
+
+# Number of rows of the correlation matrix computed at once
+CORRELATION_BLOCK_ROWS = 256
+
+# Minimum number of rows where two columns have values to compare them
+MIN_OVERLAP_ROWS = 30
+
+_EMPTY_BIN = np.iinfo(np.uint64).max
+
+
+def is_numeric_dtype(dtype: str) -> bool:
+    """
+    Checks if a dtype of the statistics catalog is numeric (booleans, integers and floats)
+    """
+    try:
+        return pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))
+    except TypeError:
+        return False
+
+
+def find_duplicate_columns(stats: pd.DataFrame) -> list:
+    """
+    Finds the columns having the same values in all the rows
+
+    Args:
+        stats: The statistics of the columns, see stats_catalog.get_dataset_stats
+
+    Returns:
+        The list of [column, duplicate] pairs, column being the first column having the values of duplicate
+    """
+    first_columns = {}
+    duplicates = []
+    for column, value_hash in stats["hash"].items():
+        if column == "_id":
+            continue
+        if value_hash in first_columns:
+            duplicates.append([first_columns[value_hash], column])
+        else:
+            first_columns[value_hash] = column
+    return duplicates
+
+
+class ColumnSimilarityAccumulator:
+    """
+    This class is used to compare the columns of a dataset chunk by chunk
+
+    Args:
+        numeric_columns: The columns compared with their Pearson correlation
+        categorical_columns: The columns compared with the MinHash signatures of their (row, value) pairs
+        incomplete_columns: The numeric columns having missing values, all of them if None
+        bins: The number of bins of the MinHash signatures
+
+    Description:
+        The correlations are computed on the rows where both columns have values, like pandas does. The
+        sums over these rows are only kept for the incomplete columns, so complete wide tables only need
+        the Gram matrix of their values.
+    """
+
+    def __init__(self, numeric_columns: list, categorical_columns: list, incomplete_columns: list = None,
+                 bins: int = MINHASH_BINS):
+        self.numeric_columns = list(numeric_columns)
+        self.categorical_columns = list(categorical_columns)
+        if incomplete_columns is None:
+            incomplete_columns = self.numeric_columns
+        incomplete_columns = set(incomplete_columns)
+        self.incomplete = np.array([i for i, column in enumerate(self.numeric_columns) if column in incomplete_columns],
+                                   dtype=np.intp)
+        self.bins = bins
+        self.rows = 0
+
+        n_numeric, n_incomplete = len(self.numeric_columns), len(self.incomplete)
+        # The values are shifted by the mean of their first chunk for the accuracy of the sums
+        self.shifts = np.full(n_numeric, np.nan)
+        self.counts = np.zeros(n_numeric)
+        self.sums = np.zeros(n_numeric)
+        self.gram = np.zeros((n_numeric, n_numeric))
+        # Sums of the values and of their squares over the rows where each incomplete column has values
+        self.masked_sums = np.zeros((n_numeric, n_incomplete))
+        self.masked_squares = np.zeros((n_numeric, n_incomplete))
+        self.pair_counts = np.zeros((n_incomplete, n_incomplete))
+        self.signatures = np.full((len(self.categorical_columns), bins), _EMPTY_BIN, dtype=np.uint64)
+
+    def _get_numeric_values(self, chunk: pd.DataFrame) -> np.ndarray:
+        """
+        Gets the values of the numeric columns of a chunk as floats, NaN when missing
+        """
+        values = np.full((len(chunk), len(self.numeric_columns)), np.nan)
+        for i, column in enumerate(self.numeric_columns):
+            if column not in chunk:
+                continue
+            series = chunk[column]
+            if not pd.api.types.is_numeric_dtype(series.dtype):
+                series = pd.to_numeric(series, errors="coerce")
+            values[:, i] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        return values
+
+    def add(self, chunk: pd.DataFrame):
+        """
+        Adds the rows of a chunk, they follow the rows already added
+
+        Args:
+            chunk: The DataFrame of the rows
+        """
+        if self.numeric_columns:
+            values = self._get_numeric_values(chunk)
+            present = ~np.isnan(values)
+            new = np.isnan(self.shifts) & present.any(axis=0)
+            if new.any():
+                self.shifts[new] = np.nanmean(values[:, new], axis=0)
+            # The missing values are 0, so the products only count the rows where both columns have values
+            centered = np.where(present, values - self.shifts, 0.0)
+            self.counts += present.sum(axis=0)
+            self.sums += centered.sum(axis=0)
+            self.gram += centered.T @ centered
+            if len(self.incomplete):
+                masks = present[:, self.incomplete].astype(np.float64)
+                self.masked_sums += centered.T @ masks
+                self.masked_squares += np.square(centered).T @ masks
+                self.pair_counts += masks.T @ masks
+
+        positions = np.arange(self.rows, self.rows + len(chunk), dtype=np.uint64)
+        bin_bits = self.bins.bit_length() - 1
+        for i, column in enumerate(self.categorical_columns):
+            if column not in chunk:
+                continue
+            values = chunk[column]
+            present = ~get_missing_mask(values)
+            hashes = hash_positions(hash_values(values[present]), positions[present])
+            # One permutation hashing: the low bits give the bin, the others the value kept if minimal
+            np.minimum.at(self.signatures[i], (hashes & np.uint64(self.bins - 1)).astype(np.intp),
+                          hashes >> np.uint64(bin_bits))
+        self.rows += len(chunk)
+
+    def _get_correlation_block(self, start: int, stop: int) -> np.ndarray:
+        """
+        Computes the rows start to stop of the correlation matrix of the numeric columns
+        """
+        n_numeric = len(self.numeric_columns)
+        squares = np.diag(self.gram)
+        incomplete_positions = np.full(n_numeric, -1, dtype=np.intp)
+        incomplete_positions[self.incomplete] = np.arange(len(self.incomplete))
+
+        # Sums over the rows where both columns have values, the sums over all the rows when the other is complete
+        counts = np.tile(self.counts[start:stop, None], (1, n_numeric))
+        sums_i = np.tile(self.sums[start:stop, None], (1, n_numeric))
+        squares_i = np.tile(squares[start:stop, None], (1, n_numeric))
+        sums_j = np.tile(self.sums, (stop - start, 1))
+        squares_j = np.tile(squares, (stop - start, 1))
+        counts[:, self.incomplete] = np.minimum(counts[:, self.incomplete], self.counts[self.incomplete])
+        sums_i[:, self.incomplete] = self.masked_sums[start:stop]
+        squares_i[:, self.incomplete] = self.masked_squares[start:stop]
+        block_rows = np.flatnonzero(incomplete_positions[start:stop] >= 0)
+        if len(block_rows):
+            positions = incomplete_positions[start + block_rows]
+            counts[block_rows] = np.minimum(counts[block_rows], self.counts)
+            sums_j[block_rows] = self.masked_sums[:, positions].T
+            squares_j[block_rows] = self.masked_squares[:, positions].T
+            counts[np.ix_(block_rows, self.incomplete)] = self.pair_counts[positions]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariances = counts * self.gram[start:stop] - sums_i * sums_j
+            variances = (counts * squares_i - sums_i ** 2) * (counts * squares_j - sums_j ** 2)
+            correlations = covariances / np.sqrt(np.clip(variances, 0, None))
+        correlations[counts < MIN_OVERLAP_ROWS] = np.nan
+        return correlations
+
+    def get_correlated_pairs(self, threshold: float) -> list:
+        """
+        Gets the pairs of numeric columns whose absolute correlation is at least threshold
+
+        Returns:
+            The list of (column1, column2, correlation), column1 being before column2
+        """
+        pairs = []
+        for start in range(0, len(self.numeric_columns), CORRELATION_BLOCK_ROWS):
+            stop = min(start + CORRELATION_BLOCK_ROWS, len(self.numeric_columns))
+            # Constant columns have a NaN correlation, never above the threshold
+            correlations = self._get_correlation_block(start, stop)
+            rows, columns = np.nonzero(np.abs(correlations) >= threshold)
+            for row, column in zip(rows, columns):
+                if column > start + row:
+                    pairs.append((self.numeric_columns[start + row], self.numeric_columns[column],
+                                  float(min(max(correlations[row, column], -1), 1))))
+        return pairs
+
+    def get_similar_pairs(self, threshold: float) -> list:
+        """
+        Gets the pairs of categorical columns whose estimated fraction of equal rows is at least threshold
+
+        Returns:
+            The list of (column1, column2, similarity), column1 being before column2
+
+        Description:
+            The signatures estimate the Jaccard index J of the (row, value) pairs of two columns. With k equal
+            rows among n1 and n2 values, J = k / (n1 + n2 - k), so the fraction of equal rows k / ((n1 + n2) / 2)
+            is 2J / (1 + J).
+        """
+        pairs = []
+        empty = self.signatures == _EMPTY_BIN
+        for i in range(len(self.categorical_columns) - 1):
+            both_empty = empty[i] & empty[i + 1:]
+            matches = ((self.signatures[i] == self.signatures[i + 1:]) & ~both_empty).sum(axis=1)
+            compared = self.bins - both_empty.sum(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                jaccard = matches / compared
+                similarities = 2 * jaccard / (1 + jaccard)
+            for j in np.flatnonzero(similarities >= threshold):
+                pairs.append((self.categorical_columns[i], self.categorical_columns[i + 1 + j], float(similarities[j])))
+        return pairs
+
+
+def get_pruning_candidates(duplicates: list, near_duplicates: list, columns: list) -> list:
+    """
+    Chooses the columns that can be dropped, keeping one column of each group of (near-)duplicate columns
+
+    Args:
+        duplicates: The [column, duplicate] pairs, see find_duplicate_columns
+        near_duplicates: The near-duplicate pairs, dicts with "column1", "column2", "score" and "method"
+        columns: The columns of the dataset, in their order
+
+    Returns:
+        The list of dicts with the "column" that can be dropped, the column to "keep", the "method" and the "score"
+
+    Description:
+        The pairs are taken from the most to the least similar one, the column that comes later in the
+        dataset is dropped when none of the two columns is already dropped.
+    """
+    order = {column: position for position, column in enumerate(columns)}
+    pairs = [(1.0, "duplicate", first, second) for first, second in duplicates]
+    pairs += [(abs(pair["score"]), pair["method"], pair["column1"], pair["column2"]) for pair in near_duplicates]
+    pairs.sort(key=lambda pair: (-pair[0], order[pair[2]], order[pair[3]]))
+
+    dropped = {}
+    for score, method, first, second in pairs:
+        if first in dropped or second in dropped:
+            continue
+        keep, drop = (first, second) if order[first] <= order[second] else (second, first)
+        dropped[drop] = {"column": drop, "keep": keep, "method": method, "score": round(score, 4)}
+    return [dropped[column] for column in columns if column in dropped]
+
+
+def detect_duplicate_columns(collection_name: str, near_duplicates: bool = True,
+                             correlation_threshold: float = DEFAULT_CORRELATION_THRESHOLD,
+                             similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                             database_name: str = DATABASE_NAME) -> dict:
+    """
+    Finds the duplicate and the near-duplicate columns of a dataset collection over all its rows
+
+    Args:
+        collection_name: The name of the collection containing the data
+        near_duplicates: Whether to look for near-duplicate columns, which reads the rows once
+        correlation_threshold: The minimum absolute correlation of near-duplicate numeric columns
+        similarity_threshold: The minimum fraction of equal rows of near-duplicate categorical columns
+        database_name: The name of the database
+
+    Returns:
+        A dict with the "duplicates" pairs (see find_duplicate_columns), the "nearDuplicates" and the
+        "pruningCandidates" (see get_pruning_candidates)
+
+    Description:
+        The duplicates come from the hashes of the statistics catalog. Only the first column of each group of
+        duplicates is compared with the other columns, in one pass over the rows.
+    """
+    stats = get_dataset_stats(collection_name, database_name)
+    stats = stats[stats.index != "_id"]
+    columns = list(stats.index)
+    duplicates = find_duplicate_columns(stats)
+    near_pairs = []
+
+    duplicated = {duplicate for _, duplicate in duplicates}
+    # The columns without values can't be compared
+    compared = [column for column in columns
+                if column not in duplicated and stats.at[column, "nulls"] < stats.at[column, "rows"]]
+    if near_duplicates and len(compared) > 1:
+        numeric = [column for column in compared if is_numeric_dtype(stats.at[column, "dtype"])]
+        categorical = [column for column in compared if not is_numeric_dtype(stats.at[column, "dtype"])]
+        incomplete = [column for column in numeric if stats.at[column, "nulls"]]
+        accumulator = ColumnSimilarityAccumulator(numeric, categorical, incomplete)
+        batch_size = min(DEFAULT_BATCH_SIZE, max(1, CHUNK_CELLS // len(compared)))
+        phase = start_phase(f"Comparing the columns of {collection_name}", total=int(stats["rows"].max()))
+        try:
+            for chunk in iter_dataset_chunks(collection_name, compared, batch_size=batch_size,
+                                             database_name=database_name):
+                accumulator.add(chunk)
+                phase.advance(len(chunk))
+        finally:
+            phase.close()
+        near_pairs = [{"column1": first, "column2": second, "score": round(score, 4), "method": "correlation"}
+                      for first, second, score in accumulator.get_correlated_pairs(correlation_threshold)]
+        near_pairs += [{"column1": first, "column2": second, "score": round(score, 4), "method": "similarity"}
+                       for first, second, score in accumulator.get_similar_pairs(similarity_threshold)]
+
+    return {
+        "duplicates": duplicates,
+        "nearDuplicates": near_pairs,
+        "pruningCandidates": get_pruning_candidates(duplicates, near_pairs, columns)
+    }
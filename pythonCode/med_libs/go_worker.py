@@ -0,0 +1,231 @@
+import argparse
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent))
+from med_libs.GoExecutionScript import SCRIPTS_REGISTRY, GoExecutionScript
+from med_libs.server_utils import go_print
+
+# Heavy dependencies imported once by the worker so that the jobs don't pay their import time
+DEFAULT_PRELOADED_MODULES = [
+    "numpy",
+    "pandas",
+    "pymongo",
+    "sklearn",
+    "pycaret.classification",
+    "pycaret.regression",
+]
+
+
+def preload_modules(module_names: list) -> None:
+    """
+    Imports the heavy dependencies once so that every job can reuse them
+
+    Args:
+        module_names: The names of the modules to import
+    """
+    for module_name in module_names:
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            # A missing optional dependency must not prevent the worker from starting
+            go_print(f"worker: could not preload {module_name}: {e}")
+
+
+class GoExecScriptLoadingError(GoExecutionScript):
+    """
+        This class is used to report a job whose script could not be loaded by the worker
+
+        Args:
+            json_params: The input json params
+            _id: The id of the page that made the request if any
+            error: The error raised while loading the script
+    """
+
+    def __init__(self, json_params: dict, _id: str = None, error: BaseException = None):
+        super().__init__(json_params, _id)
+        self._error = error
+
+    def _custom_process(self, json_config: dict) -> dict:
+        raise self._error
+
+
+def load_script(script_path: str) -> tuple:
+    """
+    Imports a script module without executing it and returns its registered GoExecutionScript subclass
+
+    Args:
+        script_path: The path of the python script
+
+    Returns:
+        A tuple of the GoExecutionScript subclass and its constructor kwargs
+    """
+    script_path = os.path.abspath(script_path)
+    if script_path not in SCRIPTS_REGISTRY:
+        module_name = "go_worker_job_" + hashlib.md5(script_path.encode()).hexdigest()
+        spec = importlib.util.spec_from_file_location(module_name, script_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+        if script_path not in SCRIPTS_REGISTRY:
+            raise ValueError(f"The script {script_path} does not register a GoExecutionScript with run_script")
+    return SCRIPTS_REGISTRY[script_path]
+
+
+def run_job(request: dict) -> None:
+    """
+    Runs a job request in the current process, the job output is written to stdout like a spawned script
+
+    Args:
+        request: The job request containing the script path, the json params, the id and optionally
+            the profile destination ("file" or "mongo")
+    """
+    id_ = request.get("id", "default_id")
+    try:
+        script_class, kwargs = load_script(request["script"])
+        json_params = request.get("json_param", {})
+        if isinstance(json_params, str):
+            json_params = json.loads(json_params)
+    except BaseException as e:
+        GoExecScriptLoadingError({}, id_, error=e).start()
+        return
+    go_print(f"running {os.path.basename(request['script'])}:{id_}")
+    script_class(json_params, id_, **kwargs).start(profile=request.get("profile"))
+
+
+def serve_stdin() -> None:
+    """
+    Reads one json job request per line on stdin and runs the jobs sequentially
+    """
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request = json.loads(line)
+        run_job(request)
+        go_print(f"job-done*_*{request.get('id', 'default_id')}")
+
+
+def _reap_children() -> None:
+    """
+    Collects the exit status of the finished job processes
+    """
+    try:
+        while True:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+    except ChildProcessError:
+        pass
+
+
+def _read_request(connection: socket.socket) -> dict:
+    """
+    Reads the json job request line sent on a connection and warms its script module
+
+    Args:
+        connection: The accepted client connection
+
+    Returns:
+        The job request
+    """
+    with connection.makefile("r", encoding="utf-8") as reader:
+        request = json.loads(reader.readline())
+    try:
+        # Imported in the worker itself so that the following jobs of the same script reuse the module
+        load_script(request["script"])
+    except BaseException:
+        # The error is reported to the client by the job itself
+        pass
+    return request
+
+
+def _run_connection_job(connection: socket.socket, request: dict) -> None:
+    """
+    Runs a job request in a forked process, the job output is streamed back on the connection it was received from
+
+    Args:
+        connection: The client connection
+        request: The job request
+
+    Description:
+        The pid of the process is sent first so that Go can kill the job, closing the connection doesn't stop it.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(connection.fileno(), sys.stdout.fileno())
+    os.dup2(connection.fileno(), sys.stderr.fileno())
+    go_print(f"worker-pid*_*{request.get('id', 'default_id')}*_*{os.getpid()}")
+    run_job(request)
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+
+def serve_socket(port: int) -> None:
+    """
+    Listens on a local port, every connection carries one json job request line
+
+    Args:
+        port: The port to listen to, 0 to let the OS pick a free one
+
+    Description:
+        Each job runs in a process forked from the warm worker so jobs are isolated and can run concurrently.
+        The job output is written to the connection through the stdout file descriptor, which requires a
+        POSIX system: elsewhere the worker exits before being ready and Go starts a process for every script.
+    """
+    if not hasattr(os, "fork"):
+        go_print("worker: the python worker requires os.fork, the scripts run in their own process")
+        return
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", port))
+    server.listen()
+    go_print(f"worker-ready*_*{server.getsockname()[1]}")
+    while True:
+        connection, _ = server.accept()
+        try:
+            request = _read_request(connection)
+        except (OSError, ValueError) as e:
+            go_print(f"worker: invalid job request: {e}")
+            connection.close()
+            continue
+        _reap_children()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            server.close()
+            try:
+                _run_connection_job(connection, request)
+            finally:
+                os._exit(0)
+        connection.close()
+
+
+def main() -> None:
+    """
+    Starts the warm python worker
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--preload', type=str, default=",".join(DEFAULT_PRELOADED_MODULES))
+    args = parser.parse_args()
+    preload_modules([name for name in args.preload.split(",") if name])
+    if args.port is None:
+        serve_stdin()
+    else:
+        serve_socket(args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from .dataset_loader import ROW_ORDER, load_dataset
+from .input_utils.dataframe_utilities import assert_no_nan_values_for_each_column, clean_columns
+from .input_utils.imputation import MODEL_FILL_METHODS
+from .mongodb_utils import DATABASE_NAME, connect_to_mongo
+
+# Number of _id matched by each aggregation, so that the pipelines stay far below the 16 MB BSON limit
+MATCH_BATCH_IDS = 100000
+
+
+def load_split_columns(collection_name: str, columns: list, database_name: str = DATABASE_NAME) -> tuple:
+    """
+    Loads the _id and some columns of a dataset collection, the rest of the documents is not fetched
+
+    Args:
+        collection_name: The name of the collection containing the data
+        columns: The columns
+        database_name: The name of the database
+
+    Returns:
+        The list of the _id and the DataFrame of the columns, both in the order of the rows
+    """
+    collection = connect_to_mongo(database_name)[collection_name]
+    # Covered by the _id index, the documents are not fetched
+    cursor = collection.find({}, {'_id': True}, batch_size=100000).sort(ROW_ORDER)
+    ids = [document['_id'] for document in cursor]
+    df = load_dataset(collection_name, columns=columns, database_name=database_name) if columns \
+        else pd.DataFrame(index=pd.RangeIndex(len(ids)))
+    return ids, df
+
+
+def split_rows(df: pd.DataFrame, holdout_size: float, shuffle: bool, stratify_columns: list, random_state: int,
+               nan_method: str) -> tuple:
+    """
+    Splits the rows of a dataset in a learning set and a holdout set, like train_test_split on the dataset
+
+    Args:
+        df: The DataFrame of the stratification columns of all the rows, see load_split_columns
+        holdout_size: The fraction of the rows in the holdout set
+        shuffle: Whether to shuffle the rows, the split is stratified with stratify_columns if they are given
+        stratify_columns: The stratification columns, empty to not stratify
+        random_state: The seed of the split
+        nan_method: How the missing values of the stratification columns are handled, 'drop' to drop their
+            rows or a method of dataframe_utilities.clean_columns. The model fills are not supported, they
+            need the other numeric columns of the dataset.
+
+    Returns:
+        The positions of the learning rows, the positions of the holdout rows and the cleaned stratification
+        columns of the kept rows (indexed by position)
+    """
+    from sklearn.model_selection import train_test_split
+    if nan_method in MODEL_FILL_METHODS:
+        raise ValueError(f"The {nan_method} is not supported for the stratification columns")
+    cleaned = df
+    if stratify_columns and df[stratify_columns].isnull().values.any():
+        cleaned = clean_columns(df.copy(), stratify_columns, "drop empty" if nan_method == 'drop' else nan_method)
+
+    stratify_df = cleaned.loc[:, stratify_columns].copy() if stratify_columns else None
+    if stratify_df is not None:
+        assert_no_nan_values_for_each_column(stratify_df)
+
+    positions = cleaned.index.to_numpy()
+    if shuffle:
+        learning, holdout = train_test_split(positions, test_size=holdout_size, random_state=random_state,
+                                             stratify=stratify_df, shuffle=shuffle)
+    else:
+        learning, holdout = train_test_split(positions, test_size=holdout_size, random_state=random_state)
+    return learning, holdout, cleaned
+
+
+def copy_rows(collection, ids: list, destination_name: str) -> int:
+    """
+    Copies documents of a collection in another collection of the same database, with $match on their _id
+    and $out (or $merge by batches of MATCH_BATCH_IDS), the documents don't leave the database
+
+    Args:
+        collection: The collection containing the documents
+        ids: The _id of the documents
+        destination_name: The name of the destination collection
+
+    Returns:
+        The number of documents of the destination collection
+    """
+    if len(ids) <= MATCH_BATCH_IDS:
+        collection.aggregate([{"$match": {"_id": {"$in": ids}}}, {"$out": destination_name}], allowDiskUse=True)
+    else:
+        for start in range(0, len(ids), MATCH_BATCH_IDS):
+            collection.aggregate([
+                {"$match": {"_id": {"$in": ids[start:start + MATCH_BATCH_IDS]}}},
+                {"$merge": {"into": destination_name, "whenMatched": "fail", "whenNotMatched": "insert"}}
+            ], allowDiskUse=True)
+    return collection.database[destination_name].estimated_document_count()
+
+
+def set_filled_values(collections: list, ids: list, original: pd.DataFrame, cleaned: pd.DataFrame, columns: list):
+    """
+    Writes the values filled by the cleaning of the stratification columns in the copied documents
+
+    Args:
+        collections: The collections containing the copied documents
+        ids: The _id of all the rows, by position
+        original: The stratification columns before the cleaning, indexed by position
+        cleaned: The stratification columns after the cleaning, indexed by position
+        columns: The stratification columns
+    """
+    for column in columns:
+        filled = cleaned[column][original.loc[cleaned.index, column].isna() & cleaned[column].notna()]
+        # One update per filled value, e.g. a single one for the mean or the mode
+        for value, positions in filled.groupby(filled, sort=False).groups.items():
+            value = value.item() if isinstance(value, np.generic) else value
+            value_ids = [ids[position] for position in positions]
+            for start in range(0, len(value_ids), MATCH_BATCH_IDS):
+                for collection in collections:
+                    collection.update_many({"_id": {"$in": value_ids[start:start + MATCH_BATCH_IDS]}},
+                                           {"$set": {column: value}})
+
+
+def create_holdout_set(collection_name: str, learning_name: str, holdout_name: str, holdout_size: float,
+                       shuffle: bool, stratify_columns: list, random_state: int, nan_method: str,
+                       database_name: str = DATABASE_NAME) -> tuple:
+    """
+    Splits a dataset collection in a learning collection and a holdout collection
+
+    Args:
+        collection_name: The name of the collection containing the data
+        learning_name: The name of the learning collection
+        holdout_name: The name of the holdout collection
+        holdout_size: The fraction of the rows in the holdout set
+        shuffle: Whether to shuffle the rows, see split_rows
+        stratify_columns: The stratification columns, empty to not stratify
+        random_state: The seed of the split
+        nan_method: How the missing values of the stratification columns are handled, see split_rows
+        database_name: The name of the database
+
+    Returns:
+        The numbers of rows of the learning and of the holdout collections
+
+    Description:
+        Only the _id and the stratification columns are read, the rows are split like train_test_split does
+        on the whole dataset, then each collection is written by the database from the _id of its rows. The
+        rows keep their _id and their order in the dataset.
+    """
+    collection = connect_to_mongo(database_name)[collection_name]
+    ids, df = load_split_columns(collection_name, stratify_columns, database_name)
+    learning, holdout, cleaned = split_rows(df, holdout_size, shuffle, stratify_columns, random_state, nan_method)
+
+    learning_rows = copy_rows(collection, [ids[position] for position in np.sort(learning)], learning_name)
+    holdout_rows = copy_rows(collection, [ids[position] for position in np.sort(holdout)], holdout_name)
+    if cleaned is not df:
+        set_filled_values([collection.database[learning_name], collection.database[holdout_name]],
+                          ids, df, cleaned, stratify_columns)
+    return learning_rows, holdout_rows
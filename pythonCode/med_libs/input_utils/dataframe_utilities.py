@@ -1,8 +1,7 @@
 
 import pandas as pd
-import numpy as np
-import math
-from bson import ObjectId
+
+from .imputation import FILL_METHODS, fill_missing
 
 def assert_no_nan_values_for_each_column(df: pd.DataFrame, cols: list = None):
     """
@@ -113,7 +112,7 @@ def clean_columns(df: pd.DataFrame, columns:list, method:str):
     Args:
         df: DataFrame to handle
         columns: The columns to clean
-        method: The method to use for cleaning
+        method: The method to use for cleaning, 'drop', 'drop empty' or one of imputation.FILL_METHODS
 
     Returns: Handled DataFrame
     """
@@ -121,19 +120,8 @@ def clean_columns(df: pd.DataFrame, columns:list, method:str):
         df = df.drop(columns=columns)
     elif method == 'drop empty':
         df = df.dropna(subset=columns)
-    elif method == "random fill":
-        for column in columns:
-            df.loc[:, column] = df.loc[:, column].fillna(np.random.choice(df.loc[:, column][~df.loc[:, column].isna()]))
-    elif method == "mean fill":
-        df.loc[:, columns] = df.loc[:, columns].fillna(df.loc[:, columns].mean())
-    elif method == "median fill":
-        df.loc[:, columns] = df.loc[:, columns].fillna(df.loc[:, columns].median())
-    elif method == "mode fill":
-        df.loc[:, columns] = df.loc[:, columns].fillna(df.loc[:, columns].mode().iloc[0])
-    elif method == "bfill":
-        df.loc[:, columns] = df.loc[:, columns].bfill()
-    elif method == "ffill":
-        df.loc[:, columns] = df.loc[:, columns].ffill()
+    elif method in FILL_METHODS:
+        df = fill_missing(df, columns, method)
     return df
 
 def clean_rows(df: pd.DataFrame, rows:list, method:str):
@@ -142,26 +130,12 @@ def clean_rows(df: pd.DataFrame, rows:list, method:str):
     Args:
         df: DataFrame to handle
         rows: The rows to clean
-        method: The method to use for cleaning
+        method: The method to use for cleaning, 'drop' or one of imputation.FILL_METHODS
 
     Returns: Handled DataFrame
     """
     if method == 'drop':
         df = df.drop(index=rows)
-    elif method == "random fill":
-        for row in rows:
-            for column in df.columns:
-                value = df.loc[row, column]
-                if not isinstance(value, ObjectId) and math.isnan(value):
-                    df.loc[row, column] = np.random.choice(df.loc[:, column][~df.loc[:, column].isna()])
-    elif method == "mean fill":
-        df.loc[rows] = df.loc[rows].fillna(df.mean())
-    elif method == "median fill":
-        df.loc[rows] = df.loc[rows].fillna(df.median())
-    elif method == "mode fill":
-        df.loc[rows] = df.loc[rows].fillna(df.mode().iloc[0])
-    elif method == "bfill":
-        df.loc[rows] = df.bfill().loc[rows]
-    elif method == "ffill":
-        df.loc[rows] = df.ffill().loc[rows]
+    elif method in FILL_METHODS:
+        df = fill_missing(df, list(df.columns), method, rows=rows)
     return df
@@ -0,0 +1,166 @@
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Methods filling the missing values of a DataFrame, see fill_missing
+FILL_METHODS = ("random fill", "mean fill", "median fill", "mode fill", "bfill", "ffill", "knn fill", "iterative fill")
+
+# Methods filling the missing values of the numeric columns with a model of all the numeric columns
+MODEL_FILL_METHODS = ("knn fill", "iterative fill")
+
+# Number of neighbors averaged by the knn fill
+KNN_NEIGHBORS = 5
+
+# Number of rows imputed at once by the model fills, the knn fill holds their distances to all the rows
+IMPUTATION_CHUNK_ROWS = 1000
+
+
+def _is_numeric(dtype) -> bool:
+    """
+    Checks if a column dtype holds numbers that can be averaged (booleans excluded)
+    """
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def get_fill_values(df: pd.DataFrame, columns: list, method: str) -> pd.Series:
+    """
+    Computes the value filling the missing values of each column, in one pass over the numeric columns
+
+    Args:
+        df: The DataFrame
+        columns: The columns
+        method: "mean fill", "median fill" or "mode fill"
+
+    Returns:
+        The fill values indexed by column, NaN when a column has no value. The mean and the median of
+        the non-numeric columns are NaN, like pandas ignores these columns.
+    """
+    fill_values = pd.Series(np.nan, index=pd.Index(columns), dtype=object)
+    numeric = [column for column in columns if _is_numeric(df[column].dtype)]
+    if numeric:
+        block = df[numeric].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(block)
+        counts = present.sum(axis=0)
+        with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if method == "mean fill":
+                statistics = np.where(present, block, 0.0).sum(axis=0) / counts
+            elif method == "median fill":
+                statistics = np.nanmedian(block, axis=0)
+            else:
+                statistics = np.full(len(numeric), np.nan)
+                for i in np.flatnonzero(counts):
+                    # The smallest of the most frequent values, like pandas.DataFrame.mode
+                    values, value_counts = np.unique(block[present[:, i], i], return_counts=True)
+                    statistics[i] = values[np.argmax(value_counts)]
+        fill_values[numeric] = statistics
+    if method == "mode fill":
+        for column in columns:
+            if column not in numeric:
+                modes = df[column].mode()
+                fill_values[column] = modes.iloc[0] if len(modes) else np.nan
+    return fill_values
+
+
+def _get_model_fills(df: pd.DataFrame, columns: list, positions: np.ndarray, method: str, random_state,
+                     max_workers: int) -> dict:
+    """
+    Imputes the missing values of numeric columns at some rows with a KNN or an iterative imputer of all
+    the numeric columns, the rows are imputed by chunks of IMPUTATION_CHUNK_ROWS on threads
+
+    Returns:
+        A dict mapping each imputed column to the array of its values at the rows
+    """
+    features = [column for column in df.columns if _is_numeric(df[column].dtype) and df[column].notna().any()]
+    targets = [column for column in columns if column in set(features)]
+    if not targets or not len(positions):
+        return {}
+    block = df[features].to_numpy(dtype=np.float64, na_value=np.nan)
+    if method == "knn fill":
+        from sklearn.impute import KNNImputer
+        imputer = KNNImputer(n_neighbors=KNN_NEIGHBORS)
+    else:
+        from sklearn.experimental import enable_iterative_imputer  # noqa: F401
+        from sklearn.impute import IterativeImputer
+        imputer = IterativeImputer(random_state=random_state if random_state is not None else 0)
+    imputer.fit(block)
+
+    # The threads share the fitted imputer, NumPy and the distance computations release the GIL
+    chunks = [positions[start:start + IMPUTATION_CHUNK_ROWS] for start in range(0, len(positions), IMPUTATION_CHUNK_ROWS)]
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        imputed = np.vstack(list(executor.map(lambda chunk: imputer.transform(block[chunk]), chunks)))
+    return {column: imputed[:, features.index(column)] for column in targets}
+
+
+def fill_missing(df: pd.DataFrame, columns: list, method: str, rows: list = None, random_state=None,
+                 max_workers: int = None) -> pd.DataFrame:
+    """
+    Fills the missing values of columns of a DataFrame
+
+    Args:
+        df: The DataFrame, modified in place
+        columns: The columns to fill
+        method: One of FILL_METHODS
+        rows: The index labels of the rows to fill, all the rows if None
+        random_state: The seed of the random fill and of the iterative fill
+        max_workers: The number of threads of the model fills, the number of CPUs if None
+
+    Returns:
+        The DataFrame
+
+    Description:
+        The statistics are computed once over all the rows of the columns with missing values to fill. The
+        random fill draws each missing value from the values of its column. The knn and iterative fills only
+        fill the numeric columns, from the values of all the numeric columns of the other rows.
+    """
+    if method not in FILL_METHODS:
+        raise ValueError(f"Unsupported fill method: {method}")
+    if rows is None:
+        positions = np.arange(len(df))
+    else:
+        positions = df.index.get_indexer(rows)
+        if (positions < 0).any():
+            raise KeyError(f"Rows not in the dataset: {list(np.asarray(rows, dtype=object)[positions < 0])}")
+
+    # Missing positions of each column among the rows to fill
+    missing = {}
+    for column in columns:
+        column_missing = positions[df[column].isna().to_numpy()[positions]]
+        if len(column_missing):
+            missing[column] = column_missing
+    if not missing:
+        return df
+
+    if method in ("mean fill", "median fill", "mode fill"):
+        fill_values = get_fill_values(df, list(missing), method)
+    elif method in MODEL_FILL_METHODS:
+        model_positions = np.unique(np.concatenate(list(missing.values())))
+        model_fills = _get_model_fills(df, list(missing), model_positions, method, random_state, max_workers)
+    elif method == "random fill":
+        rng = np.random.default_rng(random_state)
+
+    for column, column_missing in missing.items():
+        series = df[column]
+        if method in ("mean fill", "median fill", "mode fill"):
+            if pd.isna(fill_values[column]):
+                continue
+            fills = fill_values[column]
+        elif method == "random fill":
+            observed = series.dropna().to_numpy()
+            if not len(observed):
+                continue
+            fills = observed[rng.integers(len(observed), size=len(column_missing))]
+        elif method in ("bfill", "ffill"):
+            filled = series.bfill() if method == "bfill" else series.ffill()
+            fills = filled.to_numpy()[column_missing]
+        else:
+            if column not in model_fills:
+                continue
+            fills = model_fills[column][np.searchsorted(model_positions, column_missing)]
+        filled = series.copy()
+        filled.iloc[column_missing] = fills
+        df[column] = filled
+    return df
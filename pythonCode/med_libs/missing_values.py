@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from .dataset_loader import DEFAULT_BATCH_SIZE, iter_dataset_chunks
+from .mongodb_utils import DATABASE_NAME, connect_to_mongo
+from .progress_bus import start_phase
+
+
+class MissingValuesCounter:
+    """
+    Counts the missing values (null, NaN or empty string) of each column and of each row of a dataset,
+    from the chunks of its rows in order
+
+    Description:
+        A column missing from a chunk is missing in all its rows, so the counts don't depend on how the
+        documents of the collection were split in chunks.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.column_nulls = pd.Series(dtype=np.int64)
+        # Missing values of each row among the columns of its chunk, and the number of columns of the chunk
+        self._row_nulls = []
+        self._chunk_columns = []
+
+    def add(self, chunk: pd.DataFrame):
+        """
+        Adds the rows of a chunk, placed after the rows already added
+        """
+        chunk = chunk.drop(columns="_id", errors="ignore")
+        mask = chunk.isna().to_numpy(dtype=bool, copy=True)
+        for position, dtype in enumerate(chunk.dtypes):
+            if dtype == object or isinstance(dtype, pd.StringDtype):
+                mask[:, position] |= (chunk.iloc[:, position] == "").to_numpy(dtype=bool, na_value=False)
+
+        chunk_nulls = pd.Series(mask.sum(axis=0), index=chunk.columns, dtype=np.int64)
+        names = self.column_nulls.index.append(chunk_nulls.index.difference(self.column_nulls.index, sort=False))
+        self.column_nulls = (self.column_nulls.reindex(names, fill_value=self.rows)
+                             + chunk_nulls.reindex(names, fill_value=len(chunk)))
+        self._row_nulls.append(mask.sum(axis=1, dtype=np.int32))
+        self._chunk_columns.append(len(chunk.columns))
+        self.rows += len(chunk)
+
+    def get_row_nulls(self) -> np.ndarray:
+        """
+        Gets the number of missing values of each row, among all the columns of the dataset
+        """
+        if not self._row_nulls:
+            return np.zeros(0, dtype=np.int32)
+        missing_columns = len(self.column_nulls) - np.array(self._chunk_columns, dtype=np.int32)
+        lengths = [len(row_nulls) for row_nulls in self._row_nulls]
+        return np.concatenate(self._row_nulls) + np.repeat(missing_columns, lengths)
+
+
+def get_most_incomplete_rows(row_nulls: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Gets the positions of the rows with the most missing values
+
+    Args:
+        row_nulls: The number of missing values of each row
+        top_k: The number of rows
+
+    Returns:
+        The positions of at most top_k rows, by decreasing number of missing values then by position
+    """
+    if top_k >= len(row_nulls):
+        candidates = np.arange(len(row_nulls))
+    else:
+        # Keeps all the rows tied with the k-th one, so that the lowest positions are kept among them
+        threshold = np.partition(row_nulls, len(row_nulls) - top_k)[len(row_nulls) - top_k]
+        candidates = np.flatnonzero(row_nulls >= threshold)
+    order = np.lexsort((candidates, -row_nulls[candidates].astype(np.int64)))
+    return candidates[order[:top_k]]
+
+
+def get_missing_values(collection_name: str, top_k: int = None, database_name: str = DATABASE_NAME,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    """
+    Gets the missing values of the columns and of the rows of a dataset collection, in one pass over its rows
+
+    Args:
+        collection_name: The name of the collection containing the data
+        top_k: The number of rows to return, the most incomplete ones, all the rows in order if None
+        database_name: The name of the database
+        batch_size: The number of rows of each chunk
+
+    Returns:
+        A dict with the "columnsData" and the "rowData" lists displayed by the app. The rowIndex of a row
+        is its position in the dataset (see dataset_loader.ROW_ORDER).
+    """
+    counter = MissingValuesCounter()
+    total = connect_to_mongo(database_name)[collection_name].estimated_document_count()
+    phase = start_phase(f"Counting missing values of {collection_name}", total=total)
+    try:
+        for chunk in iter_dataset_chunks(collection_name, batch_size=batch_size, database_name=database_name):
+            counter.add(chunk)
+            phase.advance(len(chunk))
+    finally:
+        phase.close()
+
+    rows = counter.rows
+    columns_data = [
+        {"column": column, "numEmpty": int(nulls), "percentage": f"{(nulls / rows * 100) if rows else 0:.2f}%"}
+        for column, nulls in counter.column_nulls.items()
+    ]
+
+    row_nulls = counter.get_row_nulls()
+    positions = np.arange(rows) if top_k is None else get_most_incomplete_rows(row_nulls, top_k)
+    n_columns = len(counter.column_nulls)
+    percentages = row_nulls[positions] / n_columns * 100 if n_columns else np.zeros(len(positions))
+    row_data = [
+        {"rowIndex": int(position), "numEmpty": int(nulls), "percentage": f"{percentage:.2f}%"}
+        for position, nulls, percentage in zip(positions, row_nulls[positions], percentages)
+    ]
+    return {"columnsData": columns_data, "rowData": row_data}
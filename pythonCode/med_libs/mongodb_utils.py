@@ -1,68 +1,280 @@
-from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError, PyMongoError
+import os
 import pickle
-import pandas as pd
+import threading
 
-def connect_to_mongo():
-    client = MongoClient('mongodb://localhost:54017/')
-    db = client['data']
-    return db
+from pymongo import ASCENDING, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
 
-def insert_med_data_object_if_not_exists(med_data, json_data=None):
+from .server_utils import go_print
+
+# Address of the MongoDB server started by the app
+MONGO_URI = 'mongodb://localhost:54017/'
+
+# Database containing the MEDDataObjects and their data
+DATABASE_NAME = 'data'
+
+# Collection describing the MEDDataObjects (files and folders of the workspace)
+MED_DATA_OBJECTS_COLLECTION = 'medDataObjects'
+
+# Collection holding the version counter of the dataset collections, bumped by every writer
+DATASET_VERSIONS_COLLECTION = 'datasetVersions'
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_indexes_ensured = False
+
+
+def get_mongo_client() -> MongoClient:
+    """
+    Gets the MongoClient shared by the whole process
+
+    Returns:
+        The pooled client, created at the first call
+
+    Description:
+        A MongoClient is not fork safe, so a process forked from the python worker creates its own client.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                # The profiler can only listen to the commands of the clients created after its listener
+                from .profiling import register_mongo_listener
+                register_mongo_listener()
+                _client = MongoClient(MONGO_URI)
+                _client_pid = os.getpid()
+    return _client
+
+
+def connect_to_mongo(database_name: str = DATABASE_NAME):
+    """
+    Gets a database from the shared MongoClient
+
+    Args:
+        database_name: The name of the database
+
+    Returns:
+        The database
+    """
+    return get_mongo_client()[database_name]
+
+
+def ensure_med_data_objects_indexes(db=None) -> None:
+    """
+    Creates the indexes of the medDataObjects collection if needed (once per process)
+
+    Args:
+        db: The database, the default one if None
+    """
+    global _indexes_ensured
+    if _indexes_ensured:
+        return
+    if db is None:
+        db = connect_to_mongo()
+    collection = db[MED_DATA_OBJECTS_COLLECTION]
+    try:
+        collection.create_index([('id', ASCENDING)], unique=True)
+    except OperationFailure:
+        # Databases created before the index may contain duplicated ids
+        collection.create_index([('id', ASCENDING)])
+    collection.create_index([('parentID', ASCENDING), ('name', ASCENDING)])
+    _indexes_ensured = True
+
+
+def get_med_data_objects_collection():
+    """
+    Gets the medDataObjects collection, with its indexes ensured
+    """
     db = connect_to_mongo()
-    collection = db['medDataObjects']
-
-    # Check if meddataobject already in database
-    existing_object_by_id = collection.find_one({'id': med_data.id})
-    if existing_object_by_id:
-        # If already exists stop here
-        return existing_object_by_id['id']
-
-    existing_object_by_attributes = collection.find_one({
-        'name': med_data.name,
-        'type': med_data.type,
-        'parentID': med_data.parentID
-    })
-    if existing_object_by_attributes:
-        # If already exists stop here
-        return existing_object_by_attributes['id']
-
-    # Insert meddataobject if not exists
+    ensure_med_data_objects_indexes(db)
+    return db[MED_DATA_OBJECTS_COLLECTION]
+
+
+def bump_dataset_version(collection_name, database_name=DATABASE_NAME):
+    """
+    Increments the version of a dataset collection, must be called after writing to the collection
+
+    Args:
+        collection_name (str): The name of the collection.
+        database_name (str): The name of the database.
+
+    Returns:
+        int: The new version counter.
+
+    Description:
+        The snapshots of the collection are deleted, the next read loads the collection from MongoDB.
+        The statistics computed by the bulk writer are saved in the statistics catalog.
+    """
+    db = connect_to_mongo(database_name)
+    document = db[DATASET_VERSIONS_COLLECTION].find_one_and_update(
+        {'_id': collection_name}, {'$inc': {'version': 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+    from .snapshot_cache import invalidate_snapshots
+    from .stats_catalog import commit_pending_stats
+    invalidate_snapshots(database_name, collection_name)
+    commit_pending_stats(collection_name, database_name)
+    return document['version']
+
+
+def get_dataset_version(collection_name, database_name=DATABASE_NAME):
+    """
+    Gets the version of a dataset collection
+
+    Args:
+        collection_name (str): The name of the collection.
+        database_name (str): The name of the database.
+
+    Returns:
+        str: The version counter, followed by the number of documents and the data size of the collection.
+
+    Description:
+        The writers of the scripts and of the application bump the counter, see bump_dataset_version. The
+        number of documents and the data size come from the metadata of the collection, without reading it,
+        and make the version change on the writes that would not bump it (e.g. an import still running).
+    """
+    db = connect_to_mongo(database_name)
+    document = db[DATASET_VERSIONS_COLLECTION].find_one({'_id': collection_name}, {'version': 1})
+    version = document['version'] if document else 0
     try:
-        result = collection.insert_one(med_data.to_dict())
-        print(f"MEDDataObject inserted with _id: {result.inserted_id}")
-    except DuplicateKeyError:
-        print(f"Duplicate key error for id: {med_data.id}")
-        return med_data.id
+        stats = db.command({'collStats': collection_name})
+        return f"{version}-{stats.get('count', 0)}-{stats.get('size', 0)}"
+    except (PyMongoError, NotImplementedError):
+        return f"{version}-{db[collection_name].estimated_document_count()}"
 
-    # Insert ID into parent children
-    if med_data.parentID:
-        parent = collection.find_one({'id': med_data.parentID})
-        if parent:
-            children = parent.get('childrenIDs', [])
 
-            # Check if not already present in parent children
-            if med_data.id not in children:
-                # Sort children
-                children_objects = list(collection.find({'id': {'$in': children}}))
-                children_objects.append(med_data.to_dict())
+def _add_children_to_parents(collection, med_objects: list) -> None:
+    """
+    Adds new MEDDataObjects to the childrenIDs of their parents, children are sorted by type then by name
 
-                # Sort by type then by alphabetical order
-                children_objects.sort(key=lambda x: (x['type'] != 'directory', x['name']))
+    Args:
+        collection: The medDataObjects collection
+        med_objects: The new MEDDataObjects (as dicts)
+    """
+    new_children = {}
+    for med_object in med_objects:
+        if med_object.get('parentID'):
+            new_children.setdefault(med_object['parentID'], []).append(med_object)
+    if not new_children:
+        return
+
+    parents = list(collection.find({'id': {'$in': list(new_children)}}, {'_id': 0, 'id': 1, 'childrenIDs': 1}))
+    existing_ids = {child_id for parent in parents for child_id in parent.get('childrenIDs', [])}
+    existing_children = {
+        child['id']: child for child in
+        collection.find({'id': {'$in': list(existing_ids)}}, {'_id': 0, 'id': 1, 'type': 1, 'name': 1})
+    } if existing_ids else {}
+
+    updates = []
+    for parent in parents:
+        children_ids = parent.get('childrenIDs', [])
+        added = [child for child in new_children[parent['id']] if child['id'] not in children_ids]
+        if not added:
+            continue
+        children_objects = [existing_children[child_id] for child_id in children_ids if child_id in existing_children]
+        children_objects.extend(added)
+
+        # Sort by type then by alphabetical order
+        children_objects.sort(key=lambda x: (x['type'] != 'directory', x['name']))
+
+        # Extract sorted IDs
+        updates.append(UpdateOne({'id': parent['id']}, {'$set': {'childrenIDs': [child['id'] for child in children_objects]}}))
+    if updates:
+        collection.bulk_write(updates, ordered=False)
+
+
+def register_med_data_objects(med_objects: list, data: dict = None) -> list:
+    """
+    Registers many MEDDataObjects at once, the ones already in the database are skipped
+
+    Args:
+        med_objects: The MEDDataObjects to register
+        data: Maps the id of a MEDDataObject to the data to insert in its data collection, a DataFrame or records (list[dict])
+
+    Returns:
+        The ids of the MEDDataObjects in the database, in the order of med_objects: the id of the
+        existing object with the same id or the same name, type and parent, or the id of the inserted one
+
+    Description:
+        Whatever the number of objects, the registration takes a fixed number of round trips: one lookup
+        of the existing objects, one insertion, and the update of the parents children.
+    """
+    if not med_objects:
+        return []
+    collection = get_med_data_objects_collection()
+    data = data or {}
+
+    # Check if the meddataobjects are already in database, by id or by attributes
+    conditions = [{'id': {'$in': [med_object.id for med_object in med_objects]}}]
+    conditions.extend({'name': med_object.name, 'type': med_object.type, 'parentID': med_object.parentID}
+                      for med_object in med_objects)
+    existing = list(collection.find({'$or': conditions}, {'_id': 0, 'id': 1, 'name': 1, 'type': 1, 'parentID': 1}))
+    existing_by_id = {med_object['id']: med_object['id'] for med_object in existing}
+    existing_by_attributes = {(med_object.get('name'), med_object.get('type'), med_object.get('parentID')): med_object['id']
+                              for med_object in existing}
 
-                # Extract sorted IDs
-                children = [child['id'] for child in children_objects]
+    ids = []
+    to_insert = {}
+    for med_object in med_objects:
+        attributes = (med_object.name, med_object.type, med_object.parentID)
+        existing_id = existing_by_id.get(med_object.id) or existing_by_attributes.get(attributes)
+        if existing_id is None and attributes in to_insert:
+            existing_id = to_insert[attributes]['id']
+        if existing_id is not None:
+            ids.append(existing_id)
+            continue
+        to_insert[attributes] = med_object.to_dict()
+        ids.append(med_object.id)
+    if not to_insert:
+        return ids
+
+    # Insert the meddataobjects that don't exist
+    inserted = list(to_insert.values())
+    try:
+        collection.insert_many([dict(med_object) for med_object in inserted], ordered=False)
+    except BulkWriteError as error:
+        # Partial failures (e.g. an object inserted meanwhile by the app) don't prevent the other insertions,
+        # the objects that failed already exist and their parent and data are left unchanged
+        failed = {write_error['index'] for write_error in error.details.get('writeErrors', [])}
+        go_print(f"MEDDataObjects not registered: {[inserted[index]['id'] for index in sorted(failed)]}")
+        inserted = [med_object for index, med_object in enumerate(inserted) if index not in failed]
+
+    # Insert IDs into parents children
+    _add_children_to_parents(collection, inserted)
+
+    # Insert the meddataobjects data if there is data
+    db = connect_to_mongo()
+    for med_object in inserted:
+        records = data.get(med_object['id'])
+        if records is not None and len(records):
+            count = _write_data(db[med_object['id']], records)
+            bump_dataset_version(med_object['id'])
+            go_print(f"Data inserted with {count} documents")
+    return ids
 
-                # Update parent with sorted children
-                collection.update_one({'id': med_data.parentID}, {'$set': {'childrenIDs': children}})
 
-    # Insert the meddataobject data if there is data
-    if json_data:
-        data_collection = db[med_data.id]
-        result = data_collection.insert_many(json_data)
-        print(f"Data inserted with {len(result.inserted_ids)} documents")
+def _write_data(collection, data, overwrite: bool = False) -> int:
+    """
+    Inserts the data of a MEDDataObject, a DataFrame or records (list[dict]), with the bulk writer
+    """
+    from .bulk_writer import overwrite_dataframe, overwrite_records, write_dataframe, write_records
+    if isinstance(data, list):
+        return overwrite_records(collection, data) if overwrite else write_records(collection, data)
+    return overwrite_dataframe(collection, data) if overwrite else write_dataframe(collection, data)
+
+
+def insert_med_data_object_if_not_exists(med_data, json_data=None):
+    """
+    Registers a MEDDataObject if it doesn't exist and inserts its data
+
+    Args:
+        med_data (MEDDataObject): The MEDDataObject to register.
+        json_data (pd.DataFrame | list[dict]): The data of the MEDDataObject, if any.
 
-    return med_data.id
+    Returns:
+        str: The id of the existing MEDDataObject with the same id or the same name, type and parent,
+        or the id of the inserted one.
+    """
+    return register_med_data_objects([med_data], {med_data.id: json_data} if json_data is not None else None)[0]
 
 
 def overwrite_med_data_object_content(collection_id, json_data):
@@ -71,7 +283,7 @@ def overwrite_med_data_object_content(collection_id, json_data):
 
     Args:
         collection_id (str): The ID of the MEDDataObject data to overwrite.
-        json_data (list[dict]): The new data for the MEDDataObject.
+        json_data (pd.DataFrame | list[dict]): The new data for the MEDDataObject.
 
     Returns:
         bool: True if the operation was successful, False otherwise.
@@ -79,40 +291,59 @@ def overwrite_med_data_object_content(collection_id, json_data):
     try:
         db = connect_to_mongo()
         collection = db[collection_id]
-        collection.delete_many({})
-        collection.insert_many(json_data)
+        # The new data replaces the old one at once, see bulk_writer.overwrite_dataframe
+        _write_data(collection, json_data, overwrite=True)
+        bump_dataset_version(collection_id)
         return True
     except PyMongoError as error:
         print(f"Error in overwrite_med_data_object_content: {error}")
         return False
 
-def get_child_id_by_name(parent_id, child_name):
+def get_child_ids_by_names(parent_id, child_names):
     """
-    Get the ID of the child MEDDataObject by its name.
+    Get the IDs of children MEDDataObjects by their names, in one lookup.
 
     Args:
         parent_id (uuid): The parent id.
-        child_name (str): The name of the child MEDDataObject.
+        child_names (list[str]): The names of the children MEDDataObjects.
 
     Returns:
-        str: The ID of the child MEDDataObject, or None if not found.
+        dict: Maps each name to the ID of the first child (in the parent children order) with this name, or None if not found.
     """
-    db = connect_to_mongo()
-    collection = db['medDataObjects']
+    collection = get_med_data_objects_collection()
+    ids = {name: None for name in child_names}
 
     # Find the parent object
-    parent_object = collection.find_one({'id': parent_id})
+    parent_object = collection.find_one({'id': parent_id}, {'_id': 0, 'childrenIDs': 1})
     if not parent_object or 'childrenIDs' not in parent_object:
-        return None
+        return ids
 
-    # Iterate through children IDs to find the child with the given name
+    # Get the children with the given names in a single query
     children_ids = parent_object['childrenIDs']
+    names_by_id = {
+        child['id']: child['name'] for child in
+        collection.find({'id': {'$in': children_ids}, 'name': {'$in': list(ids)}}, {'_id': 0, 'id': 1, 'name': 1})
+    }
     for child_id in children_ids:
-        child_object = collection.find_one({'id': child_id})
-        if child_object and child_object['name'] == child_name:
-            return child_id
+        name = names_by_id.get(child_id)
+        if name is not None and ids[name] is None:
+            ids[name] = child_id
+    return ids
+
+
+def get_child_id_by_name(parent_id, child_name):
+    """
+    Get the ID of the child MEDDataObject by its name.
+
+    Args:
+        parent_id (uuid): The parent id.
+        child_name (str): The name of the child MEDDataObject.
+
+    Returns:
+        str: The ID of the child MEDDataObject, or None if not found.
+    """
+    return get_child_ids_by_names(parent_id, [child_name])[child_name]
 
-    return None
 
 def get_pickled_model_from_collection(collection_name):
     """
@@ -142,17 +373,20 @@ def get_pickled_model_from_collection(collection_name):
 
     return None
 
-def get_dataset_as_pd_df(collection_name):
+def get_dataset_as_pd_df(collection_name, database_name=DATABASE_NAME, use_cache=True):
     """
     Get the pandas dataframe from the specified collection.
 
     Args:
         collection_name (str): The name of the collection containing the data.
+        database_name (str): The name of the database.
+        use_cache (bool): Whether to read the dataset from its local snapshot when it didn't change.
 
     Returns:
         pandas dataframe
+
+    Description:
+        Kept for the existing callers, see dataset_loader.load_dataset to load some columns or rows only.
     """
-    db = connect_to_mongo()
-    collection = db[collection_name]
-    collection_data = collection.find({}, {'_id': False})
-    return pd.DataFrame(list(collection_data))
\ No newline at end of file
+    from .dataset_loader import load_dataset
+    return load_dataset(collection_name, database_name=database_name, use_cache=use_cache)
@@ -0,0 +1,165 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .dataset_loader import DEFAULT_BATCH_SIZE, ROW_ORDER, _get_projection, _iter_mongo_chunks, stitch_chunks
+from .mongodb_utils import DATABASE_NAME, connect_to_mongo
+
+# Collections smaller than this number of documents per partition are read by a single cursor
+MIN_PARTITION_ROWS = 50000
+
+# Number of partitions read concurrently, can be changed with the MED_READER_WORKERS environment variable
+DEFAULT_MAX_WORKERS = 4
+
+# "pandas" converts the documents chunk by chunk, "pymongoarrow" decodes the BSON batches directly into Arrow columns
+# but stores the values of mixed-type fields as missing values, so it must be requested explicitly.
+# Can be changed with the MED_READER_ENGINE environment variable
+READER_ENGINES = ("pandas", "pymongoarrow")
+DEFAULT_READER_ENGINE = "pandas"
+
+
+def get_max_workers() -> int:
+    """
+    Gets the number of partitions read concurrently
+    """
+    try:
+        return max(int(os.environ.get("MED_READER_WORKERS", DEFAULT_MAX_WORKERS)), 1)
+    except ValueError:
+        return DEFAULT_MAX_WORKERS
+
+
+def get_reader_engine(engine: str = None) -> str:
+    """
+    Gets the engine decoding the documents
+
+    Args:
+        engine: One of READER_ENGINES, the MED_READER_ENGINE environment variable is used if None
+
+    Returns:
+        "pandas" or "pymongoarrow"
+    """
+    engine = (engine or os.environ.get("MED_READER_ENGINE", DEFAULT_READER_ENGINE)).lower()
+    if engine not in READER_ENGINES:
+        raise ValueError(f"Unsupported reader engine: {engine}")
+    return engine
+
+
+def get_id_boundaries(collection, partitions: int) -> list:
+    """
+    Splits the _id of a collection in ranges of about the same number of documents
+
+    Args:
+        collection: The collection
+        partitions: The number of ranges
+
+    Returns:
+        The sorted _id starting the ranges, except the first one
+    """
+    total = collection.estimated_document_count()
+    boundaries = []
+    for i in range(1, partitions):
+        # Walks the _id index only
+        document = next(iter(collection.find({}, {'_id': 1}).sort('_id', 1).skip(i * total // partitions).limit(1)), None)
+        if document is not None and (not boundaries or document['_id'] > boundaries[-1]):
+            boundaries.append(document['_id'])
+    return boundaries
+
+
+def get_partition_filters(filters: dict, boundaries: list) -> list:
+    """
+    Gets the query of each _id range
+
+    Args:
+        filters: The query selecting the rows to read, all the rows if None
+        boundaries: The _id starting the ranges, except the first one
+
+    Returns:
+        The list of queries, in the order of the ranges
+    """
+    bounds = [None] + boundaries + [None]
+    queries = []
+    for lower, upper in zip(bounds[:-1], bounds[1:]):
+        id_range = {}
+        if lower is not None:
+            id_range['$gte'] = lower
+        if upper is not None:
+            id_range['$lt'] = upper
+        query = {'_id': id_range}
+        queries.append({'$and': [filters, query]} if filters else query)
+    return queries
+
+
+def _read_partition_arrow(collection_name: str, columns: list, query: dict, batch_size: int, database_name: str):
+    """
+    Reads an _id range as an Arrow table with pymongoarrow
+    """
+    from pymongoarrow.api import find_arrow_all
+    collection = connect_to_mongo(database_name)[collection_name]
+    return find_arrow_all(collection, query, projection=_get_projection(columns), sort=ROW_ORDER, batch_size=batch_size)
+
+
+def _read_partition_pandas(collection_name: str, columns: list, query: dict, batch_size: int, database_name: str):
+    """
+    Reads an _id range as a DataFrame
+    """
+    chunks = _iter_mongo_chunks(collection_name, columns, query, batch_size, database_name, sort=ROW_ORDER)
+    return stitch_chunks(chunks, batch_size, columns)
+
+
+def read_dataset_parallel(collection_name: str, columns: list = None, filters: dict = None, count: int = None,
+                          batch_size: int = DEFAULT_BATCH_SIZE, max_workers: int = None, engine: str = None,
+                          database_name: str = DATABASE_NAME):
+    """
+    Reads a dataset collection by _id ranges read concurrently
+
+    Args:
+        collection_name: The name of the collection containing the data
+        columns: The columns to read, all the columns if None
+        filters: A MongoDB query selecting the rows to read, all the rows if None
+        count: The number of documents matching the filters, counted if None
+        batch_size: The number of documents fetched at once
+        max_workers: The number of ranges read concurrently, get_max_workers() if None
+        engine: One of READER_ENGINES
+        database_name: The name of the database
+
+    Returns:
+        The DataFrame, its rows are sorted by _id. None if the collection is too small to be split, or if some
+        documents were not in any range (e.g. _id that are not ObjectIds), the caller must then read it with one cursor
+
+    Description:
+        The ranges are read by threads: pymongo releases the GIL while waiting for the server, so the
+        transfer of a range overlaps with the decoding of the others. With pymongoarrow, the BSON is decoded
+        directly into Arrow columns without creating a Python object per document.
+        pymongoarrow stores the values of a field whose type changes between documents as missing values,
+        it is only used when requested, for collections known to have one type per field.
+    """
+    collection = connect_to_mongo(database_name)[collection_name]
+    if count is None:
+        count = collection.count_documents(filters or {})
+    max_workers = max_workers or get_max_workers()
+    partitions = min(max_workers, collection.estimated_document_count() // MIN_PARTITION_ROWS)
+    if partitions < 2:
+        return None
+    boundaries = get_id_boundaries(collection, partitions)
+    if not boundaries:
+        return None
+    queries = get_partition_filters(filters, boundaries)
+
+    engine = get_reader_engine(engine)
+    read_partition = _read_partition_arrow if engine == "pymongoarrow" else _read_partition_pandas
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(queries))) as executor:
+        parts = list(executor.map(lambda query: read_partition(collection_name, columns, query, batch_size, database_name), queries))
+
+    if sum(part.num_rows if engine == "pymongoarrow" else len(part) for part in parts) != count:
+        return None
+    if engine == "pymongoarrow":
+        import pyarrow as pa
+        try:
+            table = pa.concat_tables(parts, promote=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # A field has different types in different ranges
+            return read_dataset_parallel(collection_name, columns, filters, count, batch_size, max_workers, "pandas", database_name)
+        df = table.to_pandas()
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        return df
+    return stitch_chunks(parts, count, columns)
@@ -0,0 +1,317 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Phases timed for every profiled job
+PHASE_MONGO_READ = "Mongo read"
+PHASE_COMPUTE = "compute"
+PHASE_MONGO_WRITE = "Mongo write"
+
+# MongoDB collection (in the "data" database) receiving the profiles when the destination is "mongo"
+PROFILES_COLLECTION = "jobProfiles"
+
+# MongoDB commands counted as writes, the other commands are counted as reads
+WRITE_COMMANDS = {
+    "insert", "update", "delete", "findAndModify", "create", "drop", "dropDatabase",
+    "createIndexes", "dropIndexes", "renameCollection", "collMod"
+}
+
+# Number of functions and allocation sites kept in the summary
+TOP_COUNT = 25
+
+# MongoDB documents are limited to 16MB, bigger profiles are only saved as summaries
+MAX_MONGO_PROFILE_SIZE = 12 * 1024 * 1024
+
+
+def get_profile_destination(profile: str = None) -> str:
+    """
+    Gets where the profile of a job must be saved
+
+    Args:
+        profile: The requested destination, the MED_PROFILE environment variable is used if None
+
+    Returns:
+        "file", "mongo" or None if the job must not be profiled
+    """
+    if profile is None:
+        profile = os.environ.get("MED_PROFILE", "")
+    profile = str(profile).strip().lower()
+    if profile in ("", "0", "false", "no", "none"):
+        return None
+    if profile == "mongo":
+        return "mongo"
+    return "file"
+
+
+class _MongoCommandListener:
+    """
+    This class is used to time and measure the MongoDB commands sent while a job is profiled
+
+    Description:
+        pymongo only notifies the listeners registered before the creation of a client, so the listener is
+        registered once for the whole process and only records while a profiler is running.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}
+        self.profiler = None
+
+    @classmethod
+    def register(cls) -> "_MongoCommandListener":
+        """
+        Registers the listener to pymongo if needed
+
+        Returns:
+            The listener, None if pymongo is not installed
+        """
+        if cls._instance is None:
+            try:
+                from pymongo import monitoring
+            except ImportError:
+                return None
+            listener = cls()
+
+            class MongoCommandListener(monitoring.CommandListener):
+                def started(self, event):
+                    listener.started(event)
+
+                def succeeded(self, event):
+                    listener.succeeded(event)
+
+                def failed(self, event):
+                    listener.failed(event)
+
+            monitoring.register(MongoCommandListener())
+            cls._instance = listener
+        return cls._instance
+
+    @staticmethod
+    def _size(document) -> int:
+        """
+        Gets the BSON size of a command or of a reply
+        """
+        import bson
+        raw = getattr(document, "raw", None)
+        return len(raw) if raw is not None else len(bson.encode(document))
+
+    def started(self, event):
+        profiler = self.profiler
+        if profiler is None:
+            return
+        kind = PHASE_MONGO_WRITE if event.command_name in WRITE_COMMANDS else PHASE_MONGO_READ
+        if event.command_name == "aggregate" and any(
+                "$out" in stage or "$merge" in stage for stage in event.command.get("pipeline", [])):
+            kind = PHASE_MONGO_WRITE
+        size = self._size(event.command) if kind == PHASE_MONGO_WRITE else 0
+        with self._lock:
+            self._kinds[event.request_id] = kind
+            profiler.bytes_written += size
+
+    def succeeded(self, event):
+        self._finish(event, self._size(event.reply) if self.profiler is not None else 0)
+
+    def failed(self, event):
+        self._finish(event, 0)
+
+    def _finish(self, event, reply_size: int):
+        profiler = self.profiler
+        with self._lock:
+            kind = self._kinds.pop(event.request_id, None)
+        if profiler is None or kind is None:
+            return
+        with self._lock:
+            profiler.mongo_times[kind] = profiler.mongo_times.get(kind, 0.0) + event.duration_micros / 1e6
+            profiler.mongo_commands[event.command_name] = profiler.mongo_commands.get(event.command_name, 0) + 1
+            if kind == PHASE_MONGO_READ:
+                profiler.bytes_read += reply_size
+
+
+def register_mongo_listener() -> None:
+    """
+    Registers the listener of the MongoDB commands, it must be called before the creation of the MongoClient
+    """
+    _MongoCommandListener.register()
+
+
+class JobProfiler:
+    """
+    This class is used to profile a job with cProfile and tracemalloc
+
+    Args:
+        job_id: The id of the job
+        destination: "file" to save the profile in the MED_TMP folder, "mongo" to save it in the PROFILES_COLLECTION
+
+    Description:
+        The time of the MongoDB commands is recorded in the "Mongo read" and "Mongo write" phases, the remaining time
+        is the "compute" phase. Scripts can time these phases more precisely (e.g. including the conversion of the
+        documents to a DataFrame) or add their own phases with profile_phase.
+    """
+
+    # The profiler of the job running in this process
+    active = None
+
+    def __init__(self, job_id: str, destination: str = "file"):
+        self.job_id = str(job_id)
+        self.destination = destination
+        self.phases = {}
+        self.mongo_times = {}
+        self.mongo_commands = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._profile = cProfile.Profile()
+        self._listener = None
+        self._started = None
+        self._wall_time = None
+        self._peak_memory = None
+        self._top_allocations = []
+        self._was_tracing = False
+
+    def start(self):
+        """
+        Starts profiling
+        """
+        JobProfiler.active = self
+        self._listener = _MongoCommandListener.register()
+        if self._listener is not None:
+            self._listener.profiler = self
+        self._was_tracing = tracemalloc.is_tracing()
+        if not self._was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        self._profile.enable()
+
+    def stop(self):
+        """
+        Stops profiling
+        """
+        self._profile.disable()
+        self._wall_time = time.perf_counter() - self._started
+        if self._listener is not None:
+            self._listener.profiler = None
+        self._peak_memory = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+        self._top_allocations = [
+            {"location": str(stat.traceback), "size": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:TOP_COUNT]
+        ]
+        if not self._was_tracing:
+            tracemalloc.stop()
+        if JobProfiler.active is self:
+            JobProfiler.active = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Times a phase of the job, the time of a phase run several times is summed
+
+        Args:
+            name: The name of the phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def get_stats(self) -> pstats.Stats:
+        """
+        Gets the cProfile statistics of the job
+        """
+        return pstats.Stats(self._profile, stream=io.StringIO())
+
+    def get_summary(self) -> dict:
+        """
+        Gets the summary of the profile
+
+        Returns:
+            The wall time, the phase timers, the top functions by cumulative time, the peak memory
+            and the bytes read from and written to MongoDB
+        """
+        stats = self.get_stats()
+        top_functions = []
+        for (file_name, line, function), (_, n_calls, total_time, cumulative_time, _) in sorted(
+                stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_COUNT]:
+            top_functions.append({
+                "function": f"{file_name}:{line}({function})",
+                "calls": n_calls,
+                "total_time_s": round(total_time, 6),
+                "cumulative_time_s": round(cumulative_time, 6)
+            })
+
+        # The phases timed by the script take precedence over the ones deduced from the MongoDB commands
+        mongo_time = sum(self.mongo_times.values())
+        phases = {
+            PHASE_MONGO_READ: self.mongo_times.get(PHASE_MONGO_READ, 0.0),
+            PHASE_COMPUTE: max(self._wall_time - mongo_time, 0.0),
+            PHASE_MONGO_WRITE: self.mongo_times.get(PHASE_MONGO_WRITE, 0.0),
+        }
+        phases.update(self.phases)
+        return {
+            "job_id": self.job_id,
+            "wall_time_s": round(self._wall_time, 6),
+            "phases_s": {name: round(value, 6) for name, value in phases.items()},
+            "mongo_command_time_s": {name: round(value, 6) for name, value in self.mongo_times.items()},
+            "mongo_commands": self.mongo_commands,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "peak_memory_bytes": self._peak_memory,
+            "top_functions": top_functions,
+            "top_allocations": self._top_allocations,
+        }
+
+    def save(self) -> str:
+        """
+        Saves the profile and its summary to their destination
+
+        Returns:
+            The path of the summary file or the name of the MongoDB collection
+        """
+        summary = self.get_summary()
+        if self.destination == "mongo":
+            import marshal
+            from bson.binary import Binary
+            from .mongodb_utils import connect_to_mongo
+            document = dict(summary, _id=self.job_id, created_at=time.time())
+            stats = self.get_stats()
+            profile = marshal.dumps(stats.stats)
+            if len(profile) <= MAX_MONGO_PROFILE_SIZE:
+                document["profile"] = Binary(profile)
+            connect_to_mongo()[PROFILES_COLLECTION].replace_one({"_id": self.job_id}, document, upsert=True)
+            return PROFILES_COLLECTION
+
+        folder = os.path.expanduser(os.path.join(os.environ.get("MED_TMP", "~"), "med_profiles"))
+        os.makedirs(folder, exist_ok=True)
+        file_name = re.sub(r"[^A-Za-z0-9_.-]", "_", self.job_id)
+        # The .prof file can be opened with pstats or snakeviz
+        self._profile.dump_stats(os.path.join(folder, file_name + ".prof"))
+        summary_path = os.path.join(folder, file_name + ".json")
+        with open(summary_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary_path
+
+
+@contextmanager
+def profile_phase(name: str):
+    """
+    Times a phase of the job running in this process, does nothing if the job is not profiled
+
+    Args:
+        name: The name of the phase (e.g. PHASE_MONGO_READ)
+    """
+    profiler = JobProfiler.active
+    if profiler is None:
+        yield
+        return
+    with profiler.phase(name):
+        yield
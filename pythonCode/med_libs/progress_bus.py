@@ -0,0 +1,246 @@
+import json
+import threading
+import time
+
+from .server_utils import go_print
+
+# Minimum delay (in seconds) between two progress messages of a job
+DEFAULT_PROGRESS_INTERVAL = 0.25
+
+
+class ProgressBus:
+    """
+    This class is used to send the progress of a job to the Go server from a background thread
+
+    Args:
+        job_id: The id of the job
+        interval: The minimum delay (in seconds) between two progress messages
+
+    Description:
+        Publishing a progress never blocks on stdout: the progress is only stored and the writer thread
+        sends the latest one at most once per interval, the intermediate updates are dropped (latest wins).
+        Sources can also be registered, they are polled by the writer thread (e.g. to read the progress
+        of a running experiment or to check if a web server is up).
+    """
+
+    # The bus of the job running in this process, used by the code that has no reference to its script
+    active = None
+
+    def __init__(self, job_id: str, interval: float = DEFAULT_PROGRESS_INTERVAL):
+        self._job_id = job_id
+        self._interval = interval
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending = None
+        self._sources = []
+        self._thread = None
+        self._closed = False
+        self._last_write = 0.0
+        self.progress = {}
+        ProgressBus.active = self
+
+    def publish(self, progress: dict):
+        """
+        Stores a progress to be sent by the writer thread, it replaces the progress not sent yet
+
+        Args:
+            progress: The progress dictionary
+        """
+        with self._condition:
+            self.progress = progress
+            self._pending = json.dumps(progress)
+            if self._closed:
+                return
+            self._ensure_thread()
+            self._condition.notify()
+
+    def add_source(self, source: callable, interval: float = None):
+        """
+        Registers a function polled by the writer thread
+
+        Args:
+            source: Called without arguments at each poll, it usually publishes a progress. The source is
+                unregistered when it returns False
+            interval: The delay (in seconds) between two polls, defaults to the bus interval
+        """
+        with self._condition:
+            self._sources.append([source, interval or self._interval, 0.0])
+            self._ensure_thread()
+            self._condition.notify()
+
+    def start_phase(self, label: str, total: int = None, start: float = None, end: float = None) -> "ProgressPhase":
+        """
+        Starts a phase whose items are counted, see ProgressPhase
+        """
+        return ProgressPhase(self, label, total, start, end)
+
+    def flush(self):
+        """
+        Sends the progress not sent yet, from the calling thread
+        """
+        with self._write_lock:
+            with self._condition:
+                pending, self._pending = self._pending, None
+            if pending is not None:
+                go_print("progress*_*" + self._job_id + "*_*" + pending)
+                self._last_write = time.monotonic()
+
+    def close(self):
+        """
+        Stops the writer thread and the polling of the sources, then sends the progress not sent yet
+        """
+        with self._condition:
+            self._closed = True
+            self._sources = []
+            self._condition.notify()
+        self.flush()
+
+    def _ensure_thread(self):
+        """
+        Starts the writer thread if needed, must be called with the condition acquired
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"progress-{self._job_id}", daemon=True)
+            self._thread.start()
+
+    def _poll_sources(self, now: float) -> float:
+        """
+        Polls the sources that are due
+
+        Args:
+            now: The current monotonic time
+
+        Returns:
+            The monotonic time of the next poll, None if there is no source
+        """
+        with self._condition:
+            sources = list(self._sources)
+        next_poll = None
+        for entry in sources:
+            source, interval, due = entry
+            if due <= now:
+                if source() is False:
+                    with self._condition:
+                        if entry in self._sources:
+                            self._sources.remove(entry)
+                    continue
+                entry[2] = due = now + interval
+            next_poll = due if next_poll is None else min(next_poll, due)
+        return next_poll
+
+    def _run(self):
+        """
+        The writer thread loop
+        """
+        while True:
+            next_poll = self._poll_sources(time.monotonic())
+            with self._condition:
+                if self._closed:
+                    return
+                if self._pending is None:
+                    timeout = None if next_poll is None else max(next_poll - time.monotonic(), 0)
+                    self._condition.wait(timeout)
+                    if self._closed:
+                        return
+            # Coalesces the updates published during the interval
+            delay = self._last_write + self._interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if self._closed:
+                return
+            self.flush()
+
+
+class ProgressPhase:
+    """
+    This class is used to report the progress of the items of a phase of a job (e.g. patients, images, folds)
+
+    Args:
+        bus: The progress bus of the job, the phase is only tracked if None
+        label: The label of the phase
+        total: The number of items of the phase if known
+        start: The global progress (0-100) at the beginning of the phase, the global progress is left unchanged if None
+        end: The global progress (0-100) at the end of the phase
+
+    Description:
+        The phase is sent in the "phase" key of the progress with its item counts, its throughput
+        (items per second) and its estimated remaining time (seconds).
+    """
+
+    def __init__(self, bus: ProgressBus, label: str, total: int = None, start: float = None, end: float = None):
+        self._bus = bus
+        self.label = label
+        self.total = total
+        self.start = start
+        self.end = end if end is not None else 100
+        self.done = 0
+        self._started = time.monotonic()
+        self._publish(None)
+
+    def advance(self, n: int = 1, item: str = None):
+        """
+        Marks items of the phase as done
+
+        Args:
+            n: The number of items done
+            item: The label of the last item done
+        """
+        self.done += n
+        self._publish(item)
+
+    def _publish(self, item: str):
+        """
+        Publishes the progress of the phase
+        """
+        if self._bus is None:
+            return
+        elapsed = time.monotonic() - self._started
+        rate = self.done / elapsed if self.done and elapsed > 0 else None
+        eta = None
+        if rate and self.total is not None:
+            eta = round(max(self.total - self.done, 0) / rate, 1)
+        progress = self._bus.progress
+        progress["phase"] = {
+            "label": self.label,
+            "item": item,
+            "done": self.done,
+            "total": self.total,
+            "itemsPerSecond": round(rate, 3) if rate else None,
+            "etaSeconds": eta
+        }
+        if self.start is not None and self.total:
+            progress["now"] = round(self.start + (self.end - self.start) * min(self.done, self.total) / self.total, 2)
+        self._bus.publish(progress)
+
+    def close(self):
+        """
+        Ends the phase, its details are removed from the progress
+        """
+        if self._bus is None:
+            return
+        self._bus.progress.pop("phase", None)
+        if self.start is not None:
+            self._bus.progress["now"] = self.end
+        self._bus.publish(self._bus.progress)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def start_phase(label: str, total: int = None, start: float = None, end: float = None) -> ProgressPhase:
+    """
+    Starts a phase on the progress bus of the job running in this process
+
+    Args:
+        label: The label of the phase
+        total: The number of items of the phase if known
+        start: The global progress (0-100) at the beginning of the phase
+        end: The global progress (0-100) at the end of the phase
+
+    Returns:
+        The phase, it is only tracked when no job runs in this process
+    """
+    return ProgressPhase(ProgressBus.active, label, total, start, end)
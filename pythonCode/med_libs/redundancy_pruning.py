@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+
+from .dataset_loader import DEFAULT_BATCH_SIZE, iter_dataset_chunks
+from .duplicate_columns import CHUNK_CELLS, CORRELATION_BLOCK_ROWS, MIN_OVERLAP_ROWS, is_numeric_dtype
+from .mongodb_utils import DATABASE_NAME
+from .progress_bus import start_phase
+from .stats_catalog import get_dataset_stats
+from .target_correlation import CORRELATION_METHODS
+
+# Default minimum absolute correlation of two columns for one of them to be pruned
+DEFAULT_PRUNING_THRESHOLD = 0.9
+
+
+def load_numeric_matrix(collection_name: str, columns: list, database_name: str = DATABASE_NAME) -> np.ndarray:
+    """
+    Loads columns of a dataset collection as a matrix of floats, NaN when missing or not a number
+
+    Args:
+        collection_name: The name of the collection containing the data
+        columns: The columns, in the order of the matrix columns
+        database_name: The name of the database
+
+    Returns:
+        The matrix, one row per row of the dataset in order
+    """
+    stats = get_dataset_stats(collection_name, database_name)
+    n_rows = int(stats["rows"].max()) if len(stats) else 0
+    values = np.full((n_rows, len(columns)), np.nan)
+    batch_size = min(DEFAULT_BATCH_SIZE, max(1, CHUNK_CELLS // max(1, len(columns))))
+    row = 0
+    phase = start_phase(f"Loading the columns of {collection_name}", total=n_rows)
+    try:
+        for chunk in iter_dataset_chunks(collection_name, columns, batch_size=batch_size,
+                                         database_name=database_name):
+            if row + len(chunk) > len(values):
+                values = np.vstack([values, np.full((row + len(chunk) - len(values), len(columns)), np.nan)])
+            for i, column in enumerate(columns):
+                if column in chunk:
+                    values[row:row + len(chunk), i] = pd.to_numeric(chunk[column], errors="coerce").to_numpy(
+                        dtype=np.float64, na_value=np.nan)
+            row += len(chunk)
+            phase.advance(len(chunk))
+    finally:
+        phase.close()
+    return values[:row]
+
+
+class CorrelationBlocks:
+    """
+    This class is used to compute the correlation matrix of the columns of a matrix by blocks of rows
+
+    Args:
+        values: The matrix, NaN when missing. It is ranked and centered in place, the caller must not use it after.
+        method: One of CORRELATION_METHODS
+
+    Description:
+        The columns are centered once (ranked first for spearman), then each block of the correlation
+        matrix is a matrix product with all the columns, so only CORRELATION_BLOCK_ROWS rows of the p x p
+        matrix are in memory. The correlations are computed on the rows where both columns have values,
+        like pandas does; the spearman ranks are the ones of each column over all its values.
+        Only the centered matrix and a boolean mask of the present values are kept, the masks are
+        converted to floats by chunks of CHUNK_CELLS cells when the products need them.
+    """
+
+    def __init__(self, values: np.ndarray, method: str = "pearson"):
+        if method not in CORRELATION_METHODS:
+            raise ValueError(f"Unsupported correlation method: {method}")
+        if method == "spearman":
+            # Column by column, the ranks of the whole matrix are never copied
+            for i in range(values.shape[1]):
+                values[:, i] = pd.Series(values[:, i], copy=False).rank().to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        self.n_columns = values.shape[1]
+        self.counts = present.sum(axis=0)
+        # The missing values are 0, so the products only count the rows where both columns have values
+        missing = ~present
+        np.copyto(values, 0.0, where=missing)
+        values -= values.sum(axis=0) / np.maximum(self.counts, 1)
+        np.copyto(values, 0.0, where=missing)
+        del missing
+        self.centered = values
+        self.squares = np.einsum("ij,ij->j", values, values)
+        # The sums over the rows where the other column has values are only needed with missing values
+        self.incomplete = bool((self.counts < len(values)).any())
+        self.masks = present if self.incomplete else None
+        self.chunk_rows = max(1, CHUNK_CELLS // max(1, self.n_columns))
+
+    def get_block(self, start: int, stop: int) -> np.ndarray:
+        """
+        Computes the rows start to stop of the correlation matrix, NaN when the columns share too few rows
+        """
+        block = self.centered[:, start:stop]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if not self.incomplete:
+                correlations = (block.T @ self.centered) / np.sqrt(np.outer(self.squares[start:stop], self.squares))
+                counts = np.broadcast_to(self.counts[start:stop, None], correlations.shape)
+            else:
+                # The masks are converted to floats by chunks of rows, the products are summed over the chunks
+                sums = None
+                for row in range(0, len(self.centered), self.chunk_rows):
+                    centered = self.centered[row:row + self.chunk_rows]
+                    masks = self.masks[row:row + self.chunk_rows].astype(np.float64)
+                    block, block_masks = centered[:, start:stop], masks[:, start:stop]
+                    parts = (block_masks.T @ masks, block.T @ centered, block.T @ masks, block_masks.T @ centered,
+                             np.square(block).T @ masks, block_masks.T @ np.square(centered))
+                    if sums is None:
+                        sums = parts
+                    else:
+                        for total, part in zip(sums, parts):
+                            total += part
+                counts, products, sums_i, sums_j, squares_i, squares_j = sums
+                covariances = counts * products - sums_i * sums_j
+                variances = (counts * squares_i - sums_i ** 2) * (counts * squares_j - sums_j ** 2)
+                correlations = covariances / np.sqrt(np.clip(variances, 0, None))
+        correlations = np.clip(correlations, -1, 1)
+        correlations[counts < MIN_OVERLAP_ROWS] = np.nan
+        return correlations
+
+    def iter_blocks(self, label: str = None):
+        """
+        Computes the correlation matrix by blocks of CORRELATION_BLOCK_ROWS rows
+
+        Returns:
+            A generator of (start, correlations) tuples, the correlations being the rows from start of the matrix
+        """
+        phase = start_phase(label or "Correlating the columns", total=self.n_columns)
+        try:
+            for start in range(0, self.n_columns, CORRELATION_BLOCK_ROWS):
+                stop = min(start + CORRELATION_BLOCK_ROWS, self.n_columns)
+                yield start, self.get_block(start, stop)
+                phase.advance(stop - start)
+        finally:
+            phase.close()
+
+
+def select_columns(correlated_pairs: list, n_columns: int, relevance: np.ndarray = None) -> tuple:
+    """
+    Chooses the columns to keep, greedily from the most relevant one
+
+    Args:
+        correlated_pairs: The (i, j, correlation) pairs of column positions correlated above the threshold
+        n_columns: The number of columns
+        relevance: The absolute correlation of each column with the target, NaN if unknown. The columns are
+            taken in their order if None.
+
+    Returns:
+        The sorted positions of the kept columns, and a dict of the position of the kept column that caused
+        the pruning of each pruned position
+    """
+    neighbors = [[] for _ in range(n_columns)]
+    for i, j, correlation in correlated_pairs:
+        neighbors[i].append((abs(correlation), j))
+        neighbors[j].append((abs(correlation), i))
+    if relevance is None:
+        order = np.arange(n_columns)
+    else:
+        # The columns without relevance come last, the ties are taken in the column order
+        order = np.lexsort((np.arange(n_columns), -np.nan_to_num(relevance, nan=-1.0)))
+
+    kept = np.zeros(n_columns, dtype=bool)
+    pruned = {}
+    for position in order:
+        kept_neighbors = [(correlation, neighbor) for correlation, neighbor in neighbors[position] if kept[neighbor]]
+        if kept_neighbors:
+            pruned[int(position)] = max(kept_neighbors, key=lambda pair: (pair[0], -pair[1]))[1]
+        else:
+            kept[position] = True
+    return np.flatnonzero(kept), pruned
+
+
+def prune_correlated_columns(collection_name: str, columns: list = None, target: str = None,
+                             threshold: float = DEFAULT_PRUNING_THRESHOLD, method: str = "pearson",
+                             database_name: str = DATABASE_NAME) -> dict:
+    """
+    Finds the columns of a dataset collection to prune because they are highly correlated with another column
+
+    Args:
+        collection_name: The name of the collection containing the data
+        columns: The columns that can be pruned, all the numeric columns except the target if None
+        target: The target column, the column most correlated with it is kept among correlated columns
+        threshold: The minimum absolute correlation of two columns for one of them to be pruned
+        method: One of CORRELATION_METHODS
+        database_name: The name of the database
+
+    Returns:
+        A dict with the "kept" columns and the "pruned" list of dicts with the pruned "column", the "keep"
+        column it is correlated with and their "correlation"
+
+    Description:
+        The columns are taken by decreasing absolute correlation with the target (in their order without
+        target), a column is kept when it is not correlated above threshold with a column already kept.
+        Only the pairs above threshold are kept from the blocks of the correlation matrix.
+    """
+    if columns is None:
+        stats = get_dataset_stats(collection_name, database_name)
+        columns = [column for column in stats.index
+                   if column not in ("_id", target) and is_numeric_dtype(stats.at[column, "dtype"])]
+    columns = [column for column in columns if column != target]
+    matrix_columns = columns + ([target] if target is not None else [])
+    values = load_numeric_matrix(collection_name, matrix_columns, database_name)
+    if target is not None and np.isnan(values[:, -1]).all():
+        raise ValueError(f"The target column {target} has no numeric value")
+    # The matrix is centered in place, it is only referenced by the blocks
+    blocks = CorrelationBlocks(values, method)
+    del values
+
+    n_columns = len(columns)
+    correlated_pairs = []
+    relevance = np.full(n_columns, np.nan) if target is not None else None
+    for start, block in blocks.iter_blocks(f"Correlating the columns of {collection_name}"):
+        if target is not None:
+            relevance[start:start + len(block)] = np.abs(block[:, n_columns])[:n_columns - start]
+        # Constant columns have a NaN correlation, never above the threshold
+        rows, others = np.nonzero(np.abs(block[:, :n_columns]) >= threshold)
+        for row, other in zip(rows, others):
+            if other > start + row:
+                correlated_pairs.append((start + row, other, float(block[row, other])))
+
+    kept, pruned = select_columns(correlated_pairs, n_columns, relevance)
+    correlations = {(min(i, j), max(i, j)): correlation for i, j, correlation in correlated_pairs}
+    return {
+        "kept": [columns[position] for position in kept],
+        "pruned": [{"column": columns[position], "keep": columns[keep],
+                    "correlation": round(correlations[(min(position, keep), max(position, keep))], 4)}
+                   for position, keep in sorted(pruned.items())]
+    }
@@ -0,0 +1,205 @@
+import base64
+import json
+import sys
+import uuid
+
+# Encodings a client can request for the tabular parts of a response (json params key: "responseEncoding")
+RESPONSE_ENCODINGS = ("json", "arrow", "msgpack")
+
+# Number of rows of each binary page
+DEFAULT_PAGE_SIZE = 50000
+
+
+def _is_dataframe(value) -> bool:
+    """
+    Checks if a value is a pandas DataFrame without importing pandas
+    """
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(value, pd.DataFrame)
+
+
+def _replace_dataframes(value, frames: dict):
+    """
+    Replaces the DataFrames found in the response (and its nested dicts) by unique placeholders
+
+    Args:
+        value: The response or one of its values
+        frames: Filled with the placeholders as keys and the DataFrames as values
+
+    Returns:
+        The value with its DataFrames replaced
+    """
+    if _is_dataframe(value):
+        placeholder = f"__dataframe_{uuid.uuid4().hex}__"
+        frames[placeholder] = value
+        return placeholder
+    if isinstance(value, dict):
+        return {key: _replace_dataframes(item, frames) for key, item in value.items()}
+    return value
+
+
+def _stringify_object_columns(df):
+    """
+    Converts the object columns of a DataFrame to strings so that they can be stored in a typed column
+    """
+    df = df.copy()
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].map(lambda value: None if value is None or value != value else str(value))
+    return df
+
+
+def _iter_arrow_pages(df, page_size: int):
+    """
+    Encodes a DataFrame as Arrow IPC stream pages
+
+    Args:
+        df: The DataFrame to encode
+        page_size: The number of rows of each page
+
+    Returns:
+        A generator of pages, each one being a base64 Arrow IPC stream, encoded when they are consumed
+    """
+    import pyarrow as pa
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed types in object columns
+        table = pa.Table.from_pandas(_stringify_object_columns(df), preserve_index=False)
+    for offset in range(0, max(table.num_rows, 1), page_size):
+        page = table.slice(offset, page_size)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, page.schema) as writer:
+            writer.write_table(page)
+        yield {
+            "offset": offset,
+            "row_count": page.num_rows,
+            "data": base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii")
+        }
+
+
+def _iter_msgpack_pages(df, page_size: int):
+    """
+    Encodes a DataFrame as msgpack pages, each page maps every column to its values
+
+    Args:
+        df: The DataFrame to encode
+        page_size: The number of rows of each page
+
+    Returns:
+        A generator of pages, each one being a base64 msgpack map, encoded when they are consumed
+    """
+    import msgpack
+    for offset in range(0, max(len(df), 1), page_size):
+        page = df.iloc[offset:offset + page_size]
+        packed = msgpack.packb(
+            {str(column): page[column].tolist() for column in page.columns},
+            default=str
+        )
+        yield {
+            "offset": offset,
+            "row_count": len(page),
+            "data": base64.b64encode(packed).decode("ascii")
+        }
+
+
+def _to_json_value(value):
+    """
+    Converts the values json can't serialize: dates to ISO strings, NumPy scalars to python values, others to strings
+    """
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def iter_dataframe_encoding(df, encoding: str = "json", page_size: int = DEFAULT_PAGE_SIZE):
+    """
+    Encodes a DataFrame as a JSON string, piece by piece
+
+    Args:
+        df: The DataFrame to encode
+        encoding: "json" for a list of records, "arrow" or "msgpack" for binary pages
+        page_size: The number of rows converted at once, and of each binary page
+
+    Returns:
+        A generator of the pieces of the JSON string of the records, or of the pages and their metadata for
+        the binary encodings
+
+    Description:
+        Only page_size rows are converted at once, so the records of the whole DataFrame are never held in
+        memory. The binary pages are base64 strings, a third bigger than their bytes, as the response is a
+        text protocol.
+    """
+    if encoding != "json":
+        try:
+            if encoding == "arrow":
+                import pyarrow  # noqa: F401
+                pages = _iter_arrow_pages(df, page_size)
+                encoding_name = "arrow-ipc"
+            else:
+                import msgpack  # noqa: F401
+                pages = _iter_msgpack_pages(df, page_size)
+                encoding_name = "msgpack"
+        except ImportError as e:
+            print(f"{encoding} encoding unavailable, falling back to json: {e}")
+        else:
+            header = json.dumps({
+                "__encoding__": encoding_name,
+                "columns": [str(column) for column in df.columns],
+                "row_count": len(df),
+                "page_size": page_size,
+                "pages": []
+            })
+            yield header[:-2]
+            for i, page in enumerate(pages):
+                yield (", " if i else "") + json.dumps(page)
+            yield "]}"
+            return
+    yield "["
+    for offset in range(0, len(df), page_size):
+        page = df.iloc[offset:offset + page_size]
+        # The floats keep all their digits like json.dumps of the records did, NaN and NaT become null
+        records = page.astype(object).where(page.notna(), None).to_dict(orient="records")
+        yield (", " if offset else "") + json.dumps(records, default=_to_json_value)[1:-1]
+    yield "]"
+
+
+def encode_dataframe(df, encoding: str = "json", page_size: int = DEFAULT_PAGE_SIZE) -> str:
+    """
+    Encodes a DataFrame as a JSON string, see iter_dataframe_encoding
+    """
+    return "".join(iter_dataframe_encoding(df, encoding, page_size))
+
+
+def iter_response_encoding(response, encoding: str = "json", page_size: int = DEFAULT_PAGE_SIZE):
+    """
+    Serializes a response piece by piece, the DataFrames it contains are encoded with the requested encoding
+
+    Args:
+        response: The response to serialize, DataFrames may be given as values of the response or of its nested dicts
+        encoding: One of RESPONSE_ENCODINGS
+        page_size: The number of rows of the DataFrames converted at once, and of each binary page
+
+    Returns:
+        A generator of the pieces of the JSON string of the response
+    """
+    if encoding not in RESPONSE_ENCODINGS:
+        raise ValueError(f"Unsupported response encoding: {encoding}")
+    frames = {}
+    to_send = json.dumps(_replace_dataframes(response, frames))
+    for placeholder, df in frames.items():
+        before, to_send = to_send.split(json.dumps(placeholder), 1)
+        yield before
+        yield from iter_dataframe_encoding(df, encoding, page_size)
+    yield to_send
+
+
+def encode_response(response, encoding: str = "json", page_size: int = DEFAULT_PAGE_SIZE) -> str:
+    """
+    Serializes a response, see iter_response_encoding
+
+    Returns:
+        The JSON string of the response
+    """
+    return "".join(iter_response_encoding(response, encoding, page_size))
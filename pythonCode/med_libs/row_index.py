@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from .dataset_loader import ROW_ORDER
+from .mongodb_utils import DATABASE_NAME, connect_to_mongo, get_dataset_version
+from .snapshot_cache import read_snapshot, write_snapshot
+
+# Suffix of the database name under which the row ids are cached, database names can't contain dots
+ROW_IDS_CACHE_SUFFIX = ".row_ids"
+
+
+def get_row_ids(collection_name: str, database_name: str = DATABASE_NAME) -> pd.Index:
+    """
+    Gets the _id of the rows of a dataset collection, in the order of the rows
+
+    Args:
+        collection_name: The name of the collection containing the data
+        database_name: The name of the database
+
+    Returns:
+        The index of the _id as strings, the position of a row is the position of its _id
+
+    Description:
+        The _id are read from the _id index only, in the order the dataset loader returns the rows
+        (see dataset_loader.ROW_ORDER). They are saved with the snapshots of the dataset, the writers
+        bumping its version make them stale.
+    """
+    version = get_dataset_version(collection_name, database_name)
+    cache_name = database_name + ROW_IDS_CACHE_SUFFIX
+    cached = read_snapshot(cache_name, collection_name, version)
+    if cached is not None:
+        return pd.Index(cached["_id"])
+
+    collection = connect_to_mongo(database_name)[collection_name]
+    # Covered by the _id index, the documents are not fetched
+    cursor = collection.find({}, {'_id': True}, batch_size=100000).sort(ROW_ORDER)
+    row_ids = pd.Index(np.array([str(document['_id']) for document in cursor], dtype=object))
+    write_snapshot(cache_name, collection_name, version, pd.DataFrame({"_id": row_ids}))
+    return row_ids
+
+
+def get_row_positions(collection_name: str, row_ids: list, database_name: str = DATABASE_NAME) -> np.ndarray:
+    """
+    Gets the positions of rows of a dataset collection, i.e. their index in the DataFrame of the dataset
+
+    Args:
+        collection_name: The name of the collection containing the data
+        row_ids: The _id of the rows (ObjectIds or strings)
+        database_name: The name of the database
+
+    Returns:
+        The positions, in the order of row_ids, -1 for the _id that are not in the collection
+    """
+    return get_row_ids(collection_name, database_name).get_indexer([str(row_id) for row_id in row_ids])
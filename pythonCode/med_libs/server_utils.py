@@ -1,19 +1,23 @@
 import os
 import sys
+import threading
 import traceback
 from pathlib import Path
 from json import dumps
-import pandas
-import pandas as pd
-import sklearn
-from flask import jsonify
-from pycaret.internal.pipeline import Pipeline
+from typing import TYPE_CHECKING
+
+# pandas, sklearn, flask and pycaret are imported by the functions using them: every script imports this
+# module and most of them never need these heavy dependencies
+if TYPE_CHECKING:
+    import pandas
+    import sklearn
 
 
 def get_json_from_request(request):
     """
     Gets the json from the request
     """
+    from flask import jsonify
     data = request.get_json()
     data = jsonify(data)
     json_config = data.json
@@ -24,6 +28,7 @@ def get_response_from_error(e=None, toast=None):
     """
     Gets the response from an error
     """
+    from flask import jsonify
     if e is not None:
         print(e)
         ex_type, ex_value, ex_traceback = sys.exc_info()
@@ -48,14 +53,27 @@ def get_repo_path():
     return str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent)
 
 
+# Serializes the writes to the stdout pipeline so that messages sent from several threads are never interleaved
+_stdout_lock = threading.Lock()
+
+
 def go_print(msg):
     """
     This function is used to print a message to the stdout pipeline wich go is listening to
     """
-    sys.stdout.flush()
-    sys.stdout.write(dumps(msg, indent=2))
-    sys.stdout.write("\n")
-    sys.stdout.flush()
+    go_print_frame(dumps(msg))
+
+
+def go_print_frame(frame: str):
+    """
+    This function is used to print a raw protocol line to the stdout pipeline wich go is listening to
+
+    Args:
+        frame: The line to send, it must not contain any newline character
+    """
+    with _stdout_lock:
+        sys.stdout.write(frame + "\n")
+        sys.stdout.flush()
 
 
 def find_next_available_port(start_port: int = 5001) -> int:
@@ -87,11 +105,12 @@ def get_free_space_mb(folder):
     return free / (1024.0 ** 3)
 
 
-def get_model_from_path(path: str) -> sklearn.base.BaseEstimator:
+def get_model_from_path(path: str) -> "sklearn.base.BaseEstimator":
     """
         This function is used to get the model from a medmodel
     """
     import joblib
+    from pycaret.internal.pipeline import Pipeline
     with open(path, "rb") as f:
         model = joblib.load(f)
     if isinstance(model, Pipeline):
@@ -99,7 +118,7 @@ def get_model_from_path(path: str) -> sklearn.base.BaseEstimator:
     return model
 
 
-def load_csv(path: str, target: str) -> pandas.DataFrame:
+def load_csv(path: str, target: str) -> "pandas.DataFrame":
     """
         This function is used to load a csv file
 
@@ -107,6 +126,7 @@ def load_csv(path: str, target: str) -> pandas.DataFrame:
             path: The path of the csv file
             target: The target column name
     """
+    import pandas
     df = pandas.read_csv(path)
     temp_df = df[df[target].notna()]
     temp_df.replace("", float("NaN"), inplace=True)
@@ -114,7 +134,7 @@ def load_csv(path: str, target: str) -> pandas.DataFrame:
     return temp_df
 
 
-def load_med_standard_data(database, dataset_list, vars_list, target) -> pandas.DataFrame:
+def load_med_standard_data(database, dataset_list, vars_list, target) -> "pandas.DataFrame":
     """
     This function is used to combine the dataframes.
     Args:
@@ -126,6 +146,8 @@ def load_med_standard_data(database, dataset_list, vars_list, target) -> pandas.
     Returns: the combined dataframe
 
     """
+    import pandas as pd
+    from .mongodb_utils import get_dataset_as_pd_df
 
     # load the dataframes
     df_dict = {}  # dict containing time points to their associated files
@@ -142,9 +164,7 @@ def load_med_standard_data(database, dataset_list, vars_list, target) -> pandas.
             elif T_in_name:
                 break
         if len(number) > 0:
-            collection = database[df_ids_list[i]]
-            collection_data = collection.find({}, {'_id': False})
-            df_dict['_T' + number] = pd.DataFrame(list(collection_data))
+            df_dict['_T' + number] = get_dataset_as_pd_df(df_ids_list[i], database.name)
     
     # Retrieve the first column
     first_col = df_dict['_T' + number].columns[0]
@@ -157,7 +177,7 @@ def load_med_standard_data(database, dataset_list, vars_list, target) -> pandas.
     df_list = [df_dict[key] for key in sorted_keys]
 
     # merge the dataframes on the first column and the target
-    df_merged: pandas.DataFrame = df_list[0]
+    df_merged: pd.DataFrame = df_list[0]
     for i in range(len(df_list) - 1):
         df_merged = df_merged.merge(df_list[i + 1], on=[first_col, target], how='outer')
 
@@ -0,0 +1,221 @@
+import os
+import re
+import threading
+import uuid
+
+from .server_utils import go_print
+
+# Disk budget (in MB) of the snapshots, can be changed with the MED_SNAPSHOT_CACHE_MB environment variable (0 disables the cache)
+DEFAULT_CACHE_BUDGET_MB = 2048
+
+# Snapshots are Arrow IPC files so that they can be memory-mapped
+SNAPSHOT_EXTENSION = ".arrow"
+
+_cache_lock = threading.Lock()
+
+
+def get_cache_folder() -> str:
+    """
+    Gets the folder containing the snapshots, in the MED_TMP folder
+    """
+    return os.path.expanduser(os.path.join(os.environ.get("MED_TMP", "~"), "med_snapshots"))
+
+
+def get_cache_budget() -> int:
+    """
+    Gets the disk budget of the snapshots
+
+    Returns:
+        The budget in bytes, 0 if the cache is disabled
+    """
+    try:
+        budget_mb = float(os.environ.get("MED_SNAPSHOT_CACHE_MB", DEFAULT_CACHE_BUDGET_MB))
+    except ValueError:
+        budget_mb = DEFAULT_CACHE_BUDGET_MB
+    return max(int(budget_mb * 1024 * 1024), 0)
+
+
+def _get_prefix(database_name: str, collection_name: str) -> str:
+    """
+    Gets the prefix of the snapshot files of a collection
+    """
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{database_name}.{collection_name}") + "@"
+
+
+def _get_snapshot_path(database_name: str, collection_name: str, version: str) -> str:
+    """
+    Gets the path of the snapshot of a version of a collection
+    """
+    file_name = _get_prefix(database_name, collection_name) + re.sub(r"[^A-Za-z0-9_.-]", "_", version)
+    return os.path.join(get_cache_folder(), file_name + SNAPSHOT_EXTENSION)
+
+
+def _open_snapshot(database_name: str, collection_name: str, version: str, columns: list = None):
+    """
+    Opens the snapshot of a version of a collection as a memory-mapped Arrow table
+
+    Returns:
+        The table restricted to the requested columns that exist, None if there is no snapshot of this version
+    """
+    if not get_cache_budget():
+        return None
+    path = _get_snapshot_path(database_name, collection_name, version)
+    if not os.path.exists(path):
+        return None
+    try:
+        import pyarrow as pa
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+    except ImportError:
+        return None
+    except (OSError, ValueError) as error:
+        # Evicted meanwhile or truncated file
+        go_print(f"Could not read the snapshot of {collection_name}: {error}")
+        return None
+    # The modification time orders the snapshots from the least recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    if columns is not None:
+        table = table.select([column for column in columns if column in table.column_names])
+    return table
+
+
+def read_snapshot(database_name: str, collection_name: str, version: str, columns: list = None):
+    """
+    Reads the snapshot of a version of a collection
+
+    Args:
+        database_name: The name of the database
+        collection_name: The name of the collection
+        version: The version of the collection (see mongodb_utils.get_dataset_version)
+        columns: The columns to read, all the columns if None
+
+    Returns:
+        The DataFrame of the snapshot, None if there is no snapshot of this version or if pyarrow is not installed
+    """
+    table = _open_snapshot(database_name, collection_name, version, columns)
+    return table.to_pandas() if table is not None else None
+
+
+def iter_snapshot_batches(database_name: str, collection_name: str, version: str, columns: list = None,
+                          batch_size: int = 10000):
+    """
+    Reads the snapshot of a version of a collection by batches of rows
+
+    Args:
+        database_name: The name of the database
+        collection_name: The name of the collection
+        version: The version of the collection (see mongodb_utils.get_dataset_version)
+        columns: The columns to read, all the columns if None
+        batch_size: The number of rows of each batch
+
+    Returns:
+        A generator of DataFrames, None if there is no snapshot of this version or if pyarrow is not installed
+    """
+    table = _open_snapshot(database_name, collection_name, version, columns)
+    if table is None:
+        return None
+    return (table.slice(offset, batch_size).to_pandas() for offset in range(0, table.num_rows, batch_size))
+
+
+def write_snapshot(database_name: str, collection_name: str, version: str, df) -> bool:
+    """
+    Saves the snapshot of a version of a collection, replacing its older versions
+
+    Args:
+        database_name: The name of the database
+        collection_name: The name of the collection
+        version: The version of the collection (see mongodb_utils.get_dataset_version)
+        df: The DataFrame of the collection
+
+    Returns:
+        True if the snapshot was saved
+    """
+    budget = get_cache_budget()
+    if not budget:
+        return False
+    try:
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except ImportError:
+        return False
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Columns with mixed types can't be stored without changing them
+        return False
+    if table.nbytes > budget:
+        return False
+
+    path = _get_snapshot_path(database_name, collection_name, version)
+    os.makedirs(get_cache_folder(), exist_ok=True)
+    temporary_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with pa.OSFile(temporary_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary_path, path)
+    except OSError as error:
+        go_print(f"Could not save the snapshot of {collection_name}: {error}")
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        return False
+    invalidate_snapshots(database_name, collection_name, keep=path)
+    evict_snapshots(budget)
+    return True
+
+
+def invalidate_snapshots(database_name: str, collection_name: str, keep: str = None):
+    """
+    Deletes the snapshots of a collection
+
+    Args:
+        database_name: The name of the database
+        collection_name: The name of the collection
+        keep: The path of a snapshot to keep
+    """
+    folder = get_cache_folder()
+    if not os.path.isdir(folder):
+        return
+    prefix = _get_prefix(database_name, collection_name)
+    with _cache_lock:
+        for file_name in os.listdir(folder):
+            path = os.path.join(folder, file_name)
+            if file_name.startswith(prefix) and file_name.endswith(SNAPSHOT_EXTENSION) and path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def evict_snapshots(budget: int = None):
+    """
+    Deletes the least recently used snapshots until the snapshots fit in the disk budget
+
+    Args:
+        budget: The budget in bytes, get_cache_budget() if None
+    """
+    if budget is None:
+        budget = get_cache_budget()
+    folder = get_cache_folder()
+    if not os.path.isdir(folder):
+        return
+    with _cache_lock:
+        snapshots = []
+        for file_name in os.listdir(folder):
+            if not file_name.endswith(SNAPSHOT_EXTENSION):
+                continue
+            try:
+                stat = os.stat(os.path.join(folder, file_name))
+            except OSError:
+                continue
+            snapshots.append((stat.st_mtime, stat.st_size, file_name))
+        total = sum(size for _, size, _ in snapshots)
+        for _, size, file_name in sorted(snapshots):
+            if total <= budget:
+                break
+            try:
+                os.remove(os.path.join(folder, file_name))
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,389 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from bson import Binary
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from .mongodb_utils import DATABASE_NAME, connect_to_mongo, get_dataset_version
+from .server_utils import go_print
+
+# Collection holding the column statistics of the dataset collections, one document per column
+DATASET_STATS_COLLECTION = 'datasetStats'
+
+# Number of hash bits selecting a HyperLogLog register, 2^11 registers estimate the distinct counts within ~2.3%
+HLL_PRECISION = 11
+
+# Columns of the DataFrame returned by get_dataset_stats
+STATS_COLUMNS = ["dtype", "rows", "nulls", "min", "max", "distinct", "hash"]
+
+# Mixes the row position into the hash of a value, so that the hash of a column depends on the order of its values
+_POSITION_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# Statistics computed by the writers, saved when the version of their collection is bumped
+_pending_stats = {}
+_pending_lock = threading.Lock()
+_indexes_ensured = set()
+
+
+def _mix(hashes: np.ndarray) -> np.ndarray:
+    """
+    Mixes the bits of 64-bit hashes (splitmix64 finalizer)
+    """
+    with np.errstate(over="ignore"):
+        hashes = hashes ^ (hashes >> np.uint64(30))
+        hashes = hashes * np.uint64(0xBF58476D1CE4E5B9)
+        hashes = hashes ^ (hashes >> np.uint64(27))
+        hashes = hashes * np.uint64(0x94D049BB133111EB)
+        return hashes ^ (hashes >> np.uint64(31))
+
+
+def get_missing_mask(values: pd.Series) -> np.ndarray:
+    """
+    Gets the missing values of a column: null, NaN or empty string, like the app displays them
+    """
+    mask = values.isna().to_numpy()
+    if values.dtype == object or isinstance(values.dtype, pd.StringDtype):
+        mask = mask | (values == "").to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def hash_values(values: pd.Series) -> np.ndarray:
+    """
+    Hashes the values of a column, the numbers are hashed as floats and the dates in nanoseconds so that a
+    value has the same hash whatever the dtype of the chunk it is in
+    """
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iuf":
+        values = values.astype(np.float64)
+    elif isinstance(values.dtype, np.dtype) and values.dtype.kind == "M":
+        values = values.astype("datetime64[ns]")
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def hash_positions(hashes: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Combines the hashes of values (see hash_values) with the positions of their rows, uint64 arrays
+    """
+    with np.errstate(over="ignore"):
+        return _mix(hashes ^ (positions * _POSITION_MULTIPLIER))
+
+
+def _to_python(value):
+    """
+    Converts a minimum or a maximum to a value BSON can encode, None if missing
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or value is pd.NaT or (isinstance(value, float) and value != value):
+        return None
+    return value
+
+
+def _merge_dtypes(first: str, second: str) -> str:
+    """
+    Gets the dtype of a column made of two parts of different dtypes
+    """
+    if second is None:
+        return first
+    if first is None or first == second:
+        return second
+    try:
+        first_dtype, second_dtype = np.dtype(first), np.dtype(second)
+    except TypeError:
+        return "object"
+    if first_dtype.kind in "iuf" and second_dtype.kind in "iuf":
+        return str(np.result_type(first_dtype, second_dtype))
+    return "object"
+
+
+def estimate_distinct(registers: np.ndarray) -> float:
+    """
+    Estimates the number of distinct values from HyperLogLog registers
+
+    Args:
+        registers: The registers, uint8 array of 2^HLL_PRECISION elements
+
+    Returns:
+        The estimate, exact for the very small counts
+    """
+    size = registers.size
+    alpha = 0.7213 / (1 + 1.079 / size)
+    estimate = alpha * size * size / np.sum(np.power(2.0, -registers.astype(np.float64)))
+    zeros = np.count_nonzero(registers == 0)
+    if estimate <= 2.5 * size and zeros:
+        # Linear counting for the small cardinalities
+        estimate = size * np.log(size / zeros)
+    return float(estimate)
+
+
+class DatasetStatsAccumulator:
+    """
+    This class is used to compute the column statistics of a dataset chunk by chunk
+
+    Args:
+        offset: The position of the first row added, for the rows appended to a dataset
+    """
+
+    def __init__(self, offset: int = 0):
+        self.offset = offset
+        self.rows = 0
+        self.columns = {}
+
+    def _get_column(self, name: str) -> dict:
+        """
+        Gets the statistics of a column, created empty if the column is new
+        """
+        if name not in self.columns:
+            self.columns[name] = {
+                "name": name, "dtype": None, "rows": 0, "nulls": 0, "min": None, "max": None,
+                "registers": np.zeros(1 << HLL_PRECISION, dtype=np.uint8), "hash": 0
+            }
+        return self.columns[name]
+
+    def add(self, chunk: pd.DataFrame):
+        """
+        Adds the rows of a chunk, they follow the rows already added
+
+        Args:
+            chunk: The DataFrame of the rows
+        """
+        size = len(chunk)
+        positions = np.arange(self.offset + self.rows, self.offset + self.rows + size, dtype=np.uint64)
+        for i in range(chunk.shape[1]):
+            values = chunk.iloc[:, i]
+            column = self._get_column(str(chunk.columns[i]))
+            missing = get_missing_mask(values)
+            hashes = hash_values(values)
+
+            # A chunk where the column has no value gives no information on its dtype
+            if not missing.all():
+                column["dtype"] = _merge_dtypes(column["dtype"], str(values.dtype))
+            # The rows before the first appearance of the column are missing
+            column["nulls"] += self.rows - column["rows"] + int(missing.sum())
+            column["rows"] = self.rows + size
+            row_hashes = hash_positions(hashes, positions)
+            column["hash"] = (column["hash"] + int(row_hashes.sum(dtype=np.uint64))) % (1 << 64)
+            self._add_to_registers(column["registers"], hashes[~missing])
+
+            if isinstance(values.dtype, np.dtype) and values.dtype.kind in "biufM" and not missing.all():
+                present = values[~missing]
+                self._update_bounds(column, _to_python(present.min()), _to_python(present.max()))
+        self.rows += size
+
+    @staticmethod
+    def _update_bounds(column: dict, minimum, maximum):
+        """
+        Updates the minimum and the maximum of a column, they are dropped if the values can't be compared
+        """
+        try:
+            column["min"] = minimum if column["min"] is None or minimum is None else min(column["min"], minimum)
+            column["max"] = maximum if column["max"] is None or maximum is None else max(column["max"], maximum)
+        except TypeError:
+            column["min"] = column["max"] = None
+
+    @staticmethod
+    def _add_to_registers(registers: np.ndarray, hashes: np.ndarray):
+        """
+        Adds hashes to HyperLogLog registers
+        """
+        if not hashes.size:
+            return
+        hashes = _mix(hashes)
+        index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - HLL_PRECISION)) - 1)
+        # Position of the first 1 bit of the remaining bits, the bit length of 0 is 0
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        np.maximum.at(registers, index, (64 - HLL_PRECISION - bit_length + 1).astype(np.uint8))
+
+    def merge(self, other: "DatasetStatsAccumulator"):
+        """
+        Adds the statistics of the rows following the rows of this accumulator
+
+        Args:
+            other: The accumulator of the following rows, its offset must be the number of rows of this one
+        """
+        for name, other_column in other.columns.items():
+            column = self._get_column(name)
+            column["dtype"] = _merge_dtypes(column["dtype"], other_column["dtype"])
+            column["nulls"] += self.rows - column["rows"] + other_column["nulls"]
+            column["rows"] = self.rows + other_column["rows"]
+            column["hash"] = (column["hash"] + other_column["hash"]) % (1 << 64)
+            np.maximum(column["registers"], other_column["registers"], out=column["registers"])
+            self._update_bounds(column, other_column["min"], other_column["max"])
+        self.rows += other.rows
+
+    def get_columns(self) -> list:
+        """
+        Gets the statistics of the columns, in the order of their first appearance
+        """
+        for column in self.columns.values():
+            column["nulls"] += self.rows - column["rows"]
+            column["rows"] = self.rows
+            column["distinct"] = estimate_distinct(column["registers"])
+            if column["dtype"] is None:
+                column["dtype"] = "object"
+        return list(self.columns.values())
+
+    @classmethod
+    def from_documents(cls, documents: list) -> "DatasetStatsAccumulator":
+        """
+        Creates an accumulator from the documents of the catalog
+        """
+        accumulator = cls()
+        for document in documents:
+            column = accumulator._get_column(document["name"])
+            column.update({key: document.get(key) for key in ("dtype", "rows", "nulls", "min", "max")})
+            column["registers"] = np.frombuffer(document["registers"], dtype=np.uint8).copy()
+            column["hash"] = int(document["hash"], 16)
+            accumulator.rows = max(accumulator.rows, document["rows"])
+        return accumulator
+
+
+def _get_stats_collection(database_name: str):
+    """
+    Gets the collection of the catalog, with its index
+    """
+    collection = connect_to_mongo(database_name)[DATASET_STATS_COLLECTION]
+    if database_name not in _indexes_ensured:
+        collection.create_index([('collection', ASCENDING), ('position', ASCENDING)])
+        _indexes_ensured.add(database_name)
+    return collection
+
+
+def save_dataset_stats(collection_name: str, accumulator: DatasetStatsAccumulator, version: str,
+                       database_name: str = DATABASE_NAME):
+    """
+    Saves the column statistics of a dataset collection in the catalog
+
+    Args:
+        collection_name: The name of the collection containing the data
+        accumulator: The statistics of all the rows of the collection
+        version: The version of the collection the statistics describe (see mongodb_utils.get_dataset_version)
+        database_name: The name of the database
+
+    Returns:
+        The saved documents
+    """
+    documents = []
+    for position, column in enumerate(accumulator.get_columns()):
+        documents.append({
+            "collection": collection_name, "position": position, "version": version,
+            "name": column["name"], "dtype": column["dtype"], "rows": column["rows"], "nulls": column["nulls"],
+            "min": column["min"], "max": column["max"], "distinct": column["distinct"],
+            "registers": Binary(column["registers"].tobytes()), "hash": f"{column['hash']:016x}"
+        })
+    stats_collection = _get_stats_collection(database_name)
+    stats_collection.delete_many({"collection": collection_name})
+    if documents:
+        # insert_many adds the _id to the documents
+        stats_collection.insert_many([dict(document) for document in documents])
+    return documents
+
+
+def compute_dataset_stats(collection_name: str, database_name: str = DATABASE_NAME) -> DatasetStatsAccumulator:
+    """
+    Computes the column statistics of a dataset collection, reading it chunk by chunk
+    """
+    from .dataset_loader import iter_dataset_chunks
+    accumulator = DatasetStatsAccumulator()
+    for chunk in iter_dataset_chunks(collection_name, database_name=database_name):
+        accumulator.add(chunk)
+    return accumulator
+
+
+def get_dataset_stats(collection_name: str, database_name: str = DATABASE_NAME, columns: list = None) -> pd.DataFrame:
+    """
+    Gets the column statistics of a dataset collection from the catalog
+
+    Args:
+        collection_name: The name of the collection containing the data
+        database_name: The name of the database
+        columns: The columns to get, all the columns if None
+
+    Returns:
+        A DataFrame indexed by column name, in the order of the columns, with STATS_COLUMNS: the dtype,
+        the number of rows, the number of missing values (null, NaN or empty string), the minimum and the
+        maximum (numbers, booleans and dates), the estimated number of distinct values and the hash of the
+        values in the order of the rows (equal for columns with the same values)
+
+    Description:
+        The catalog is updated by the bulk writer when it writes a dataset. When the collection was
+        changed by another writer, the statistics are computed again from the collection and saved.
+    """
+    version = get_dataset_version(collection_name, database_name)
+    query = {"collection": collection_name}
+    if columns is not None:
+        query["name"] = {"$in": [str(column) for column in columns]}
+    documents = list(_get_stats_collection(database_name).find(query, {"registers": 0}).sort("position", ASCENDING))
+    if not documents or any(document["version"] != version for document in documents):
+        accumulator = compute_dataset_stats(collection_name, database_name)
+        documents = save_dataset_stats(collection_name, accumulator, version, database_name)
+        if columns is not None:
+            documents = [document for document in documents if document["name"] in query["name"]["$in"]]
+    stats = pd.DataFrame([{key: document.get(key) for key in ["name"] + STATS_COLUMNS} for document in documents],
+                         columns=["name"] + STATS_COLUMNS)
+    return stats.set_index("name")
+
+
+def set_pending_stats(collection, accumulator: DatasetStatsAccumulator, base_version: str = None):
+    """
+    Keeps the statistics of the rows written by a writer until the version of the collection is bumped
+
+    Args:
+        collection: The collection written
+        accumulator: The statistics of the rows written
+        base_version: The version of the collection before the rows were appended, None if it was empty
+    """
+    with _pending_lock:
+        _pending_stats[(collection.database.name, collection.name)] = (accumulator, base_version)
+
+
+def rename_pending_stats(database_name: str, collection_name: str, new_name: str):
+    """
+    Moves the pending statistics of a collection that was renamed
+    """
+    with _pending_lock:
+        pending = _pending_stats.pop((database_name, collection_name), None)
+        if pending is not None:
+            _pending_stats[(database_name, new_name)] = pending
+
+
+def discard_pending_stats(database_name: str, collection_name: str):
+    """
+    Forgets the pending statistics of a collection, e.g. when its write failed
+    """
+    with _pending_lock:
+        _pending_stats.pop((database_name, collection_name), None)
+
+
+def commit_pending_stats(collection_name: str, database_name: str = DATABASE_NAME):
+    """
+    Saves the pending statistics of a collection whose version was bumped
+
+    Description:
+        The statistics of appended rows are merged with the catalog if it describes the collection before the
+        append. They are dropped when the collection doesn't have the rows they describe (e.g. another writer
+        wrote meanwhile), the catalog is then computed again on the next read.
+    """
+    with _pending_lock:
+        pending = _pending_stats.pop((database_name, collection_name), None)
+    if pending is None:
+        return
+    accumulator, base_version = pending
+    try:
+        if base_version is not None:
+            documents = list(_get_stats_collection(database_name).find({"collection": collection_name}).sort("position", ASCENDING))
+            if not documents or any(document["version"] != base_version for document in documents):
+                return
+            base = DatasetStatsAccumulator.from_documents(documents)
+            if base.rows != accumulator.offset:
+                return
+            base.merge(accumulator)
+            accumulator = base
+        if accumulator.rows != connect_to_mongo(database_name)[collection_name].count_documents({}):
+            return
+        save_dataset_stats(collection_name, accumulator, get_dataset_version(collection_name, database_name), database_name)
+    except PyMongoError as error:
+        # The catalog is only an optimization, it is computed again on the next read
+        go_print(f"Could not save the statistics of {collection_name}: {error}")
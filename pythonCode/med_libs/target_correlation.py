@@ -0,0 +1,166 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Correlations computed between the target and the other columns
+CORRELATION_METHODS = ("spearman", "pearson")
+
+# Number of columns correlated at once, the ranks of a block are held in memory
+COLUMN_BLOCK = 256
+
+# A numeric target with at most this number of integer values is a class for the mutual information
+MAX_DISCRETE_TARGET_VALUES = 20
+
+
+def _get_values(df: pd.DataFrame, columns: list) -> np.ndarray:
+    """
+    Gets the values of columns as floats, NaN when missing or not a number
+    """
+    values = np.full((len(df), len(columns)), np.nan)
+    for i, column in enumerate(columns):
+        values[:, i] = pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return values
+
+
+def _correlate(values: np.ndarray, target: np.ndarray) -> tuple:
+    """
+    Computes the Pearson correlation of each column with the target, on the rows where the column has a value
+
+    Args:
+        values: The columns, NaN when missing
+        target: The target, without missing values
+
+    Returns:
+        The correlations and the numbers of rows they are computed on
+    """
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    # Centered values for the accuracy of the sums
+    values = np.where(present, values, 0.0)
+    centered = np.where(present, values - values.sum(axis=0) / np.maximum(counts, 1), 0.0)
+    target = target - target.mean()
+    sums_x, sums_y = centered.sum(axis=0), target @ present
+    squares_x, squares_y = np.square(centered).sum(axis=0), np.square(target) @ present
+    products = target @ centered
+    with np.errstate(invalid="ignore", divide="ignore"):
+        covariances = counts * products - sums_x * sums_y
+        variances = (counts * squares_x - sums_x ** 2) * (counts * squares_y - sums_y ** 2)
+        correlations = covariances / np.sqrt(np.clip(variances, 0, None))
+    correlations[counts < 2] = np.nan
+    return np.clip(correlations, -1, 1), counts
+
+
+def _correlate_ranks(values: np.ndarray, target: np.ndarray, target_ranks: np.ndarray) -> tuple:
+    """
+    Computes the Spearman correlation of each column with the target, like pandas: on the rows where the
+    column has a value, ranked again on these rows
+
+    Returns:
+        The correlations and the numbers of rows they are computed on
+    """
+    from scipy.stats import rankdata
+    present = ~np.isnan(values)
+    complete = present.all(axis=0)
+    correlations, counts = np.full(values.shape[1], np.nan), present.sum(axis=0)
+    # The columns without missing values share the ranks of the target
+    if complete.any():
+        correlations[complete], _ = _correlate(rankdata(values[:, complete], axis=0), target_ranks)
+    for i in np.flatnonzero(~complete & (counts > 1)):
+        rows = present[:, i]
+        correlations[i] = _correlate(rankdata(values[rows, i])[:, None], rankdata(target[rows]))[0][0]
+    return correlations, counts
+
+
+def _get_p_values(correlations: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Computes the two-sided p-values of correlations with the Student t distribution, like scipy.stats
+    """
+    from scipy.stats import t as student
+    degrees = counts - 2.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        statistics = correlations * np.sqrt(degrees / ((1 - correlations) * (1 + correlations)))
+        p_values = 2 * student.sf(np.abs(statistics), degrees)
+    p_values[degrees < 1] = np.nan
+    return p_values
+
+
+def _is_discrete(target: pd.Series) -> bool:
+    """
+    Checks if a target is a class, for the mutual information
+    """
+    if not pd.api.types.is_numeric_dtype(target.dtype) or pd.api.types.is_bool_dtype(target.dtype):
+        return True
+    values = target.dropna()
+    return bool((values == np.round(values)).all()) and values.nunique() <= MAX_DISCRETE_TARGET_VALUES
+
+
+def _get_mutual_information(values: np.ndarray, target: np.ndarray, discrete: bool) -> float:
+    """
+    Estimates the mutual information of a column with the target, on the rows where the column has a value
+    """
+    from sklearn.feature_selection import mutual_info_classif, mutual_info_regression
+    rows = ~np.isnan(values)
+    if rows.sum() < 4:
+        return np.nan
+    estimate = mutual_info_classif if discrete else mutual_info_regression
+    return float(estimate(values[rows, None], target[rows], random_state=0)[0])
+
+
+def correlate_with_target(df: pd.DataFrame, columns: list, target: str, method: str = "spearman",
+                          p_values: bool = False, mutual_information: bool = False,
+                          max_workers: int = None) -> pd.DataFrame:
+    """
+    Computes the correlation of columns with a target column
+
+    Args:
+        df: The DataFrame containing the columns and the target
+        columns: The columns, their non-numeric values are ignored
+        target: The target column
+        method: One of CORRELATION_METHODS
+        p_values: Whether to compute the p-values of the correlations
+        mutual_information: Whether to estimate the mutual information of the columns with the target
+        max_workers: The number of threads computing the blocks of columns, the number of CPUs if None
+
+    Returns:
+        A DataFrame indexed by column with the "correlation", "p_value" and "mutual_information" columns requested
+
+    Description:
+        The rows without target are dropped and the target is ranked once, then the columns are correlated
+        with it by blocks of COLUMN_BLOCK, without computing the correlations between the columns. The
+        correlations are the ones of pandas.DataFrame.corr (pairwise complete rows).
+    """
+    from scipy.stats import rankdata
+    if method not in CORRELATION_METHODS:
+        raise ValueError(f"Unsupported correlation method: {method}")
+    target_values = pd.to_numeric(df[target], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    rows = ~np.isnan(target_values)
+    if not rows.any():
+        raise ValueError(f"The target column {target} has no numeric value")
+    df, target_values = df[rows], target_values[rows]
+    target_ranks = rankdata(target_values)
+
+    def correlate_block(block: list) -> tuple:
+        values = _get_values(df, block)
+        if method == "spearman":
+            return _correlate_ranks(values, target_values, target_ranks)
+        return _correlate(values, target_values)
+
+    blocks = [columns[start:start + COLUMN_BLOCK] for start in range(0, len(columns), COLUMN_BLOCK)]
+    # NumPy and SciPy release the GIL while they sort and multiply, so the blocks run concurrently on threads
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        block_results = list(executor.map(correlate_block, blocks))
+    correlations = np.concatenate([result[0] for result in block_results]) if blocks else np.zeros(0)
+    counts = np.concatenate([result[1] for result in block_results]) if blocks else np.zeros(0)
+
+    results = pd.DataFrame({"correlation": correlations}, index=pd.Index(columns))
+    if p_values:
+        results["p_value"] = _get_p_values(correlations, counts)
+    if mutual_information:
+        discrete = _is_discrete(df[target])
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            results["mutual_information"] = list(executor.map(
+                lambda column: _get_mutual_information(_get_values(df, [column])[:, 0], target_values, discrete),
+                columns))
+    return results
@@ -7,8 +7,8 @@ import pandas as pd
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.dataset_loader import load_dataset
 from med_libs.server_utils import go_print
 
 MODULE_DIR = str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent / 'submodules' / 'MEDprofiles')
@@ -20,9 +20,6 @@ sys.path.append(SUBMODULE_DIR)
 from submodules.MEDprofiles.MEDprofiles.src.back.constant import *
 from submodules.MEDprofiles.MEDprofiles.src.back.create_classes_from_master_table import *
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 class GoExecCreateMEDclasses(GoExecutionScript):
     """
@@ -50,11 +47,8 @@ class GoExecCreateMEDclasses(GoExecutionScript):
         master_table_id = json_config["masterTableID"]
         MEDprofiles_folder = json_config["MEDprofilesFolderPath"]
     
-        # Connect to MongoDB
-        db = connect_to_mongo()
-
         # Get the master csv from the database
-        master_table = pd.DataFrame(list(db[master_table_id].find())).drop('_id', axis=1)
+        master_table = load_dataset(master_table_id)
 
         # Append indexes to the master table top row
         master_table.loc[-1] = master_table.columns
@@ -143,5 +137,4 @@ class GoExecCreateMEDclasses(GoExecutionScript):
         sys.path.append(path_gen_pkg_MEDclasses)
 
 
-script = GoExecCreateMEDclasses(json_params_dict, id_)
-script.start()
+run_script(GoExecCreateMEDclasses)
@@ -8,13 +8,11 @@ import pandas as pd
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.dataset_loader import load_dataset
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 class GoExecCreateMasterTable(GoExecutionScript):
     """
@@ -51,13 +49,13 @@ class GoExecCreateMasterTable(GoExecutionScript):
         db = connect_to_mongo()
         
         # Initialize df_master from the first csv
-        df_master_mongo = pd.DataFrame(list(db[collections[0]].find())).drop('_id', axis=1)
+        df_master_mongo = load_dataset(collections[0])
         columns = ['PatientID', 'Date'] + list(df_master_mongo.columns[2:])
         df_master_mongo.columns = columns
 
         # Merge all dataframes
         for collection in collections[1:]:
-            df = pd.DataFrame(list(db[collection].find())).drop('_id', axis=1)
+            df = load_dataset(collection)
             columns = ['PatientID', 'Date'] + list(df.columns[2:])
             df.columns = columns
             df_master_mongo = df_master_mongo.merge(df, on=['PatientID', 'Date'], how='outer')
@@ -80,7 +78,7 @@ class GoExecCreateMasterTable(GoExecutionScript):
 
         # Save the merged dataframe to a new collection and insert it into the database
         db[id].insert_many(df_master_mongo.to_dict(orient='records'))
+        bump_dataset_version(id)
 
 
-script = GoExecCreateMasterTable(json_params_dict, id_)
-script.start()
+run_script(GoExecCreateMasterTable)
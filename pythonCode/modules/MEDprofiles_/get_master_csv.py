@@ -7,13 +7,11 @@ import pandas as pd
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.dataset_loader import load_dataset
 from med_libs.mongodb_utils import connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 class GoExecGetMasterCsv(GoExecutionScript):
     """
@@ -28,6 +26,18 @@ class GoExecGetMasterCsv(GoExecutionScript):
         super().__init__(json_params, _id)
         self.results = {"data": "nothing to return"}
 
+    @staticmethod
+    def names_matching_formats(names: list) -> bool:
+        """
+        Return True if the column names can match the master or the submaster table format, so that
+        the collections that can't match are not loaded.
+        """
+        names = [name for name in names if name != "_id"]
+        if len(names) < 2 or not all('_' in str(name) for name in names[3:]):
+            return False
+        master_names = names[:3] == ["PatientID", "Date", "Time_point"]
+        return master_names or (len(names) < 3 or '_' in str(names[2]))
+
     def file_matching_master_format(self, df):
         """
         Return True if the csv file in parameter match the master table format.
@@ -107,14 +117,15 @@ class GoExecGetMasterCsv(GoExecutionScript):
         submaster_csv = []
         master_csv = []
 
-        # Connect to MongoDB
-        db = connect_to_mongo()
-
         # Identify csv paths matching the formats
+        db = connect_to_mongo()
         for collection in collections:
-            df = pd.DataFrame(list(db[collection].find()))
-            if '_id' in df.columns:
-                df = df.drop('_id', axis=1)
+            # The column names of a csv collection are the fields of its documents
+            first_document = db[collection].find_one()
+            if first_document is None or not self.names_matching_formats(list(first_document)):
+                continue
+            df = load_dataset(collection)
+            if not df.empty:
                 if self.file_matching_master_format(df):
                     master_csv.append(collection)
                 if self.file_matching_submaster_format(df):
@@ -128,5 +139,4 @@ class GoExecGetMasterCsv(GoExecutionScript):
         return self.results
 
 
-script = GoExecGetMasterCsv(json_params_dict, id_)
-script.start()
+run_script(GoExecGetMasterCsv)
@@ -3,12 +3,10 @@ import os
 import sys
 from pathlib import Path
 
-import pandas as pd
-
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.dataset_loader import load_dataset
 from med_libs.server_utils import go_print
 
 MODULE_DIR = str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent / 'submodules' / 'MEDprofiles')
@@ -21,9 +19,6 @@ sys.path.append(SUBMODULE_DIR)
 from submodules.MEDprofiles.MEDprofiles.src.back.instantiate_data_from_master_table import *
 from submodules.MEDprofiles.MEDprofiles.src.back.constant import *
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 class GoExecInitializeMEDprofilesInstantiation(GoExecutionScript):
     """
@@ -53,9 +48,8 @@ class GoExecInitializeMEDprofilesInstantiation(GoExecutionScript):
         if MEDclasses_module not in sys.path:
             sys.path.append(MEDclasses_module)
                 
-        # Connect to MongoDB and get the master table
-        db = connect_to_mongo()
-        master_table = pd.DataFrame(list(db[master_table_id].find())).drop('_id', axis=1)
+        # Get the master table
+        master_table = load_dataset(master_table_id)
 
         # Append indexes to the master table top row
         master_table.loc[-1] = master_table.columns
@@ -74,5 +68,4 @@ class GoExecInitializeMEDprofilesInstantiation(GoExecutionScript):
         return self.results
 
 
-script = GoExecInitializeMEDprofilesInstantiation(json_params_dict, id_)
-script.start()
+run_script(GoExecInitializeMEDprofilesInstantiation)
@@ -11,7 +11,8 @@ from tqdm import tqdm
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.dataset_loader import load_dataset
 from med_libs.mongodb_utils import connect_to_mongo
 from med_libs.server_utils import go_print
 
@@ -23,9 +24,6 @@ sys.path.append(SUBMODULE_DIR)
 
 from submodules.MEDprofiles.MEDprofiles.src.back.constant import *
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 class GoExecInstantiateMEDprofiles(GoExecutionScript):
     """
@@ -63,11 +61,8 @@ class GoExecInstantiateMEDprofiles(GoExecutionScript):
         root_dir = json_config["rootDir"]
         root_dir = os.path.join(root_dir, ".medomics")
 
-        # Connect to MongoDB
-        db = connect_to_mongo()
-
         # Retrieve the master table
-        master_table = pd.DataFrame(list(db[master_table_id].find())).drop('_id', axis=1)
+        master_table = load_dataset(master_table_id)
 
         # Append indexes to the master table top row
         master_table.loc[-1] = master_table.columns
@@ -187,5 +182,4 @@ class GoExecInstantiateMEDprofiles(GoExecutionScript):
             data_file.close()
 
 
-script = GoExecInstantiateMEDprofiles(json_params_dict, id_)
-script.start()
+run_script(GoExecInstantiateMEDprofiles)
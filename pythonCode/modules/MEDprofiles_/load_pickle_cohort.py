@@ -8,7 +8,7 @@ import gridfs
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.mongodb_utils import connect_to_mongo
 from med_libs.server_utils import go_print
 
@@ -18,9 +18,6 @@ sys.path.append(MODULE_DIR)
 SUBMODULE_DIR = str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent.parent)
 sys.path.append(SUBMODULE_DIR)
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 class GoExecLoadPickleCohort(GoExecutionScript):
     """
@@ -88,5 +85,4 @@ class GoExecLoadPickleCohort(GoExecutionScript):
         fs.put(json_data.encode('utf-8'), filename="MEDprofiles.json", id=medprofiles_json_id)
 
 
-script = GoExecLoadPickleCohort(json_params_dict, id_)
-script.start()
+run_script(GoExecLoadPickleCohort)
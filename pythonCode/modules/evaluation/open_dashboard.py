@@ -12,7 +12,7 @@ from explainerdashboard import ClassifierExplainer, ExplainerDashboard, Regressi
 from explainerdashboard.explainer_methods import guess_shap
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.mongodb_utils import (
     connect_to_mongo,
     get_child_id_by_name,
@@ -61,8 +61,6 @@ def predict_proba(self, X):
     return np.array([1 - pred, pred]).T
 
 
-json_params_dict, id_ = parse_arguments()
-
 
 class GoExecScriptOpenDashboard(GoExecutionScript):
     """
@@ -269,5 +267,4 @@ class GoExecScriptOpenDashboard(GoExecutionScript):
         self.ed.run(host="localhost", port=self.port, use_waitress=True, mode="dash")
 
 
-open_dashboard = GoExecScriptOpenDashboard(json_params_dict, id_)
-open_dashboard.start()
+run_script(GoExecScriptOpenDashboard)
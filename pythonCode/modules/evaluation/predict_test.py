@@ -13,22 +13,17 @@ if not hasattr(pd.DataFrame, "iteritems"):
     pd.DataFrame.iteritems = pd.DataFrame.items
 
 
-from pycaret.classification.oop import ClassificationExperiment
-from pycaret.regression.oop import RegressionExperiment
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.MEDDataObject import MEDDataObject
-from med_libs.mongodb_utils import (connect_to_mongo, get_child_id_by_name,
+from med_libs.mongodb_utils import (connect_to_mongo, get_child_ids_by_names,
                                     get_dataset_as_pd_df,
                                     get_pickled_model_from_collection,
                                     insert_med_data_object_if_not_exists,
                                     overwrite_med_data_object_content)
 from med_libs.server_utils import go_print, load_med_standard_data
 
-json_params_dict, id_ = parse_arguments()
-go_print("running predict_test.py:" + id_)
-
 
 class GoExecScriptPredictTest(GoExecutionScript):
     """
@@ -58,11 +53,11 @@ class GoExecScriptPredictTest(GoExecutionScript):
 
         # Load the model
         db = connect_to_mongo()
-        model_metadata_id = get_child_id_by_name(model_infos['id'], 'metadata.json')
-        model_metadata = dict(db[model_metadata_id].find_one({}))
+        model_children = get_child_ids_by_names(model_infos['id'], ['metadata.json', 'model.pkl'])
+        model_metadata = dict(db[model_children['metadata.json']].find_one({}))
         ml_type = model_metadata['ml_type']
         self.set_progress(label="Loading the model", now=10)
-        pickle_object_id = get_child_id_by_name(model_infos['id'], "model.pkl")
+        pickle_object_id = model_children['model.pkl']
 
         # Check if pickle_object_id is None
         if pickle_object_id is None:
@@ -112,6 +107,8 @@ class GoExecScriptPredictTest(GoExecutionScript):
 
         # calculate the predictions
         self.set_progress(label="Setting up the experiment", now=30)
+        from pycaret.classification.oop import ClassificationExperiment
+        from pycaret.regression.oop import RegressionExperiment
         exp = None
         if ml_type == 'regression':
             exp = RegressionExperiment()
@@ -131,11 +128,11 @@ class GoExecScriptPredictTest(GoExecutionScript):
             childrenIDs = [],
             inWorkspace = False
         )
-        prediction_med_object_id = insert_med_data_object_if_not_exists(prediction_object, pred_unseen.to_dict(orient="records"))
+        prediction_med_object_id = insert_med_data_object_if_not_exists(prediction_object, pred_unseen)
         
         # If the prediction already exists we update the content
         if prediction_med_object_id != prediction_object.id:
-            overwrite_med_data_object_content(prediction_med_object_id, pred_unseen.to_dict(orient="records"))
+            overwrite_med_data_object_content(prediction_med_object_id, pred_unseen)
         
         self.results = {"collection_id": prediction_med_object_id}
         self.set_progress(label="Compiling results ...", now=80)
@@ -143,5 +140,4 @@ class GoExecScriptPredictTest(GoExecutionScript):
         return self.results
 
 
-predictTest = GoExecScriptPredictTest(json_params_dict, id_)
-predictTest.start()
+run_script(GoExecScriptPredictTest)
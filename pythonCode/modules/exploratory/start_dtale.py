@@ -1,19 +1,14 @@
 import threading
-import time
 import json
-import pandas as pd
-import dtale
 import sys
 import os
-import pymongo
 
 from pathlib import Path
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 from med_libs.server_utils import go_print, find_next_available_port, is_port_in_use
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-
-json_params_dict, id_ = parse_arguments()
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.mongodb_utils import get_dataset_as_pd_df
 
 class GoExecScriptDTale(GoExecutionScript):
     """
@@ -33,10 +28,6 @@ class GoExecScriptDTale(GoExecutionScript):
         self.row_count = 45
         self.json_config = json_params
         self.is_calculating = True
-        self.progress_thread = threading.Thread(
-            target=self._update_progress_periodically, args=())
-        self.progress_thread.daemon = True
-        self.progress_thread.start()
         self.web_server_thread = threading.Thread(
             target=self._server_process, args=())
         self.web_server_thread.daemon = True
@@ -48,46 +39,46 @@ class GoExecScriptDTale(GoExecutionScript):
         go_print(json.dumps(json_config, indent=4))
         self.port = find_next_available_port()
         self.web_server_thread.start()
-        self.progress_thread.join()
+        self._progress_bus.add_source(self._update_progress, interval=self.thread_delay)
         self.web_server_thread.join()
         return {"results_html": "html"}
 
-    def _update_progress_periodically(self):
+    def _update_progress(self) -> bool:
         """
         This function is used to update the progress of the pipeline execution.
+        It is polled periodically by the progress bus until the web server is up.
+
+        Returns:
+            False when the progress doesn't need to be updated anymore
         """
-        while self.is_calculating:
-            go_print(str(dtale.instances()))
-            if self.port is not None:
-                if is_port_in_use(self.port):
-                    self._progress["web_server_url"] = f"http://localhost:{self.port}/"
-                    self._progress["port"] = self.port
-                    self._progress["name"] = self.dataset["name"].split(".")[
-                        0].capitalize()
-                    self.is_calculating = False
+        if not self.is_calculating:
+            return False
+        if self.port is not None and self.dataset is not None:
+            if is_port_in_use(self.port):
+                self._progress["web_server_url"] = f"http://localhost:{self.port}/"
+                self._progress["port"] = self.port
+                self._progress["name"] = self.dataset["name"].split(".")[
+                    0].capitalize()
+                self.is_calculating = False
 
-            self.now += round(self.thread_delay *
-                              self.speed / self.row_count * 100, 2)
-            self._progress["now"] = "{:.2f}".format(self.now)
-            self.push_progress()
-            time.sleep(self.thread_delay)
+        self.now += round(self.thread_delay *
+                          self.speed / self.row_count * 100, 2)
+        self._progress["now"] = "{:.2f}".format(self.now)
+        self.push_progress()
+        return self.is_calculating
 
     def _server_process(self):
         """
         This function is used to run the dashboard
         """
-        # MongoDB setup
-        mongo_client = pymongo.MongoClient("mongodb://localhost:54017/")
-        database = mongo_client["data"]
-        collection = database[self.json_config["dataset"]["id"]]
-        collection_data = collection.find({}, {'_id': False})
-        df = pd.DataFrame(list(collection_data))
+        # Load the dataset
+        df = get_dataset_as_pd_df(self.json_config["dataset"]["id"])
 
-        # DTale
+        # DTale, imported here because of its import time
+        import dtale
         self.dataset = self.json_config['dataset']
         d = dtale.show(df, subprocess=False, port=self.port, force=True)
         self.is_calculating = False
 
 
-script = GoExecScriptDTale(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptDTale)
@@ -5,7 +5,6 @@ import tempfile
 from pathlib import Path
 
 import pandas as pd
-import pymongo
 import sweetviz as sv
 
 if not hasattr(pd.Series, "iteritems"):
@@ -14,11 +13,9 @@ if not hasattr(pd.DataFrame, "iteritems"):
     pd.DataFrame.iteritems = pd.DataFrame.items
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.server_utils import go_print
-
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
+from med_libs.mongodb_utils import connect_to_mongo, get_dataset_as_pd_df
 
 
 class StartSweetviz(GoExecutionScript):
@@ -42,14 +39,11 @@ class StartSweetviz(GoExecutionScript):
         go_print(json.dumps(json_config, indent=4))
 
         # MongoDB setup
-        mongo_client = pymongo.MongoClient("mongodb://localhost:54017/")
-        database = mongo_client["data"]
-        collection1 = database[json_config["mainDataset"]["id"]]
+        database = connect_to_mongo("data")
         target = json_config['target']
 
         # Set first collection as pandas dataframe
-        collection1_data = collection1.find({}, {'_id': False})
-        collection1_df = pd.DataFrame(list(collection1_data))
+        collection1_df = get_dataset_as_pd_df(json_config["mainDataset"]["id"])
         collection1_name = json_config["mainDataset"]['name'].split(".")[0].capitalize()
 
         # Set pairwise_analysis
@@ -61,9 +55,7 @@ class StartSweetviz(GoExecutionScript):
         # Set second collection as pandas dataframe
         if json_config["compDataset"] != "":
             self.set_progress(label="Loading dataset", now=50)
-            collection2 = database[json_config["compDataset"]["id"]]
-            collection2_data = collection2.find({}, {'_id': False})
-            collection2_df = pd.DataFrame(list(collection2_data))
+            collection2_df = get_dataset_as_pd_df(json_config["compDataset"]["id"])
             collection2_name = json_config["compDataset"]['name'].split(".")[0].capitalize()
             self.set_progress(label="Comparing reports", now=75)
             final_report = sv.compare([collection1_df, collection1_name], [collection2_df, collection2_name], target, pairwise_analysis=pairwise_analysis)
@@ -89,5 +81,4 @@ class StartSweetviz(GoExecutionScript):
         return self.results
 
 
-script = StartSweetviz(json_params_dict, id_)
-script.start()
+run_script(StartSweetviz)
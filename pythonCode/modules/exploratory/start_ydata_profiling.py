@@ -3,17 +3,14 @@ import json
 from ydata_profiling import ProfileReport
 import pandas as pd
 import sys
-import pymongo
 import tempfile
 from pathlib import Path
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
 from med_libs.server_utils import go_print
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.mongodb_utils import connect_to_mongo, get_dataset_as_pd_df
 
 
 class StartYDataProfiling(GoExecutionScript):
@@ -37,14 +34,11 @@ class StartYDataProfiling(GoExecutionScript):
         go_print(json.dumps(json_config, indent=4))
 
         # MongoDB setup
-        mongo_client = pymongo.MongoClient("mongodb://localhost:54017/")
-        database = mongo_client["data"]
-        collection1 = database[json_config["mainDataset"]["id"]]
+        database = connect_to_mongo("data")
 
         # Set first collection as pandas dataframe and calculate report
         self.set_progress(label="Loading dataset", now=20)
-        collection1_data = collection1.find({}, {'_id': False})
-        collection1_df = pd.DataFrame(list(collection1_data))
+        collection1_df = get_dataset_as_pd_df(json_config["mainDataset"]["id"])
         collection1_name = json_config["mainDataset"]['name'].split(".")[0].capitalize()
         self.set_progress(label="Calculating report", now=35)
         collection1_report = ProfileReport(collection1_df, title=collection1_name, minimal=True)
@@ -53,9 +47,7 @@ class StartYDataProfiling(GoExecutionScript):
         # Set second collection as pandas dataframe and calculate report
         if json_config["compDataset"] != "":
             self.set_progress(label="Loading dataset", now=50)
-            collection2 = database[json_config["compDataset"]["id"]]
-            collection2_data = collection2.find({}, {'_id': False})
-            collection2_df = pd.DataFrame(list(collection2_data))
+            collection2_df = get_dataset_as_pd_df(json_config["compDataset"]["id"])
             collection2_name = json_config["compDataset"]['name'].split(".")[0].capitalize()
             self.set_progress(label="Calculating report", now=60)
             collection2_report = ProfileReport(collection2_df, title=collection2_name, minimal=True)
@@ -80,5 +72,4 @@ class StartYDataProfiling(GoExecutionScript):
         return self.results
 
 
-script = StartYDataProfiling(json_params_dict, id_)
-script.start()
+run_script(StartYDataProfiling)
@@ -1,12 +1,6 @@
-import cv2
 import os
 import pandas as pd
-import skimage
 import sys
-import torch
-import torch.nn.functional as F
-import torchxrayvision as xrv
-import pymongo
 import re
 
 from pathlib import Path
@@ -14,9 +8,9 @@ from pathlib import Path
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 from med_libs.server_utils import go_print
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 
-json_params_dict, id_ = parse_arguments()
 #go_print("running script.py:" + id_)
 
 
@@ -57,6 +51,13 @@ class GoExecScriptDenseNetExtraction(GoExecutionScript):
         
         # %% EXAMPLE OF USE
         # densefeature_embeddings, prediction_embeddings = get_single_chest_xray_embeddings(img)
+
+        # The image and deep learning libraries are imported here because of their import time
+        import cv2
+        import skimage
+        import torch
+        import torch.nn.functional as F
+        import torchxrayvision as xrv
         
         # Extract chest x-ray image embeddings and preddictions
         densefeature_embeddings = []
@@ -118,8 +119,7 @@ class GoExecScriptDenseNetExtraction(GoExecutionScript):
         master_table_compatible = json_config["relativeToExtractionType"]["masterTableCompatible"]
 
         # MongoDB setup
-        mongo_client = pymongo.MongoClient("mongodb://localhost:54017/")
-        database = mongo_client[json_config["DBName"]]
+        database = connect_to_mongo(json_config["DBName"])
         result_collection = database[json_config["resultCollectionName"]]
 
         # Load data from MongoDB for master table formatting
@@ -132,32 +132,38 @@ class GoExecScriptDenseNetExtraction(GoExecutionScript):
             df_info = df_info[[filename_col, date_col]].rename(columns={filename_col: "filename"})
 
         # Proceed to the image extraction
-        for file in file_path_list:
-            patient_extracted_data = {}
-
-            # Get filename and folder infos
-            path_list = file.split(os.sep)[-(depth + 1):]
-            for i in range(len(path_list) - 1):
-                patient_extracted_data["level_" + str(i + 1)] = path_list[i]
-            patient_extracted_data["filename"] = path_list[-1]
-
-            # Get densefeatures and predictions
-            densefeatures, predictions = self.get_single_chest_xray_embeddings(file, weights)
-
-            # Convert types
-            if "denseFeatures" in features_to_generate:
-                for i in range(len(densefeatures)):
-                    patient_extracted_data[column_prefix + "densefeatures_" + str(i)] = float(densefeatures[i])
-            if "predictions" in features_to_generate:
-                for i in range(len(predictions)):
-                    patient_extracted_data[column_prefix + "predictions_" + str(i)] = float(predictions[i])
-
-            # Format to master table and upsert into MongoDB
-            if master_table_compatible:
-                self.format_to_master_table(patient_extracted_data, df_info, result_collection, json_config)
-            else:
-                result_collection.insert_one(patient_extracted_data)
-
+        phase = self.start_phase("Extracting images", total=len(file_path_list), start=0, end=100)
+        try:
+            for file in file_path_list:
+                patient_extracted_data = {}
+
+                # Get filename and folder infos
+                path_list = file.split(os.sep)[-(depth + 1):]
+                for i in range(len(path_list) - 1):
+                    patient_extracted_data["level_" + str(i + 1)] = path_list[i]
+                patient_extracted_data["filename"] = path_list[-1]
+
+                # Get densefeatures and predictions
+                densefeatures, predictions = self.get_single_chest_xray_embeddings(file, weights)
+
+                # Convert types
+                if "denseFeatures" in features_to_generate:
+                    for i in range(len(densefeatures)):
+                        patient_extracted_data[column_prefix + "densefeatures_" + str(i)] = float(densefeatures[i])
+                if "predictions" in features_to_generate:
+                    for i in range(len(predictions)):
+                        patient_extracted_data[column_prefix + "predictions_" + str(i)] = float(predictions[i])
+
+                # Format to master table and upsert into MongoDB
+                if master_table_compatible:
+                    self.format_to_master_table(patient_extracted_data, df_info, result_collection, json_config)
+                else:
+                    result_collection.insert_one(patient_extracted_data)
+                phase.advance(item=os.path.basename(file))
+        finally:
+            phase.close()
+
+        bump_dataset_version(json_config["resultCollectionName"])
         json_config["collection_length"] = len(list(result_collection.find()))
         self.results = json_config
         return self.results
@@ -197,5 +203,4 @@ class GoExecScriptDenseNetExtraction(GoExecutionScript):
         for record in extracted_data.to_dict("records"):
             result_collection.insert_one(record)
 
-script = GoExecScriptDenseNetExtraction(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptDenseNetExtraction)
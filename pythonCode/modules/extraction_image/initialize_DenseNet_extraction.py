@@ -9,10 +9,7 @@ from pathlib import Path
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 from med_libs.server_utils import go_print
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 
 
 class GoExecScriptInitializeDenseNetExtraction(GoExecutionScript):
@@ -97,5 +94,4 @@ class GoExecScriptInitializeDenseNetExtraction(GoExecutionScript):
         return self.results
 
 
-script = GoExecScriptInitializeDenseNetExtraction(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptInitializeDenseNetExtraction)
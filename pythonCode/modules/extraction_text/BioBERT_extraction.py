@@ -1,21 +1,17 @@
-import dask.dataframe as dd
 import datetime
 import json
 import numpy as np
 import os
 import pandas as pd
 import sys
-import torch # Necessary to avoid a bug with transformers
-import pymongo
 from pathlib import Path
-from transformers import AutoTokenizer, AutoModel
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 from med_libs.server_utils import go_print
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 
-json_params_dict, id_ = parse_arguments()
 #go_print("running script.py:" + id_)
 
 
@@ -153,109 +149,129 @@ class GoExecScriptBioBERTExtraction(GoExecutionScript):
         """
         if frequency == "Patient":
             # Iterate over patients
-            for patient_id in identifiers_list:
-                patient_records = collection.find({column_id: patient_id})
-                df_patient = pd.DataFrame(list(patient_records))
-                df_patient = df_patient.astype({column_time : "datetime64[ns]"})
-                if not df_patient.empty:
-                    embeddings = self.get_biobert_embeddings_from_event_list(df_patient[column_text])
-                    df_patient_embeddings = pd.DataFrame([embeddings])
-                    # Insert patient_id in the dataframe
-                    df_patient_embeddings.insert(0, column_id, patient_id)
-                    # Rename columns
-                    col_number = len(df_patient_embeddings.columns) - 1
-                    df_patient_embeddings.columns = [column_id] + [column_prefix + str(i) for i in range(col_number)]
-                    # If Master Table Compatible
-                    if master_table_compatible:
-                        min_time_record = df_patient.loc[df_patient[column_time].idxmin()]
-                        df_patient_embeddings.insert(1, column_time, min_time_record[column_time])
-                    # Insert data in the result database
-                    records = df_patient_embeddings.to_dict("records")
-                    result_collection.insert_many(records)
-
-        elif frequency == "Admission":
-            # Iterate over combinations of [patients, admissions]
-            for patient_id in identifiers_list:
-                patient_records = collection.find({column_id: patient_id})
-                df_patient = pd.DataFrame(list(patient_records))
-                admissions = df_patient[column_admission].unique()
-                for admission_id in admissions:
-                    df_admission = df_patient[df_patient[column_admission] == admission_id]
-                    if not df_admission.empty:
-                        embeddings = self.get_biobert_embeddings_from_event_list(df_admission[column_text])
-                        df_admission_embeddings = pd.DataFrame([embeddings])
-                        # Insert admission_time in the dataframe
-                        df_admission_embeddings.insert(0, column_admission_time, df_admission[column_admission_time].iloc[0])
-                        # Insert admission_id in the dataframe
-                        df_admission_embeddings.insert(0, column_admission, admission_id)
+            phase = self.start_phase("Extracting patients", total=len(identifiers_list), start=0, end=100)
+            try:
+                for patient_id in identifiers_list:
+                    patient_records = collection.find({column_id: patient_id})
+                    df_patient = pd.DataFrame(list(patient_records))
+                    df_patient = df_patient.astype({column_time : "datetime64[ns]"})
+                    if not df_patient.empty:
+                        embeddings = self.get_biobert_embeddings_from_event_list(df_patient[column_text])
+                        df_patient_embeddings = pd.DataFrame([embeddings])
                         # Insert patient_id in the dataframe
-                        df_admission_embeddings.insert(0, column_id, patient_id)
+                        df_patient_embeddings.insert(0, column_id, patient_id)
                         # Rename columns
-                        col_number = len(df_admission_embeddings.columns) - 3
-                        df_admission_embeddings.columns = [column_id, column_admission, column_admission_time] + [column_prefix + str(i) for i in range(col_number)]
-                        # Insert data in the result database
-                        records = df_admission_embeddings.to_dict("records")
-                        result_collection.insert_many(records)
+                        col_number = len(df_patient_embeddings.columns) - 1
+                        df_patient_embeddings.columns = [column_id] + [column_prefix + str(i) for i in range(col_number)]
                         # If Master Table Compatible
                         if master_table_compatible:
-                            result_collection.update_many(
-                                {column_id: patient_id, column_admission: int(admission_id)},
-                                {"$unset": {column_admission: ""}}
-                            )
+                            min_time_record = df_patient.loc[df_patient[column_time].idxmin()]
+                            df_patient_embeddings.insert(1, column_time, min_time_record[column_time])
+                        # Insert data in the result database
+                        records = df_patient_embeddings.to_dict("records")
+                        result_collection.insert_many(records)
+                    phase.advance(item=str(patient_id))
+            finally:
+                phase.close()
+
+        elif frequency == "Admission":
+            # Iterate over combinations of [patients, admissions]
+            phase = self.start_phase("Extracting patients", total=len(identifiers_list), start=0, end=100)
+            try:
+                for patient_id in identifiers_list:
+                    patient_records = collection.find({column_id: patient_id})
+                    df_patient = pd.DataFrame(list(patient_records))
+                    admissions = df_patient[column_admission].unique()
+                    for admission_id in admissions:
+                        df_admission = df_patient[df_patient[column_admission] == admission_id]
+                        if not df_admission.empty:
+                            embeddings = self.get_biobert_embeddings_from_event_list(df_admission[column_text])
+                            df_admission_embeddings = pd.DataFrame([embeddings])
+                            # Insert admission_time in the dataframe
+                            df_admission_embeddings.insert(0, column_admission_time, df_admission[column_admission_time].iloc[0])
+                            # Insert admission_id in the dataframe
+                            df_admission_embeddings.insert(0, column_admission, admission_id)
+                            # Insert patient_id in the dataframe
+                            df_admission_embeddings.insert(0, column_id, patient_id)
+                            # Rename columns
+                            col_number = len(df_admission_embeddings.columns) - 3
+                            df_admission_embeddings.columns = [column_id, column_admission, column_admission_time] + [column_prefix + str(i) for i in range(col_number)]
+                            # Insert data in the result database
+                            records = df_admission_embeddings.to_dict("records")
+                            result_collection.insert_many(records)
+                            # If Master Table Compatible
+                            if master_table_compatible:
+                                result_collection.update_many(
+                                    {column_id: patient_id, column_admission: int(admission_id)},
+                                    {"$unset": {column_admission: ""}}
+                                )
+                    phase.advance(item=str(patient_id))
+            finally:
+                phase.close()
 
         elif frequency == "Note":
             patient_records = collection.find({column_id: {"$in": identifiers_list}})
             df = pd.DataFrame(list(patient_records))
             df["index"] = df.index
             # Iterate over all the dataframe
-            for _, row in df.iterrows():
-                embeddings = self.get_biobert_embeddings_from_event_list([row[column_text]])
-                df_row_embeddings = pd.DataFrame([embeddings])
-                # Insert patient_id in the dataframe
-                df_row_embeddings.insert(0, column_id, row[column_id])
-                # Insert index in the dataframe
-                if master_table_compatible:
-                    df_row_embeddings.insert(1, column_time, row[column_time])
-                    df_row_embeddings.insert(0, "index", row["index"])
-                # Rename columns
-                col_number = len(df_row_embeddings.columns) - (3 if master_table_compatible else 1)
-                df_row_embeddings.columns = (["index"] if master_table_compatible else []) + [column_id] + ([column_time] if master_table_compatible else []) + [column_prefix + str(i) for i in range(col_number)]
-                # Insert data in the result database
-                records = df_row_embeddings.to_dict("records")
-                result_collection.insert_many(records)
+            phase = self.start_phase("Extracting notes", total=len(df), start=0, end=100)
+            try:
+                for _, row in df.iterrows():
+                    embeddings = self.get_biobert_embeddings_from_event_list([row[column_text]])
+                    df_row_embeddings = pd.DataFrame([embeddings])
+                    # Insert patient_id in the dataframe
+                    df_row_embeddings.insert(0, column_id, row[column_id])
+                    # Insert index in the dataframe
+                    if master_table_compatible:
+                        df_row_embeddings.insert(1, column_time, row[column_time])
+                        df_row_embeddings.insert(0, "index", row["index"])
+                    # Rename columns
+                    col_number = len(df_row_embeddings.columns) - (3 if master_table_compatible else 1)
+                    df_row_embeddings.columns = (["index"] if master_table_compatible else []) + [column_id] + ([column_time] if master_table_compatible else []) + [column_prefix + str(i) for i in range(col_number)]
+                    # Insert data in the result database
+                    records = df_row_embeddings.to_dict("records")
+                    result_collection.insert_many(records)
+                    phase.advance(item=str(row[column_id]))
+            finally:
+                phase.close()
             # If Master Table Compatible
             if master_table_compatible:
                 result_collection.update_many({}, {"$unset": {"index": ""}})
 
         elif column_time:
             # Iterate over patients
-            for patient_id in identifiers_list:
-                patient_records = collection.find({column_id: patient_id}).sort(column_time)
-                df_patient = pd.DataFrame(list(patient_records))
-                df_patient = df_patient.astype({column_time : "datetime64[ns]"})
-                if not df_patient.empty:
-                    # Iterate over time
-                    start_date = df_patient[column_time].iloc[0]
-                    end_date = start_date + frequency
-                    last_date = df_patient[column_time].iloc[-1]
-                    while start_date <= last_date:
-                        df_time = df_patient[(df_patient[column_time] >= start_date) & (df_patient[column_time] < end_date)]
-                        if not df_time.empty:
-                            embeddings = self.get_biobert_embeddings_from_event_list(df_time[column_text])
-                            df_time_embeddings = pd.DataFrame([embeddings])
-                            # Insert time in the dataframe
-                            df_time_embeddings.insert(0, "end_date", end_date)
-                            df_time_embeddings.insert(0, "start_date", start_date)
-                            # Insert patient_id in the dataframe
-                            df_time_embeddings.insert(0, column_id, patient_id)
-                            # Rename columns
-                            col_number = len(df_time_embeddings.columns) - 3
-                            df_time_embeddings.columns = [column_id, "start_date", "end_date"] + [column_prefix + str(i) for i in range(col_number)]
-                            # Insert data in the result database
-                            records = df_time_embeddings.to_dict("records")
-                            result_collection.insert_many(records)
-                        start_date += frequency
-                        end_date += frequency
+            phase = self.start_phase("Extracting patients", total=len(identifiers_list), start=0, end=100)
+            try:
+                for patient_id in identifiers_list:
+                    patient_records = collection.find({column_id: patient_id}).sort(column_time)
+                    df_patient = pd.DataFrame(list(patient_records))
+                    df_patient = df_patient.astype({column_time : "datetime64[ns]"})
+                    if not df_patient.empty:
+                        # Iterate over time
+                        start_date = df_patient[column_time].iloc[0]
+                        end_date = start_date + frequency
+                        last_date = df_patient[column_time].iloc[-1]
+                        while start_date <= last_date:
+                            df_time = df_patient[(df_patient[column_time] >= start_date) & (df_patient[column_time] < end_date)]
+                            if not df_time.empty:
+                                embeddings = self.get_biobert_embeddings_from_event_list(df_time[column_text])
+                                df_time_embeddings = pd.DataFrame([embeddings])
+                                # Insert time in the dataframe
+                                df_time_embeddings.insert(0, "end_date", end_date)
+                                df_time_embeddings.insert(0, "start_date", start_date)
+                                # Insert patient_id in the dataframe
+                                df_time_embeddings.insert(0, column_id, patient_id)
+                                # Rename columns
+                                col_number = len(df_time_embeddings.columns) - 3
+                                df_time_embeddings.columns = [column_id, "start_date", "end_date"] + [column_prefix + str(i) for i in range(col_number)]
+                                # Insert data in the result database
+                                records = df_time_embeddings.to_dict("records")
+                                result_collection.insert_many(records)
+                            start_date += frequency
+                            end_date += frequency
+                    phase.advance(item=str(patient_id))
+            finally:
+                phase.close()
             # If Master Table Compatible
             if master_table_compatible:
                 result_collection.update_many({}, {"$unset": {"end_date": ""}})
@@ -287,12 +303,14 @@ class GoExecScriptBioBERTExtraction(GoExecutionScript):
 
         # Set biobert parameters
         self.BIOBERT_PATH =  biobert_path
+        # torch and transformers are imported here because of their import time
+        import torch # Necessary to avoid a bug with transformers
+        from transformers import AutoTokenizer, AutoModel
         self.BIOBERT_TOKENIZER = AutoTokenizer.from_pretrained(self.BIOBERT_PATH)
         self.BIOBERT_MODEL = AutoModel.from_pretrained(self.BIOBERT_PATH)
 
         # MongoDB setup
-        mongo_client = pymongo.MongoClient("mongodb://localhost:54017/")
-        database = mongo_client[json_config["DBName"]]
+        database = connect_to_mongo(json_config["DBName"])
         collection = database[json_config["collectionName"]]
         result_collection = database[json_config["resultCollectionName"]]
 
@@ -307,10 +325,10 @@ class GoExecScriptBioBERTExtraction(GoExecutionScript):
                                                                 selected_columns["time"])
 
         # Send results to front
+        bump_dataset_version(json_config["resultCollectionName"])
         json_config["collection_length"] = len(list(result_collection.find()))
         self.results = json_config
         return self.results
 
 
-script = GoExecScriptBioBERTExtraction(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptBioBERTExtraction)
@@ -8,10 +8,7 @@ from pathlib import Path
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent)) 
 from med_libs.server_utils import go_print
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 
 
 class GoExecScriptCustom(GoExecutionScript):
@@ -36,5 +33,4 @@ class GoExecScriptCustom(GoExecutionScript):
         return self.results
 
 
-script = GoExecScriptCustom(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptCustom)
@@ -5,13 +5,10 @@ from pathlib import Path
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import overwrite_records
 from med_libs.server_utils import go_print
-from med_libs.mongodb_utils import connect_to_mongo
-
-# Parse arguments
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 
 
 class GoExecScriptAppend(GoExecutionScript):
@@ -45,28 +42,9 @@ class GoExecScriptAppend(GoExecutionScript):
             db = connect_to_mongo()
             collection = db[collection_name]
 
-     
-            existing_doc = collection.find_one({}, {"_id": 0})
-
-
-            if existing_doc:
-                all_keys = set(existing_doc.keys())
-            else:
-                all_keys = set()
-
-            
-            # Append new Data
-            for doc in new_data:
-                all_keys.update(doc.keys())
-
-      
-            temp_doc = {key: None for key in all_keys}  
-            temp_id = collection.insert_one(temp_doc).inserted_id
-
- 
-            collection.delete_many({"_id": {"$ne": temp_id}})  
-            collection.insert_many(new_data)
-            collection.delete_one({"_id": temp_id})
+            # The collection keeps its indexes and options, and its old content until the new one is written
+            overwrite_records(collection, new_data)
+            bump_dataset_version(collection_name)
 
         # Return success
             self.results = {
@@ -83,6 +61,4 @@ class GoExecScriptAppend(GoExecutionScript):
 
 
 
-if __name__ == "__main__":
-    script = GoExecScriptAppend(json_params_dict, id_)
-    script.start()  # Start the process and execute `_custom_process`
\ No newline at end of file
+run_script(GoExecScriptAppend)  # Start the process and execute `_custom_process` when run directly
\ No newline at end of file
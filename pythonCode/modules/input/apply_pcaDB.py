@@ -8,13 +8,13 @@ import pandas as pd
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import overwrite_dataframes, write_dataframes
+from med_libs.dataset_loader import iter_dataset_chunks, load_dataset
+from med_libs.dataset_pca import project
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptApplyPCA(GoExecutionScript):
@@ -51,37 +51,32 @@ class GoExecScriptApplyPCA(GoExecutionScript):
         db = connect_to_mongo()
         collection = db[collection_name]
 
-        # Fetch data and convert to DataFrame 
-        data = list(collection.find())
-        df = pd.DataFrame(data)
-        df = df.drop('_id', axis=1)
-        df_filtered = df[columns]
-
-        transformationData = list(db[transformationCollection].find())
-        transformation = pd.DataFrame(transformationData)
-        transformation = transformation.drop('_id', axis=1)
-        transformation["index"] = columns
-        transformation.set_index("index", inplace=True)
-        
-        # Matrix multiplication or dot Product
-        extracted_features_pca = df_filtered @ transformation
-
-        # Concatenate PCA with the unselected columns
-        if keep_unselected_columns:
-            unselected_columns = [x for x in df.columns if x not in columns]
-            extracted_features_pca = pd.concat([df[unselected_columns], extracted_features_pca], axis=1)
-        
-        # Create folder for reduced features and transformations if not exists and is necessary
+        # The transformation has one row per feature, with its mean and standard deviation when it was
+        # created with them, the older ones project the values as they are
+        transformation = load_dataset(transformationCollection)
+
+        def iter_extracted_features_pca():
+            """
+            Projects the rows chunk by chunk, with the unselected columns if they are kept
+            """
+            for df in iter_dataset_chunks(collection_name, columns=None if keep_unselected_columns else columns):
+                extracted_features_pca = project(df, transformation, columns)
+                # Concatenate PCA with the unselected columns
+                if keep_unselected_columns:
+                    unselected_columns = [x for x in df.columns if x not in columns]
+                    extracted_features_pca = pd.concat([df[unselected_columns], extracted_features_pca], axis=1)
+                yield extracted_features_pca
+
+        n_rows = collection.estimated_document_count()
         if overwrite:
-            collection.delete_many({})
-            collection.insert_many(extracted_features_pca.to_dict(orient="records"))
+            overwrite_dataframes(collection, iter_extracted_features_pca(), total=n_rows)
+            bump_dataset_version(collection_name)
             return
         else:
             db.create_collection(new_collection_name)
             collection = db[new_collection_name]
-            collection.insert_many(extracted_features_pca.to_dict(orient="records"))
+            write_dataframes(collection, iter_extracted_features_pca(), total=n_rows)
+            bump_dataset_version(new_collection_name)
             return
 
-
-script = GoExecScriptApplyPCA(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptApplyPCA)
@@ -3,18 +3,16 @@ import os
 import sys
 from pathlib import Path
 
-import pandas as pd
-
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import overwrite_dataframe, write_dataframe
+from med_libs.column_ops import SERVER_FILL_METHODS, apply_column_expressions, get_fill_expressions, is_plain_field
 from med_libs.input_utils.dataframe_utilities import clean_columns, clean_rows
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo, get_dataset_as_pd_df
+from med_libs.profiling import PHASE_COMPUTE, PHASE_MONGO_READ, PHASE_MONGO_WRITE, profile_phase
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptClean(GoExecutionScript):
@@ -53,45 +51,58 @@ class GoExecScriptClean(GoExecutionScript):
         db = connect_to_mongo()
         collection = db[collection_name]
 
+        # The column fills are computed and applied by the database, the rows don't need to be loaded
+        if processing_type == "columns" and clean_method in SERVER_FILL_METHODS and all(map(is_plain_field, columns_to_clean)):
+            with profile_phase(PHASE_COMPUTE):
+                expressions = get_fill_expressions(collection, columns_to_clean, clean_method)
+            with profile_phase(PHASE_MONGO_WRITE):
+                if overwrite:
+                    apply_column_expressions(collection, expressions)
+                    bump_dataset_version(collection_name)
+                else:
+                    db.create_collection(dataset_name)
+                    apply_column_expressions(collection, expressions, dataset_name)
+                    bump_dataset_version(dataset_name)
+            return
+
         # Fetch data and convert to DataFrame 
-        data = list(collection.find())
-        df = pd.DataFrame(data)
-        df = df.drop('_id', axis=1)
+        with profile_phase(PHASE_MONGO_READ):
+            df = get_dataset_as_pd_df(collection_name)
 
         # Process
-        if processing_type == "columns":
-            df = clean_columns(df, columns_to_clean, clean_method)
-        elif processing_type == "rows":
-            rows_to_clean = [int(row) for row in rows_to_clean]
-            df = clean_rows(df, rows_to_clean, clean_method)
-        elif processing_type == "all":
-            start_with = json_config["startWith"]
-            if start_with == "Columns":
+        with profile_phase(PHASE_COMPUTE):
+            if processing_type == "columns":
                 df = clean_columns(df, columns_to_clean, clean_method)
+            elif processing_type == "rows":
                 rows_to_clean = [int(row) for row in rows_to_clean]
                 df = clean_rows(df, rows_to_clean, clean_method)
-            else:
-                rows_to_clean = [int(row) for row in rows_to_clean]
-                df = clean_rows(df, rows_to_clean, clean_method)
-                df = clean_columns(df, columns_to_clean, clean_method)
+            elif processing_type == "all":
+                start_with = json_config["startWith"]
+                if start_with == "Columns":
+                    df = clean_columns(df, columns_to_clean, clean_method)
+                    rows_to_clean = [int(row) for row in rows_to_clean]
+                    df = clean_rows(df, rows_to_clean, clean_method)
+                else:
+                    rows_to_clean = [int(row) for row in rows_to_clean]
+                    df = clean_rows(df, rows_to_clean, clean_method)
+                    df = clean_columns(df, columns_to_clean, clean_method)
         
         print(df)
 
         # Save the dataset
-        if overwrite:
-            # Delete the content of the collection and insert the new data
-            collection.delete_many({})
-            data_dict = df.where(pd.notnull(df), None).to_dict(orient='records')
-            collection.insert_many(data_dict)
-            return
-        else:
-            # Create new collection, call it the dataset_name, and add the data
-            db.create_collection(dataset_name)
-            collection = db[dataset_name]
-            data_dict = df.where(pd.notnull(df), None).to_dict(orient='records')
-            collection.insert_many(data_dict)
+        with profile_phase(PHASE_MONGO_WRITE):
+            if overwrite:
+                # Replace the content of the collection by the new data
+                overwrite_dataframe(collection, df)
+                bump_dataset_version(collection_name)
+                return
+            else:
+                # Create new collection, call it the dataset_name, and add the data
+                db.create_collection(dataset_name)
+                collection = db[dataset_name]
+                write_dataframe(collection, df)
+                bump_dataset_version(dataset_name)
         return
 
 
-script = GoExecScriptClean(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptClean)
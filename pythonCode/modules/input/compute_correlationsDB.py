@@ -3,16 +3,13 @@ import os
 import sys
 from pathlib import Path
 
-import pandas as pd
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.dataset_loader import load_dataset
 from med_libs.server_utils import go_print
-
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
+from med_libs.target_correlation import correlate_with_target
 
 
 
@@ -46,29 +43,30 @@ class GoExecScriptComputeCorrelations(GoExecutionScript):
         if target in columns:
             columns.remove(target)
         
-        # Connect to MongoDB
-        db = connect_to_mongo()
-        collection = db[collection_name]
-
-        # Fetch data and convert to DataFrame 
-        data = list(collection.find())
-        df = pd.DataFrame(data)
-        df = df.drop('_id', axis=1)
-
-        # Extract features and target
-        extracted_features = df[columns + [target]]
-
-        # Compute correlation
-        df_corr = extracted_features.corr(method='spearman')
-        corr_with_target = df_corr[target].abs().sort_values(ascending=False).drop(target)
+        method = json_config.get("method", "spearman")
+        with_p_values = json_config.get("pValues", False)
+        with_mutual_information = json_config.get("mutualInformation", False)
+
+        # Fetch the columns and the target
+        df = load_dataset(collection_name, columns=columns + [target])
+
+        # Compute the correlations with the target only, ranked once
+        correlations = correlate_with_target(df, columns, target, method=method, p_values=with_p_values,
+                                             mutual_information=with_mutual_information)
+        # Columns without numeric values or constant have no correlation and are left out, like pandas did
+        corr_with_target = correlations["correlation"].abs().dropna().sort_values(ascending=False)
         results = corr_with_target.to_dict()
 
         # Get results
         json_config["correlations"] = results
+        if with_p_values:
+            json_config["pValues"] = correlations["p_value"].reindex(corr_with_target.index).to_dict()
+        if with_mutual_information:
+            json_config["mutualInformation"] = \
+                correlations["mutual_information"].reindex(corr_with_target.index).to_dict()
         self.results = json_config
 
         return self.results
 
 
-script = GoExecScriptComputeCorrelations(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptComputeCorrelations)
@@ -3,19 +3,13 @@ import os
 import sys
 from pathlib import Path
 
-import numpy as np
-import pandas as pd
-
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.dataset_pca import fit_pca
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptComputeEigenvalues(GoExecutionScript):
@@ -45,43 +39,9 @@ class GoExecScriptComputeEigenvalues(GoExecutionScript):
         columns = json_config["columns"]
         collection_name = json_config["collectionName"]
 
-        # Connect to MongoDB
-        db = connect_to_mongo()
-        collection = db[collection_name]
-
-        # Fetch data and convert to DataFrame 
-        data = list(collection.find())
-        df = pd.DataFrame(data)
-        df = df.drop('_id', axis=1)
-
-        # Remove columns containing only 0 values
-        zero_columns = df.columns[df.eq(0).all()]
-        filtered_columns = [x for x in columns if x not in zero_columns]
-
-        # Keep extracted features columns
-        extracted_features = df[filtered_columns]
-
-        # Mean
-        extracted_features_mean = extracted_features.mean()
-        # Standard deviation
-        extracted_features_std = extracted_features.std()
-        # Standardization
-        extracted_features_standardized = (extracted_features - extracted_features_mean) / extracted_features_std
-        # Covariance
-        c = extracted_features_standardized.cov()   
-
-        # Get eigenvalues
-        eigenvalues, eigenvectors = np.linalg.eig(c)
-        # Index the eigenvalues in descending order
-        idx = eigenvalues.argsort()[::-1]
-        # Sort the eigenvalues in descending order
-        eigenvalues = eigenvalues[idx]
-        explained_var = np.cumsum(eigenvalues) / np.sum(eigenvalues)
-        if np.iscomplexobj(explained_var):
-            tmp = [{"real": np.real(x), 'imaginary': np.imag(x)} for x in explained_var]
-            explained_var = tmp
-        else:
-            explained_var = explained_var.tolist()
+        # The decomposition of the standardized columns is cached, create_pcaDB reuses it for the same columns
+        decomposition = fit_pca(collection_name, columns)
+        explained_var = decomposition.get_explained_variance()
 
         # Get results
         json_config["explained_var"] = explained_var
@@ -90,5 +50,4 @@ class GoExecScriptComputeEigenvalues(GoExecutionScript):
         return self.results
 
 
-script = GoExecScriptComputeEigenvalues(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptComputeEigenvalues)
@@ -3,18 +3,15 @@ import os
 import sys
 from pathlib import Path
 
-import pandas as pd
-
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import overwrite_dataframe, write_dataframe
+from med_libs.dataset_loader import load_dataset
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptComputeSpearman(GoExecutionScript):
@@ -58,14 +55,13 @@ class GoExecScriptComputeSpearman(GoExecutionScript):
         db = connect_to_mongo()
         collection = db[collection_name]
 
-        # Fetch data and convert to DataFrame 
-        data = list(collection.find())
-        df = pd.DataFrame(data)
-        df = df.drop('_id', axis=1)
-
         # Format selected rows
         formatted_selected_rows = [x["index"] for x in selected_rows]
-        
+
+        # Fetch data and convert to DataFrame, the unselected columns are only needed when they are kept
+        projection = None if keep_unselected_columns else formatted_selected_rows + ([target] if keep_target else [])
+        df = load_dataset(collection_name, columns=projection)
+
         # Columns to keep in dataframe
         columns_to_keep = formatted_selected_rows
         if keep_unselected_columns:
@@ -79,15 +75,15 @@ class GoExecScriptComputeSpearman(GoExecutionScript):
 
         # If overwrite option
         if overwrite:
-            collection.delete_many({})
-            collection.insert_many(result_df.to_dict(orient='records'))
+            overwrite_dataframe(collection, result_df)
+            bump_dataset_version(collection_name)
             return
  
         else:
             db.create_collection(new_collection_name)
             collection = db[new_collection_name]
-            collection.insert_many(result_df.to_dict(orient='records'))
+            write_dataframe(collection, result_df)
+            bump_dataset_version(new_collection_name)
             return
 
-script = GoExecScriptComputeSpearman(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptComputeSpearman)
@@ -4,14 +4,10 @@ from pathlib import Path
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from bson import ObjectId
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.mongodb_utils import connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 class GoExecScriptCreateGroupDB(GoExecutionScript):
     """
@@ -44,14 +40,13 @@ class GoExecScriptCreateGroupDB(GoExecutionScript):
         # Connect to MongoDB
         db = connect_to_mongo()
 
-        # Get data from the collection
+        # Get the _id of the rows of the group, the other fields are not needed
         collection = db[collectionName]
-        data = None
-        if data_query:
-            data = list(collection.find(data_query) if not sort_query else collection.find(data_query).sort(sort_query))
-        else:
-            data = list(collection.find() if not sort_query else collection.find().sort(sort_query))
-        if not data:
+        cursor = collection.find(data_query or {}, {"_id": 1})
+        if sort_query:
+            cursor = cursor.sort(sort_query)
+        row_ids = [row["_id"] for row in cursor]
+        if not row_ids:
             raise Exception("No data found in the collection")
 
         # Create or get the 'row_tags' collection
@@ -60,64 +55,34 @@ class GoExecScriptCreateGroupDB(GoExecutionScript):
             row_tags_collection = db.create_collection("row_tags")
         row_tags_collection = db["row_tags"]
 
-
-        # Create a document to hold the group information
-        group_document = {
-            "collectionName": collectionName,
-            "data": [{"_id": row["_id"], "groupNames": [groupName]} for row in data]  # Store groupName as a list
-        }
-
         # Check if a document for this collectionName already exists
         existing_document = row_tags_collection.find_one({"collectionName": collectionName})
-        existings_tags = []
-        if existing_document:
-            # Retrieve existing tags
-            for new_entry in existing_document["data"]:
-                if '_id' in new_entry:
-                    new_entry["_id"] = str(new_entry["_id"])
-                existings_tags.append({"_id": str(new_entry["_id"])})
-            # Update existing documents
-            for new_entry in group_document["data"]:
-                if '_id' in new_entry:
-                    new_entry["_id"] = str(new_entry["_id"])
-                # Check if the tag already exists
-                if {"_id": str(new_entry["_id"])} in existings_tags:
-                    existing_tag = next((item for item in existing_document["data"] if item["_id"] == new_entry["_id"]), None)
-                    if existing_tag is None:
-                        raise Exception(f"Tag with id {new_entry['_id']} not found in the DB")
-                    # If so, add the new group name to the list
-                    existing_group_names = existing_tag.get("groupNames", [])
-                    # Only add the group name if it's not already present
-                    if groupName not in existing_group_names:
-                        existing_group_names.append(groupName)
-                    else:
-                        continue
-                    # Update the existing document
-                    if '_id' in new_entry and type(new_entry["_id"]) == str:
-                        new_entry["_id"] = ObjectId(new_entry["_id"])
-                    result = row_tags_collection.update_one(
-                        {"collectionName": collectionName, "data._id": new_entry["_id"]},
-                        {"$set": {"data.$.groupNames": existing_group_names}}
-                    )
-                    if result.matched_count <= 0:
-                        raise Exception("Failed to update the group name")
-                else:
-                    if '_id' in new_entry and type(new_entry["_id"]) == str:
-                        new_entry["_id"] = ObjectId(new_entry["_id"])
-                    # If the tag does not exist, insert it as a new entry
-                    result = row_tags_collection.update_one(
-                        {"collectionName": collectionName},
-                        {"$addToSet": {"data": new_entry}}  # Use $addToSet to avoid duplicates
-                    )
-                    if result.modified_count <= 0:
-                        raise Exception(f"Failed to insert the new tag: {new_entry}")
-        else:
-            # Insert the new document
-            row_tags_collection.insert_one(group_document)
+        if not existing_document:
+            # Insert the new document, groupName is stored as a list
+            row_tags_collection.insert_one({
+                "collectionName": collectionName,
+                "data": [{"_id": row_id, "groupNames": [groupName]} for row_id in row_ids]
+            })
             return {"data": f"Created new group '{groupName}' for collection '{collectionName}'."}
 
+        # Add the group name to the tags of the rows, in one update of the document
+        data = existing_document.get("data", [])
+        tags_by_id = {str(tag["_id"]): tag for tag in data if "_id" in tag}
+        for row_id in row_ids:
+            tag = tags_by_id.get(str(row_id))
+            if tag is None:
+                tag = {"_id": row_id, "groupNames": []}
+                tags_by_id[str(row_id)] = tag
+                data.append(tag)
+            group_names = tag.setdefault("groupNames", [])
+            # Only add the group name if it's not already present
+            if groupName not in group_names:
+                group_names.append(groupName)
+        result = row_tags_collection.update_one({"_id": existing_document["_id"]}, {"$set": {"data": data}})
+        if result.matched_count <= 0:
+            raise Exception("Failed to update the group name")
+
         return {"data": f"Updated group '{groupName}' for collection '{collectionName}'."}
 
 
-script = GoExecScriptCreateGroupDB(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptCreateGroupDB)
@@ -7,14 +7,11 @@ from pathlib import Path
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.server_utils import go_print
 
 # To deal with the DB
-from pymongo import MongoClient
-
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 
 class GoExecScriptCreateNewCollection(GoExecutionScript):
     """
@@ -44,16 +41,15 @@ class GoExecScriptCreateNewCollection(GoExecutionScript):
         newName = json_config["new_collection_name"]
         
         # Connect to the database and connect to the tag_collection
-        client = MongoClient('localhost', 54017)
-        db = client[database_name]
+        db = connect_to_mongo(database_name)
         collection = db[collection_id]
 
         # Create the new collection with the new data
         new_collection = db[newName]
         new_collection.insert_many(data)
+        bump_dataset_version(newName, database_name)
 
         return {"status": "success"}
 
 
-script = GoExecScriptCreateNewCollection(json_params_dict, id_)
-script.start()
\ No newline at end of file
+run_script(GoExecScriptCreateNewCollection)
@@ -3,19 +3,18 @@ import os
 import sys
 from pathlib import Path
 
-import numpy as np
 import pandas as pd
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import overwrite_dataframes, write_dataframe, write_dataframes
+from med_libs.dataset_loader import iter_dataset_chunks
+from med_libs.dataset_pca import fit_pca, project
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptCreatePCA(GoExecutionScript):
@@ -56,97 +55,45 @@ class GoExecScriptCreatePCA(GoExecutionScript):
         db = connect_to_mongo()
         collection = db[collection_name]
 
-        # Fetch data and convert to DataFrame 
-        data = list(collection.find())
-        df = pd.DataFrame(data)
-        df = df.drop('_id', axis=1)
-        
-        if df.empty:
+        n_rows = collection.estimated_document_count()
+        if not n_rows:
             print("DataFrame is empty. Exiting script.")
-            sys.exit() 
-
-        # Remove columns containing only 0 values
-        zero_columns = df.columns[df.eq(0).all()]
-        filtered_columns = [x for x in columns if x not in zero_columns]
-
-        # Keep extracted features columns
-        if set(filtered_columns).issubset(df.columns):
-            extracted_features = df[filtered_columns]
-        else:
-            print("Error: One or more filtered columns are not in DataFrame.")
             sys.exit()
 
-        # Mean
-        extracted_features_mean = extracted_features.mean()
-        # Standard deviation
-        extracted_features_std = extracted_features.std()
-        # Standardization
-        extracted_features_standardized = (extracted_features - extracted_features_mean) / extracted_features_std
-        # Covariance
-        c = extracted_features_standardized.cov()   
-
-        # Get eigenvalues
-        eigenvalues, eigenvectors = np.linalg.eig(c)
-        # Index the eigenvalues in descending order
-        idx = eigenvalues.argsort()[::-1]
-        # Sort the eigenvalues in descending order
-        eigenvalues = eigenvalues[idx]
-        # Sort the corresponding eigenvectors accordingly
-        eigenvectors = eigenvectors[:,idx]
-
-        # PCA component or unit matrix
-        u = eigenvectors[:,:n_components]
-        pca_component = pd.DataFrame(u,
-                                    index = filtered_columns,
-                                    columns = [column_prefix + '_attr' + str(i) for i in range(n_components)]
-                                    )
-    
-        # Matrix multiplication or dot Product
-        print(extracted_features)
-        print(pca_component)
-
-        extracted_features_pca = extracted_features @ pca_component
-
-        # Concatenate PCA with the unselected columns
-        if keep_unselected_columns:
-            unselected_columns = [x for x in df.columns if x not in columns]
-            extracted_features_pca = pd.concat([df[unselected_columns], extracted_features_pca], axis=1)
+        # Principal components of the standardized columns, the columns containing only 0 values are removed.
+        # The decomposition computed by compute_eigenvaluesDB for the same columns is reused.
+        decomposition = fit_pca(collection_name, columns, n_components)
+        pca_component = decomposition.get_transformation(n_components, column_prefix)
+
+        def iter_extracted_features_pca():
+            """
+            Projects the rows chunk by chunk, with the unselected columns if they are kept
+            """
+            for df in iter_dataset_chunks(collection_name, columns=None if keep_unselected_columns else columns):
+                extracted_features_pca = project(df, pca_component)
+                # Concatenate PCA with the unselected columns
+                if keep_unselected_columns:
+                    unselected_columns = [x for x in df.columns if x not in columns]
+                    extracted_features_pca = pd.concat([df[unselected_columns], extracted_features_pca], axis=1)
+                yield extracted_features_pca
+
+        # If overwrite option
+        if overwrite:
+            overwrite_dataframes(collection, iter_extracted_features_pca(), total=n_rows)
+            bump_dataset_version(collection_name)
+        else:
+            db.create_collection(new_collection_name)
+            collection = db[new_collection_name]
+            write_dataframes(collection, iter_extracted_features_pca(), total=n_rows)
+            bump_dataset_version(new_collection_name)
 
+        # The transformation keeps the mean and the standard deviation of the features for apply_pcaDB
         if export_transformation:
-            # If overwrite option
-            if overwrite:
-                collection.delete_many({})
-                collection.insert_many(extracted_features_pca.to_dict(orient='records'))
-                db.create_collection(new_PCA_collection_name)
-                collection2 = db[new_PCA_collection_name]
-                collection2.insert_many(pca_component.to_dict(orient='records'))
-                return
-            
-            # If overwrite option is not selected
-            else:
-                db.create_collection(new_collection_name)
-                collection = db[new_collection_name]
-                collection.insert_many(extracted_features_pca.to_dict(orient='records'))
-                db.create_collection(new_PCA_collection_name)
-                collection2 = db[new_PCA_collection_name]
-                collection2.insert_many(pca_component.to_dict(orient='records'))
-                return
-            
-        # export transformation is unselected
-        else:
-            # If overwrite option
-            if overwrite:
-                collection.delete_many({})
-                collection.insert_many(extracted_features_pca.to_dict(orient='records'))
-                return
-                
-            else:
-                db.create_collection(new_collection_name)
-                collection = db[new_collection_name]
-                collection.insert_many(extracted_features_pca.to_dict(orient='records'))
-                return
-       
-        
-
-script = GoExecScriptCreatePCA(json_params_dict, id_)
-script.start()
+            db.create_collection(new_PCA_collection_name)
+            collection2 = db[new_PCA_collection_name]
+            write_dataframe(collection2, pca_component)
+            bump_dataset_version(new_PCA_collection_name)
+        return
+
+
+run_script(GoExecScriptCreatePCA)
@@ -4,13 +4,10 @@ from pathlib import Path
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.mongodb_utils import connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptCreateTags(GoExecutionScript):
@@ -94,5 +91,4 @@ class GoExecScriptCreateTags(GoExecutionScript):
        
         
 
-script = GoExecScriptCreateTags(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptCreateTags)
@@ -4,13 +4,10 @@ from pathlib import Path
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptDeleteColumns(GoExecutionScript):
@@ -48,8 +45,8 @@ class GoExecScriptDeleteColumns(GoExecutionScript):
         # Delete the columns from the collection
         for column in columns:
             collection.update_many({}, {"$unset": {column: ""}})
+        bump_dataset_version(collection_id)
 
         return {"data": "Columns deleted successfully"}  # Return the results
 
-script = GoExecScriptDeleteColumns(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptDeleteColumns)
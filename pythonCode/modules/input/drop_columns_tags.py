@@ -1,17 +1,14 @@
 import os
 import sys
 from pathlib import Path
-import pandas as pd
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import overwrite_dataframe, write_dataframe
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo, get_dataset_as_pd_df
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running drop_columns_tags.py: " + id_)
-
 
 class GoExecScriptDropColumnsTags(GoExecutionScript):
     """
@@ -38,11 +35,9 @@ class GoExecScriptDropColumnsTags(GoExecutionScript):
 
         # Connect DB, load source
         db = connect_to_mongo()
-        src_coll = db[collection_name]
-        data = list(src_coll.find())
-        if not data:
+        df = get_dataset_as_pd_df(collection_name)
+        if df.empty:
             raise ValueError("Source collection is empty or not found.")
-        df = pd.DataFrame(data).drop(columns=["_id"], errors="ignore")
 
         # Expand drop by tags: columns associated to those tags
         columns_from_tags = set()
@@ -66,18 +61,15 @@ class GoExecScriptDropColumnsTags(GoExecutionScript):
         # Drop columns in dataframe (ignore errors for non-existing cols)
         df = df.drop(columns=columns_to_drop, errors="ignore")
 
-        # Write back (overwrite or create new)
+        # Write back (overwrite or create new), NaN are stored as null
         if overwrite:
             dst_coll = db[collection_name]
-            dst_coll.delete_many({})
+            overwrite_dataframe(dst_coll, df)
         else:
             db.create_collection(new_dataset_name)
             dst_coll = db[new_dataset_name]
-
-        # Replace NaN with None for MongoDB
-        clean_records = df.where(pd.notnull(df), None).to_dict(orient="records")
-        if clean_records:
-            dst_coll.insert_many(clean_records)
+            write_dataframe(dst_coll, df)
+        bump_dataset_version(dst_coll.name)
 
         # Update tag collection
         tag_coll = db[tag_collection_name]
@@ -114,5 +106,4 @@ class GoExecScriptDropColumnsTags(GoExecutionScript):
         return self.results
 
 
-script = GoExecScriptDropColumnsTags(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptDropColumnsTags)
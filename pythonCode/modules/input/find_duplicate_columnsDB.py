@@ -1,64 +1,45 @@
+import os
 import sys
-import json
-import argparse
-import pandas as pd
-from pymongo import MongoClient
-import xxhash 
+from pathlib import Path
 
+sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-MAX_ROWS = 5000
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.duplicate_columns import (DEFAULT_CORRELATION_THRESHOLD, DEFAULT_SIMILARITY_THRESHOLD,
+                                        detect_duplicate_columns)
+from med_libs.profiling import PHASE_COMPUTE, profile_phase
 
-def hash_column(column):
-    # Round floats to accelerate the process
-    if pd.api.types.is_float_dtype(column):
-        column = column.round(5)
-    # Return a non cryptographic hash
-    return xxhash.xxh64(column.to_string(index=False)).hexdigest()
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--json-param", required=True, help="JSON configuration from Go backend")
-    parser.add_argument("--id", required=False)  
-    args = parser.parse_args()
+class GoExecScriptFindDuplicateColumns(GoExecutionScript):
+    """
+        This class is used to find the duplicate and the near-duplicate columns of a dataset
 
-    try:
-        config = json.loads(args.json_param)
-    except json.JSONDecodeError:
-        print(json.dumps({"error": "Invalid JSON"}))
-        return
+        Args:
+            json_params: The input json params
+            _id: The id of the page that made the request if any
+    """
 
-    collection_name = config.get("collectionName")
-    if not collection_name:
-        print(json.dumps({"error": "Missing 'collectionName'"}))
-        return
+    def __init__(self, json_params: dict, _id: str = None):
+        super().__init__(json_params, _id)
+        self.results = {"duplicates": []}
 
-    try:
-        client = MongoClient("mongodb://localhost:54017", serverSelectionTimeoutMS=20000)
-        db = client["data"]
-        collection = db[collection_name]
+    def _custom_process(self, json_config: dict) -> dict:
+        """
+        Finds the columns having the same values in all the rows, the highly correlated numeric columns
+        and the categorical columns with mostly equal values
 
-        docs = list(collection.find().limit(MAX_ROWS))
-        if not docs:
-            print(json.dumps({"duplicates": []}))
-            return
+        Args:
+            json_config: The input json params
+        """
+        collection_name = json_config["collectionName"]
+        near_duplicates = bool(json_config.get("nearDuplicates", True))
+        correlation_threshold = float(json_config.get("correlationThreshold", DEFAULT_CORRELATION_THRESHOLD))
+        similarity_threshold = float(json_config.get("similarityThreshold", DEFAULT_SIMILARITY_THRESHOLD))
 
-        # Transform into DataFrame
-        df = pd.DataFrame(docs).drop(columns=["_id"], errors="ignore")
+        with profile_phase(PHASE_COMPUTE):
+            self.results = detect_duplicate_columns(collection_name, near_duplicates,
+                                                    correlation_threshold, similarity_threshold)
+        return self.results
 
-        column_hashes = {}
-        duplicates = []
 
-        for col in df.columns:
-            h = hash_column(df[col])
-            if h in column_hashes:
-                duplicates.append([column_hashes[h], col])
-            else:
-                column_hashes[h] = col
-
-        print(json.dumps({"duplicates": duplicates}))
-    except Exception as e:
-        print(json.dumps({"error": str(e)}))
-
-
-if __name__ == "__main__":
-    main()
+run_script(GoExecScriptFindDuplicateColumns)
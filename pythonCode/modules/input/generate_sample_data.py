@@ -3,19 +3,15 @@ import os
 import sys
 from pathlib import Path
 
-from pycaret.datasets import get_data
 import pandas as pd
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptClean(GoExecutionScript):
@@ -44,6 +40,7 @@ class GoExecScriptClean(GoExecutionScript):
         dataset_name = json_config["datasetRequested"]
         sample_id = json_config["newSampleID"]
 
+        from pycaret.datasets import get_data
         data = get_data(dataset_name)
         # Remove spaces from column names
         data.columns = data.columns.str.replace(' ', '_')
@@ -56,8 +53,8 @@ class GoExecScriptClean(GoExecutionScript):
         # Insert sample data in collection
         data_dict = pd.DataFrame(data).to_dict(orient="records")
         new_collection.insert_many(data_dict)
+        bump_dataset_version(sample_id)
 
         return
 
-script = GoExecScriptClean(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptClean)
@@ -1,15 +1,11 @@
 import json
 import sys
 import os
-import pandas as pd
 from pathlib import Path
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.server_utils import go_print
-from pymongo import MongoClient
-
-json_params_dict, id_ = parse_arguments()
-go_print(f"Starting get_subset_data.py for ID: {id_}")
+from med_libs.dataset_loader import load_dataset
 
 class GoExecScriptGetSubsetData(GoExecutionScript):
     def __init__(self, json_params: dict, _id: str = None):
@@ -24,40 +20,22 @@ class GoExecScriptGetSubsetData(GoExecutionScript):
             if not collection_id:
                 raise ValueError("Missing collection parameter")
 
-            # 2. MongoDB Connection with batch processing
-            client = MongoClient('localhost', 54017)
-            db = client[database_name]
-            collection = db[collection_id]
-
-            # 3. Batch processing with cursor
+            # 2. Load the collection by batches into typed columns
             batch_size = 500  # Adjust based on column count
-            cursor = collection.find({}).batch_size(batch_size)
-            
-            # 4. Stream data into DataFrame
-            data_chunks = []
-            for doc in cursor:
-                # Remove _id immediately to reduce memory
-                doc.pop('_id', None)  
-                data_chunks.append(doc)
-
-            # 5. Create DataFrame with NaN handling
-            df = pd.DataFrame(data_chunks)
+            df = load_dataset(collection_id, batch_size=batch_size, database_name=database_name)
             go_print(f"DataFrame created with shape: {df.shape}")
 
-            # 6. Convert NaN/NaT to None for JSON compatibility
-            df = df.where(pd.notnull(df), None)
-
-            # 7. Prepare response data
-            transformed_data = df.to_dict(orient='records')
+            # 3. Prepare response data, the DataFrame is serialized as records (NaN/NaT become null)
+            # or as binary pages if the client requested it with "responseEncoding"
             columns = [{"field": col, "header": col} for col in df.columns]
 
-            go_print(f"Returning {len(transformed_data)} rows with {len(columns)} columns")
-            
+            go_print(f"Returning {len(df)} rows with {len(columns)} columns")
+
             return {
-                "data": transformed_data,
+                "data": df,
                 "columns": columns,
                 "metadata": {
-                    "row_count": len(transformed_data),
+                    "row_count": len(df),
                     "column_count": len(columns)
                 }
             }
@@ -72,8 +50,7 @@ class GoExecScriptGetSubsetData(GoExecutionScript):
 
 # Execution
 try:
-    script = GoExecScriptGetSubsetData(json_params_dict, id_)
-    script.start()
+    run_script(GoExecScriptGetSubsetData)
 except Exception as e:
     go_print(f"Fatal error in script execution: {str(e)}")
     sys.exit(1)
\ No newline at end of file
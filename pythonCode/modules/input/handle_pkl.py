@@ -7,13 +7,10 @@ import pandas as pd
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptHandlePKL(GoExecutionScript):
@@ -73,8 +70,8 @@ class GoExecScriptHandlePKL(GoExecutionScript):
 
         # Insert data into the collection
         collection.insert_many(df.to_dict(orient='records'))
+        bump_dataset_version(new_collection_name)
 
         return
 
-script = GoExecScriptHandlePKL(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptHandlePKL)
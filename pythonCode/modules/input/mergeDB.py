@@ -6,14 +6,13 @@ from pathlib import Path
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-import pandas as pd
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import write_dataframes
+from med_libs.dataset_join import JOIN_TYPES, estimate_join_rows, get_key_counts, iter_join
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
+from med_libs.profiling import PHASE_MONGO_READ, PHASE_MONGO_WRITE, profile_phase
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptMerge(GoExecutionScript):
@@ -45,58 +44,34 @@ class GoExecScriptMerge(GoExecutionScript):
         collection_1 = json_config["collection1"]
         collection_2 = json_config["collection2"]
 
+        if merge_type not in JOIN_TYPES:
+            raise ValueError("The merge type is not valid")
+
         # Connect to MongoDB
         db = connect_to_mongo()
-        collection1 = db[collection_1]
-        collection2 = db[collection_2]
-
-         # Fetch data and convert to DataFrame 
-        data1 = list(collection1.find())
-        df1 = pd.DataFrame(data1)
-        df1 = df1.drop('_id', axis=1)
 
-        data2 = list(collection2.find())
-        df2 = pd.DataFrame(data2)
-        df2 = df2.drop('_id', axis=1)
-
-        # Merge the two dataframes depending on the merge type
+        # The size of the result is computed from the number of rows of each key, before reading the rows
         max_size = 10**8  # Set a threshold for the maximum size (adjust as needed), 100 000 000 is more than enough!
-
-        if merge_type == "inner":
-            potential_size = min(len(df1), len(df2))  # Inner join will have at most the size of the smaller dataframe
-            if potential_size > max_size:
-                return {"error": f"Unable to perform an inner merge because the result file size would be too large -> {potential_size} rows."}
-            merged_df = pd.merge(df1, df2, on=merge_on, how='inner')
-        elif merge_type == "outer":
-            potential_size = len(df1) + len(df2)  # Outer join will have at most the sum of both dataframes
-            if potential_size > max_size:
-                return {"error": f"Unable to perform an outer merge because the result file size would be too large -> {potential_size} rows."}
-            merged_df = pd.merge(df1, df2, on=merge_on, how='outer')
-        elif merge_type == "left":
-            potential_size = len(df1)  # Left join will have at most the size of the left dataframe
-            if potential_size > max_size:
-                return {"error": f"Unable to perform a left merge because the result file size would be too large -> {potential_size} rows."}
-            merged_df = pd.merge(df1, df2, on=merge_on, how='left')
-        elif merge_type == "right":
-            potential_size = len(df2)  # Right join will have at most the size of the right dataframe
-            if potential_size > max_size:
-                return {"error": f"Unable to perform a right merge because the result file size would be too large -> {potential_size} rows."}
-            merged_df = pd.merge(df1, df2, on=merge_on, how='right')
-        elif merge_type == "cross":
-            potential_size = len(df1) * len(df2)  # Cross join will have the product of both dataframes' sizes
-            if potential_size > max_size:
-                return {"error": f"Unable to perform a cross merge because the result file size would be too large -> {potential_size} rows."}
-            merged_df = pd.merge(df1, df2, how='cross')
-        else:
-            raise ValueError("The merge type is not valid")
-
-        # Save the merged dataframe to a new collection and insert it into the database
-        db.create_collection(new_collection_name)
-        new_collection = db[new_collection_name]
-        data_dict = merged_df.to_dict(orient='records')
-        new_collection.insert_many(data_dict)
+        with profile_phase(PHASE_MONGO_READ):
+            if merge_type == "cross":
+                left_counts = right_counts = None
+                potential_size = db[collection_1].count_documents({}) * db[collection_2].count_documents({})
+            else:
+                left_counts = get_key_counts(collection_1, merge_on)
+                right_counts = get_key_counts(collection_2, merge_on)
+                potential_size = estimate_join_rows(left_counts, right_counts, merge_type)
+        if potential_size > max_size:
+            return {"error": f"Unable to perform a {merge_type} merge because the result file size would be too large -> {potential_size} rows."}
+
+        # The joined rows are written batch by batch as they are produced
+        with profile_phase(PHASE_MONGO_WRITE):
+            db.create_collection(new_collection_name)
+            new_collection = db[new_collection_name]
+            write_dataframes(new_collection, iter_join(collection_1, collection_2, merge_on, merge_type,
+                                                       left_counts, right_counts),
+                             total=potential_size, label=f"Merging {collection_1} and {collection_2}")
+            bump_dataset_version(new_collection_name)
 
         return {"data": f"The {merge_type} merge was successful and generated a file of size {potential_size} rows."}
     
-script = GoExecScriptMerge(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptMerge)
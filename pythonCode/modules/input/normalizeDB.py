@@ -2,18 +2,17 @@ import os
 import sys
 from pathlib import Path
 
-import pandas as pd
+from pymongo.errors import OperationFailure
 from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import overwrite_dataframe, write_dataframe
+from med_libs.column_ops import SCALING_METHODS, apply_column_expressions, get_scaling_expressions, is_plain_field
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo, get_dataset_as_pd_df
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running normalizeDB.py: " + id_)
-
 
 class GoExecScriptNormalize(GoExecutionScript):
     """
@@ -34,16 +33,36 @@ class GoExecScriptNormalize(GoExecutionScript):
 
         go_print(f"Normalizing columns {columns} from {collection_name} using {method}")
 
-        # Connect and load the original data
-        db = connect_to_mongo()
-        original_collection = db[collection_name]
-        data = list(original_collection.find())
-        df = pd.DataFrame(data)
-        df = df.drop(columns=["_id"], errors="ignore")
-
         if not columns:
             raise ValueError("No columns selected for normalization")
 
+        db = connect_to_mongo()
+        collection = db[collection_name]
+
+        # The statistics and the scaling are computed by the database, the rows don't need to be loaded
+        expressions = None
+        if method in SCALING_METHODS and all(map(is_plain_field, columns)):
+            try:
+                expressions = get_scaling_expressions(collection, columns, method)
+            except (OperationFailure, NotImplementedError) as error:
+                # Servers older than MongoDB 4.4 (and mongomock) can't compute the statistics, pandas does it
+                go_print(f"Normalizing {collection_name} with pandas: {error}")
+        if expressions is not None:
+            if overwrite:
+                apply_column_expressions(collection, expressions)
+                bump_dataset_version(collection_name)
+            else:
+                db.create_collection(new_dataset_name)
+                apply_column_expressions(collection, expressions, new_dataset_name)
+                bump_dataset_version(new_dataset_name)
+            return {
+                "data": f"Normalization ({method}) applied to columns: {columns}",
+                "overwrite": overwrite
+            }
+
+        # Load the original data
+        df = get_dataset_as_pd_df(collection_name)
+
         # Select and normalize only selected columns
         df_to_normalize = df[columns].copy()
 
@@ -62,17 +81,15 @@ class GoExecScriptNormalize(GoExecutionScript):
         except Exception as e:
             raise ValueError(f"Normalization failed: {str(e)}")
 
-        # Save to MongoDB (overwrite or create new collection)
+        # Save to MongoDB (overwrite or create new collection), NaN are stored as null
         if overwrite:
             target_collection = db[collection_name]
-            target_collection.delete_many({})
+            overwrite_dataframe(target_collection, df)
         else:
             db.create_collection(new_dataset_name)
             target_collection = db[new_dataset_name]
-
-        # Handle NaN for MongoDB
-        data_dict = df.where(pd.notnull(df), None).to_dict(orient="records")
-        target_collection.insert_many(data_dict)
+            write_dataframe(target_collection, df)
+        bump_dataset_version(target_collection.name)
 
         return {
             "data": f"Normalization ({method}) applied to columns: {columns}",
@@ -80,5 +97,4 @@ class GoExecScriptNormalize(GoExecutionScript):
         }
 
 
-script = GoExecScriptNormalize(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptNormalize)
@@ -7,14 +7,12 @@ from pathlib import Path
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import overwrite_records
 from med_libs.server_utils import go_print
 
 # To deal with the DB
-from pymongo import MongoClient
-
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 
 class GoExecScriptOverwriteCollection(GoExecutionScript):
     """
@@ -43,15 +41,13 @@ class GoExecScriptOverwriteCollection(GoExecutionScript):
         data = json_config["data"]
         
         # Connect to the database and connect to the tag_collection
-        client = MongoClient('localhost', 54017)
-        db = client[database_name]
+        db = connect_to_mongo(database_name)
         collection = db[collection_id]
 
         # Overwrite the content of the collection with the new data
-        collection.delete_many({})
-        collection.insert_many(data)
+        overwrite_records(collection, data)
+        bump_dataset_version(collection_id, database_name)
 
         return {"status": "success"}
 
-script = GoExecScriptOverwriteCollection(json_params_dict, id_)
-script.start()
\ No newline at end of file
+run_script(GoExecScriptOverwriteCollection)
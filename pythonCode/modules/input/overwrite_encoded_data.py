@@ -5,13 +5,11 @@ from pathlib import Path
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import overwrite_records
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 
@@ -46,8 +44,8 @@ class GoExecScriptOverwrite(GoExecutionScript):
 
             # Overwrite the data
             go_print(f"Overwriting data in collection: {collection_name}")
-            collection.drop()
-            collection.insert_many(new_data)
+            overwrite_records(collection, new_data)
+            bump_dataset_version(collection_name)
 
             # Return success
             self.results = {"status": "success", "message": "Data overwritten successfully."}
@@ -60,5 +58,4 @@ class GoExecScriptOverwrite(GoExecutionScript):
 
 
 # Start the script
-script = GoExecScriptOverwrite(json_params_dict, id_)
-script.start()
\ No newline at end of file
+run_script(GoExecScriptOverwrite)
@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(
+    str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
+
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.bulk_writer import write_dataframes
+from med_libs.dataset_loader import iter_dataset_chunks
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
+from med_libs.profiling import PHASE_COMPUTE, profile_phase
+from med_libs.redundancy_pruning import DEFAULT_PRUNING_THRESHOLD, prune_correlated_columns
+from med_libs.server_utils import go_print
+from med_libs.target_correlation import CORRELATION_METHODS
+
+
+class GoExecScriptPruneCorrelatedColumns(GoExecutionScript):
+    """
+        This class is used to remove the columns highly correlated with another column of a dataset
+
+        Args:
+            json_params: The input json params
+            _id: The id of the page that made the request if any
+    """
+
+    def __init__(self, json_params: dict, _id: str = None):
+        super().__init__(json_params, _id)
+        self.results = {"data": "nothing to return"}
+
+    def _custom_process(self, json_config: dict) -> dict:
+        """
+        This function is used to prune the columns correlated above a threshold with another column,
+        the column most correlated with the target is kept.
+
+        Args:
+            json_config: The input json params
+        """
+        go_print(json.dumps(json_config, indent=4))
+
+        # Set local variables
+        collection_name = json_config.get("collectionName")
+        columns = json_config.get("columns") or None
+        target = json_config.get("target") or None
+        threshold = float(json_config.get("threshold", DEFAULT_PRUNING_THRESHOLD))
+        method = json_config.get("method", "pearson")
+        overwrite = json_config.get("overwrite", False)
+        new_collection_name = json_config.get("newCollectionName")
+        if not collection_name:
+            raise ValueError("Missing collection parameter")
+        if not 0 < threshold <= 1:
+            raise ValueError(f"The threshold must be between 0 and 1, got {threshold}")
+        if method not in CORRELATION_METHODS:
+            raise ValueError(f"Unsupported correlation method: {method}")
+        if not overwrite and not new_collection_name:
+            raise ValueError("Missing newCollectionName parameter, required when the collection is not overwritten")
+
+        # Connect to MongoDB
+        db = connect_to_mongo()
+        collection = db[collection_name]
+
+        with profile_phase(PHASE_COMPUTE):
+            pruning = prune_correlated_columns(collection_name, columns, target, threshold, method)
+        pruned_columns = [pruned["column"] for pruned in pruning["pruned"]]
+
+        # If overwrite option, the pruned columns are removed by the database
+        if overwrite:
+            if pruned_columns:
+                collection.update_many({}, {"$unset": {column: "" for column in pruned_columns}})
+                bump_dataset_version(collection_name)
+        else:
+            db.create_collection(new_collection_name)
+            write_dataframes(db[new_collection_name],
+                             (df.drop(columns=pruned_columns, errors="ignore")
+                              for df in iter_dataset_chunks(collection_name)),
+                             total=collection.estimated_document_count())
+            bump_dataset_version(new_collection_name)
+
+        # Get results
+        json_config["kept"] = pruning["kept"]
+        json_config["pruned"] = pruning["pruned"]
+        self.results = json_config
+
+        return self.results
+
+
+run_script(GoExecScriptPruneCorrelatedColumns)
@@ -4,13 +4,11 @@ from pathlib import Path
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
+from med_libs.column_ops import apply_column_expressions
+from med_libs.mongodb_utils import bump_dataset_version, connect_to_mongo
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptTransformColumns(GoExecutionScript):
@@ -45,32 +43,21 @@ class GoExecScriptTransformColumns(GoExecutionScript):
 
         # if the type is binary, replace every cell that has a value with 1, and every cell that is empty with 0
         # if the type is non-empty, keep every cell that has a value intact, and replace every cell that is empty with a 0
+        # All the columns are transformed by the database in one pass
 
         if type == "Binary":
-            for column in columns:
-                collection.update_many(
-                    {column: {"$exists": True}},
-                    {"$set": {column: 1}}
-                )
-                collection.update_many(
-                    {column: {"$exists": False}},
-                    {"$set": {column: 0}}
-                )
+            expressions = {column: {"$cond": [{"$eq": [{"$type": "$" + column}, "missing"]}, 0, 1]} for column in columns}
+            apply_column_expressions(collection, expressions)
+            bump_dataset_version(collection_id)
             return {"{columns}transformed to {type} successfully"}
 
         elif type == "Non-empty":
-            for column in columns:
-                collection.update_many(
-                    {column: {"$exists": False}},
-                    {"$set": {column: 0}}
-                )
-                collection.update_many(
-                    {column: {"$in": [None, ""]}},
-                    {"$set": {column: 0}}
-                )
+            expressions = {column: {"$cond": [{"$in": [{"$ifNull": ["$" + column, None]}, [None, ""]]}, 0, "$" + column]}
+                           for column in columns}
+            apply_column_expressions(collection, expressions)
+            bump_dataset_version(collection_id)
             return {"Columns transformed to {type} successfully"}
 
     
 
-script = GoExecScriptTransformColumns(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptTransformColumns)
@@ -8,18 +8,15 @@ import pandas as pd
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.MEDDataObject import MEDDataObject
-from med_libs.mongodb_utils import (connect_to_mongo, get_child_id_by_name,
+from med_libs.mongodb_utils import (connect_to_mongo, get_child_ids_by_names,
                                     get_dataset_as_pd_df,
                                     get_pickled_model_from_collection,
                                     insert_med_data_object_if_not_exists,
                                     overwrite_med_data_object_content)
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 class GoExecScriptPredict(GoExecutionScript):
     """
@@ -46,9 +43,9 @@ class GoExecScriptPredict(GoExecutionScript):
 
         # Get Model
         model_infos = json_config['entry']['model']
-        model_metadata_id = get_child_id_by_name(model_infos['id'], 'metadata.json')
-        model_metadata = dict(db[model_metadata_id].find_one({}))
-        pickle_object_id = get_child_id_by_name(model_infos['id'], "model.pkl")
+        model_children = get_child_ids_by_names(model_infos['id'], ['metadata.json', 'model.pkl'])
+        model_metadata = dict(db[model_children['metadata.json']].find_one({}))
+        pickle_object_id = model_children['model.pkl']
 
         # Check if pickle_object_id is None
         if pickle_object_id is None:
@@ -123,13 +120,12 @@ class GoExecScriptPredict(GoExecutionScript):
                     parentID = json_config["parentId"],
                     childrenIDs = [],
                     inWorkspace = False)
-        prediction_med_object_id = insert_med_data_object_if_not_exists(prediction_object, dataset.to_dict(orient="records"))
+        prediction_med_object_id = insert_med_data_object_if_not_exists(prediction_object, dataset)
         # If the prediction already exists we update the content
         if prediction_med_object_id != prediction_object.id:
-            overwrite_med_data_object_content(prediction_med_object_id, dataset.to_dict(orient="records"))
+            overwrite_med_data_object_content(prediction_med_object_id, dataset)
         self.results = {"collection_id": prediction_med_object_id}
         return self.results
 
 
-script = GoExecScriptPredict(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptPredict)
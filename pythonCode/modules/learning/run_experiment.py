@@ -1,23 +1,19 @@
 import os
-import threading
-import time
 import sys
-import pymongo
 
 from pathlib import Path
 
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 from med_libs.server_utils import go_print
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.MEDml.MEDexperiment_learning import MEDexperimentLearning
+from med_libs.mongodb_utils import connect_to_mongo
+from med_libs.profiling import PHASE_COMPUTE, PHASE_MONGO_READ, profile_phase
 
 USE_RAM_FOR_EXPERIMENTS_STORING = 1
 USE_SAVE_FOR_EXPERIMENTS_STORING = 0
 
-json_params_dict, id_ = parse_arguments()
-go_print("running run_experiment.py:" + id_)
-
 
 class GoExecScriptRunExperiment(GoExecutionScript):
     """
@@ -37,9 +33,8 @@ class GoExecScriptRunExperiment(GoExecutionScript):
         self._progress["type"] = "process"
         self._progress_update_frequency_HZ = 1.0
         if isProgressInThread:
-            self.progress_thread = threading.Thread(target=self._update_progress_periodically, args=())
-            self.progress_thread.daemon = True
-            self.progress_thread.start()
+            # The experiment progress is polled by the progress bus thread
+            self._progress_bus.add_source(self.update_progress, interval=1.0 / self._progress_update_frequency_HZ)
 
     def _custom_process(self, json_config: dict) -> dict:
         """
@@ -47,18 +42,19 @@ class GoExecScriptRunExperiment(GoExecutionScript):
         """
 
         # MongoDB setup
-        mongo_client = pymongo.MongoClient("mongodb://localhost:54017/")
-        database = mongo_client[json_config["DBName"]]
+        database = connect_to_mongo(json_config["DBName"])
         collection = database[json_config["id"]]
-        flow = list(collection.find({}, {'_id': False}))[0]
+        with profile_phase(PHASE_MONGO_READ):
+            flow = list(collection.find({}, {'_id': False}))[0]
         flow['finalize'] = json_config.get("saveAndFinalize", False)
         flow['modelToFinalize'] = json_config.get("modelToFinalize", None)
         flow['modelName'] = json_config.get("modelName", None)
         flow['workspacePath'] = json_config.get('workspacePath', None)
         flow['sceneName'] = json_config.get('sceneName', None)
-        self.current_experiment = MEDexperimentLearning(flow)
-        self.current_experiment.start()
-        results_pipeline = self.current_experiment.get_results()
+        with profile_phase(PHASE_COMPUTE):
+            self.current_experiment = MEDexperimentLearning(flow)
+            self.current_experiment.start()
+            results_pipeline = self.current_experiment.get_results()
         if self.storing_mode == USE_SAVE_FOR_EXPERIMENTS_STORING:
             self.current_experiment.set_progress(label='Saving the experiment')
         return results_pipeline
@@ -66,7 +62,7 @@ class GoExecScriptRunExperiment(GoExecutionScript):
     def update_progress(self):
         """
         This function is used to update the progress of the pipeline execution.
-        It is called periodically by the thread self.progress_thread
+        It is polled periodically by the progress bus
         """
         if self.current_experiment is not None:
             progress = self.current_experiment.get_progress()
@@ -74,12 +70,6 @@ class GoExecScriptRunExperiment(GoExecutionScript):
         else:
             self.set_progress(now=0, label="")
 
-    def _update_progress_periodically(self):
-        while True:
-            self.update_progress()
-            self.push_progress()
-            time.sleep(1.0 / self._progress_update_frequency_HZ)
-
 def save_experiment(experiment: MEDexperimentLearning):
     """
     triggered by the button save in the dashboard, it saves the pipeline execution
@@ -134,5 +124,4 @@ def is_experiment_exist(id_):
     # return os.path.exists(os.path.join(local_path, 'MEDexperiment_' + id_ + '.medexp'))
     pass
 
-run_experiment = GoExecScriptRunExperiment(json_params_dict, id_, True)
-run_experiment.start()
+run_script(GoExecScriptRunExperiment, isProgressInThread=True)
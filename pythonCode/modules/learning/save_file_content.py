@@ -6,12 +6,9 @@ from pathlib import Path
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.server_utils import go_print
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 
 class GoExecScriptMerge(GoExecutionScript):
@@ -54,5 +51,4 @@ class GoExecScriptMerge(GoExecutionScript):
         except Exception as e:
             return {"error": str(e)}
     
-script = GoExecScriptMerge(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptMerge)
@@ -6,10 +6,7 @@ import time
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 from med_libs.server_utils import go_print
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-
-json_params_dict, id_ = parse_arguments()
-go_print("running hello_world_med3pa.py:" + id_)
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 
 
 class GoExecScriptHelloWorldFromMED3pa(GoExecutionScript):
@@ -43,5 +40,4 @@ class GoExecScriptHelloWorldFromMED3pa(GoExecutionScript):
         return self.results
 
 
-helloWorldTest = GoExecScriptHelloWorldFromMED3pa(json_params_dict, id_)
-helloWorldTest.start()
+run_script(GoExecScriptHelloWorldFromMED3pa)
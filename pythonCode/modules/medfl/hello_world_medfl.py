@@ -6,10 +6,7 @@ import time
 sys.path.append(
     str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 from med_libs.server_utils import go_print
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
-
-json_params_dict, id_ = parse_arguments()
-go_print("running hello_world_medfl.py:" + id_)
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 
 
 class GoExecScriptHelloWorldFromMEDfl(GoExecutionScript):
@@ -43,5 +40,4 @@ class GoExecScriptHelloWorldFromMEDfl(GoExecutionScript):
         return self.results
 
 
-helloWorldTest = GoExecScriptHelloWorldFromMEDfl(json_params_dict, id_)
-helloWorldTest.start()
+run_script(GoExecScriptHelloWorldFromMEDfl)
@@ -5,13 +5,10 @@ from pathlib import Path
 
 sys.path.append(str(Path(os.path.dirname(os.path.abspath(__file__))).parent.parent))
 
-from med_libs.GoExecutionScript import GoExecutionScript, parse_arguments
+from med_libs.GoExecutionScript import GoExecutionScript, run_script
 from med_libs.server_utils import go_print
 from modules.superset.SupersetEnvManager import SupersetEnvManager
 
-json_params_dict, id_ = parse_arguments()
-go_print("running script.py:" + id_)
-
 
 class GoExecScriptPredict(GoExecutionScript):
     """
@@ -113,5 +110,4 @@ class GoExecScriptPredict(GoExecutionScript):
 
         return output
 
-script = GoExecScriptPredict(json_params_dict, id_)
-script.start()
+run_script(GoExecScriptPredict)
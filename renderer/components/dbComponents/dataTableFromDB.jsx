@@ -12,7 +12,7 @@ import { Message } from "primereact/message"
 import { Skeleton } from "primereact/skeleton"
 import React, { useEffect, useState } from "react"
 import { toast } from "react-toastify"
-import { connectToMongoDB, getCollectionTags, insertMEDDataObjectIfNotExists } from "../mongoDB/mongoDBUtils"
+import { bumpDatasetVersion, connectToMongoDB, getCollectionTags, insertMEDDataObjectIfNotExists } from "../mongoDB/mongoDBUtils"
 import { MEDDataObject } from "../workspace/NewMedDataObject"
 import InputToolsComponent from "./InputToolsComponent"
 import { collectionExists, getCollectionData } from "./utils"
@@ -181,6 +181,8 @@ const DataTableFromDB = ({ data, tablePropsData, tablePropsColumn, isReadOnly })
       console.log("Update result:", result)
       if (result.modifiedCount === 0) {
         console.error("No documents were updated")
+      } else {
+        await bumpDatasetVersion(collectionName)
       }
       setLoadingData(false)
     } catch (error) {
@@ -201,6 +203,7 @@ const DataTableFromDB = ({ data, tablePropsData, tablePropsColumn, isReadOnly })
       if (result.deletedCount === 0) {
         console.error("No documents were deleted")
       } else {
+        await bumpDatasetVersion(collectionName)
         setInnerData(innerData.filter((item) => item._id !== id))
       }
       setLoadingData(false)
@@ -219,6 +222,7 @@ const DataTableFromDB = ({ data, tablePropsData, tablePropsColumn, isReadOnly })
       console.log(`Inserting document: ${JSON.stringify(data)}`)
       const result = await collection.insertOne(data)
       console.log("Insert result:", result)
+      await bumpDatasetVersion(collectionName)
       setLoadingData(false)
       return result.insertedId.toString()
     } catch (error) {
@@ -310,6 +314,8 @@ const DataTableFromDB = ({ data, tablePropsData, tablePropsColumn, isReadOnly })
       console.log("Delete column result:", result)
       if (result.modifiedCount === 0) {
         console.error("No documents were updated")
+      } else {
+        await bumpDatasetVersion(data.id)
       }
     } catch (error) {
       console.error("Error deleting column:", error)
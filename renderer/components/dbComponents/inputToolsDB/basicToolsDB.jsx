@@ -4,7 +4,7 @@ import { Button } from "primereact/button"
 import { SplitButton } from "primereact/splitbutton"
 import { Message } from "primereact/message"
 import { toast } from "react-toastify"
-import { connectToMongoDB } from "../../mongoDB/mongoDBUtils"
+import { bumpDatasetVersion, connectToMongoDB } from "../../mongoDB/mongoDBUtils"
 import { DataContext } from "../../workspace/dataContext"
 
 /**
@@ -93,6 +93,7 @@ const BasicToolsDB = ({ collectionSize, currentCollection }) => {
         const newInnerData = innerData.map((row) => ({ ...row, [newColumn.field]: "" }))
         setInnerData(newInnerData)
         await collection.updateMany({}, { $set: { [newColumnName]: "" } })
+        await bumpDatasetVersion(currentCollection)
         toast.success("Column " + newColumnName + " added successfully")
         setNewColumnName("")
         setLoading(false)
@@ -124,6 +125,7 @@ const BasicToolsDB = ({ collectionSize, currentCollection }) => {
       const db = await connectToMongoDB()
       const collection = db.collection(currentCollection)
       await collection.insertMany(newRows)
+      await bumpDatasetVersion(currentCollection)
       setInnerData([...innerData, ...newRows])
       toast.success(numRows + " rows added successfully")
       setNumRows("")
@@ -4,7 +4,7 @@ import { DataTable } from "primereact/datatable"
 import { Column } from "primereact/column"
 import { Button } from "primereact/button"
 import { toast } from "react-toastify"
-import { connectToMongoDB } from "../../mongoDB/mongoDBUtils"
+import { bumpDatasetVersion, connectToMongoDB } from "../../mongoDB/mongoDBUtils"
 import { DataContext } from "../../workspace/dataContext"
 import { Card } from "primereact/card"
 import { Skeleton } from "primereact/skeleton"
@@ -112,6 +112,7 @@ const DropDuplicatesToolsDB = ({ currentCollection }) => {
       const collection = db.collection(globalData[currentCollection].id)
 
       await collection.updateMany({}, { $unset: { [selectedColumn]: "" } })
+      await bumpDatasetVersion(globalData[currentCollection].id)
 
       toast.success(`Column "${selectedColumn}" has been deleted.`)
       setSelectedColumn(null)
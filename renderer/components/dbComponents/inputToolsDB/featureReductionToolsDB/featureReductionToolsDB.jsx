@@ -3,6 +3,7 @@ import { TabPanel, TabView } from "primereact/tabview"
 import SpearmanDB from "./spearmanDB"
 import CreatePCADB from "./createPcaDB"
 import ApplyPCADB from "./ApplyPcaDB"
+import PruneCorrelatedColumnsDB from "./pruneCorrelatedColumnsDB"
 import { Message } from "primereact/message"
 import { DataContext } from "../../../workspace/dataContext"
 import { Tooltip } from 'primereact/tooltip'
@@ -58,6 +59,9 @@ const FeatureReductionToolsDB = ({ currentCollection }) => {
         <TabPanel header="Spearman">
           <SpearmanDB currentCollection={currentCollection} />
         </TabPanel>
+        <TabPanel header="Correlation Pruning">
+          <PruneCorrelatedColumnsDB currentCollection={currentCollection} />
+        </TabPanel>
       </TabView>
     </div>
   )
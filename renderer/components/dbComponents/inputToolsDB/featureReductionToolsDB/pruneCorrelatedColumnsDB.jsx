@@ -0,0 +1,193 @@
+import React, { useEffect, useState, useContext } from "react"
+import { Message } from "primereact/message"
+import { MultiSelect } from "primereact/multiselect"
+import { Dropdown } from "primereact/dropdown"
+import { Button } from "primereact/button"
+import { DataTable } from "primereact/datatable"
+import { Column } from "primereact/column"
+import { InputNumber } from "primereact/inputnumber"
+import { InputText } from "primereact/inputtext"
+import { toast } from "react-toastify"
+import { ServerConnectionContext } from "../../../serverConnection/connectionContext"
+import { requestBackend } from "../../../../utilities/requests"
+import { DataContext } from "../../../workspace/dataContext"
+import { randomUUID } from "crypto"
+import { MEDDataObject } from "../../../workspace/NewMedDataObject"
+import { insertMEDDataObjectIfNotExists, getCollectionColumns } from "../../../mongoDB/mongoDBUtils"
+
+/**
+ * Component that renders the tool pruning the columns highly correlated with another column
+ */
+const PruneCorrelatedColumnsDB = ({ currentCollection }) => {
+  const [columns, setColumns] = useState([])
+  const [selectedColumns, setSelectedColumns] = useState([])
+  const [selectedTarget, setSelectedTarget] = useState(null)
+  const [threshold, setThreshold] = useState(0.9)
+  const [method, setMethod] = useState("pearson")
+  const [prunedColumns, setPrunedColumns] = useState([])
+  const [newCollectionName, setNewCollectionName] = useState("")
+  const { port } = useContext(ServerConnectionContext)
+  const { globalData } = useContext(DataContext)
+  const [loading, setLoading] = useState(false)
+  const prunedColumnsColumns = [
+    { field: "column", header: "Pruned column" },
+    { field: "keep", header: "Kept column" },
+    { field: "correlation", header: "Correlation" }
+  ]
+
+  // Fetch the columns of the current collection without fetching the whole dataset
+  useEffect(() => {
+    const fetchData = async () => {
+      const columns = await getCollectionColumns(currentCollection)
+      if (columns && columns.length > 0) {
+        setColumns(columns)
+      }
+    }
+    fetchData()
+  }, [currentCollection])
+
+  // Call the server to prune the correlated columns
+  const pruneColumns = async (overwrite) => {
+    const id = randomUUID()
+
+    const object = new MEDDataObject({
+      id: id,
+      name: newCollectionName + "_pruned" + ".csv",
+      type: "csv",
+      parentID: globalData[currentCollection].parentID,
+      childrenIDs: [],
+      inWorkspace: false
+    })
+
+    // Check if object already exists
+    if (!overwrite) {
+      if (!newCollectionName) {
+        toast.error("Please enter a name for the new collection")
+        return
+      }
+      for (const item of Object.keys(globalData)) {
+        if (globalData[item].name && globalData[item].name === object.name) {
+          toast.error(`A subset with the name ${object.name} already exists.`)
+          return
+        }
+      }
+    }
+
+    let jsonToSend = {}
+    jsonToSend = {
+      collectionName: currentCollection,
+      columns: selectedColumns.length > 0 ? selectedColumns : null,
+      target: selectedTarget,
+      threshold: threshold,
+      method: method,
+      overwrite: overwrite,
+      newCollectionName: overwrite ? null : id
+    }
+
+    // Send the request to the backend
+    setLoading(true)
+    requestBackend(
+      port,
+      "/input/prune_correlated_columns_DB/",
+      jsonToSend,
+      async (jsonResponse) => {
+        setLoading(false)
+        console.log("received results:", jsonResponse)
+        if (jsonResponse.error) {
+          if (jsonResponse.error.message) {
+            console.error(jsonResponse.error.message)
+            toast.error(jsonResponse.error.message)
+          } else {
+            console.error(jsonResponse.error)
+            toast.error(jsonResponse.error)
+          }
+        } else {
+          setPrunedColumns(jsonResponse["pruned"])
+          if (!overwrite) {
+            await insertMEDDataObjectIfNotExists(object)
+          }
+          MEDDataObject.updateWorkspaceDataObject()
+          toast.success(`${jsonResponse["pruned"].length} correlated columns pruned`)
+        }
+      },
+      (error) => {
+        setLoading(false)
+        console.log(error)
+        toast.error("Error pruning the correlated columns" + error)
+      }
+    )
+  }
+
+  return (
+    <>
+      <div className="margin-top-15 center">
+        <div className="margin-top-15 center">
+          <Message text="The correlation pruning tool removes the columns correlated above a threshold with another column. Among correlated columns, the one most correlated with the target is kept." />
+        </div>
+        <hr></hr>
+        <b>Select the columns that can be pruned (all the numeric columns if none)</b>
+        <div className="margin-top-15">
+          <MultiSelect
+            value={selectedColumns}
+            options={columns.filter((col) => col !== "_id" && col !== selectedTarget)}
+            onChange={(e) => setSelectedColumns(e.value)}
+            placeholder="Select columns"
+            style={{ marginTop: "10px", maxWidth: "900px" }}
+            display="chip"
+            filter
+          />
+        </div>
+        <hr></hr>
+        <div className="margin-top-15">
+          <b>Select the target column (optional)</b>
+          <div className="margin-top-15">
+            <Dropdown value={selectedTarget} options={columns.filter((col) => col !== "_id")} onChange={(event) => setSelectedTarget(event.value)} placeholder="Select column" showClear />
+          </div>
+        </div>
+        <hr></hr>
+        <div className="margin-top-15 flex-container-wrap">
+          <div>
+            Correlation threshold &nbsp;
+            <InputNumber value={threshold} onValueChange={(e) => setThreshold(e.value)} mode="decimal" minFractionDigits={2} maxFractionDigits={2} step={0.05} min={0.05} max={1} showButtons size={6} />
+          </div>
+          <div>
+            Method &nbsp;
+            <Dropdown value={method} options={["pearson", "spearman"]} onChange={(event) => setMethod(event.value)} />
+          </div>
+        </div>
+        <hr></hr>
+        <div style={{ display: "flex", justifyContent: "center", alignItems: "center", marginTop: "1rem" }}>
+          <Button
+            className="p-button-danger"
+            label="Overwrite"
+            style={{ margin: "5px", fontSize: "1rem", padding: "6px 10px" }}
+            onClick={() => pruneColumns(true)}
+            tooltip="Remove the pruned columns from the current collection"
+            tooltipOptions={{ position: "top" }}
+            loading={loading}
+          />
+          <InputText value={newCollectionName} onChange={(e) => setNewCollectionName(e.target.value)} placeholder="New name" style={{ margin: "5px", fontSize: "1rem", width: "205px" }} />
+          <Button
+            icon="pi pi-plus"
+            style={{ margin: "5px", fontSize: "1rem", padding: "6px 10px", width: "100px", marginTop: "0.25rem" }}
+            onClick={() => pruneColumns(false)}
+            tooltip="Create a new collection without the pruned columns"
+            tooltipOptions={{ position: "top" }}
+            loading={loading}
+          />
+        </div>
+        {prunedColumns.length > 0 && (
+          <div className="margin-top-15 maxwidth-80 mx-auto">
+            <DataTable value={prunedColumns} size={"small"} paginator rows={6}>
+              {prunedColumnsColumns.map((col) => (
+                <Column key={col.field} field={col.field} header={col.header} />
+              ))}
+            </DataTable>
+          </div>
+        )}
+      </div>
+    </>
+  )
+}
+
+export default PruneCorrelatedColumnsDB
@@ -42,7 +42,7 @@ const SimpleCleaningToolsDB = ({ currentCollection }) => {
   const [loadingDB, setLoadingDB] = useState(false)
   const op = useRef(null)
   const [cleaningOption, setCleaningOption] = useState("drop")
-  const cleaningOptions = ["drop", "random fill", "mean fill", "median fill", "mode fill", "bfill", "ffill"]
+  const cleaningOptions = ["drop", "random fill", "mean fill", "median fill", "mode fill", "bfill", "ffill", "knn fill", "iterative fill"]
   const [startWith, setStartWith] = useState("Columns")
   const { port } = useContext(ServerConnectionContext)
   const { globalData } = useContext(DataContext)
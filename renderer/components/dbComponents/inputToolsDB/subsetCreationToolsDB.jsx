@@ -13,7 +13,7 @@ import React, { useContext, useEffect, useState } from "react"
 import { Row } from "react-bootstrap"
 import { toast } from "react-toastify"
 import { requestBackend } from "../../../utilities/requests"
-import { connectToMongoDB, insertMEDDataObjectIfNotExists } from "../../mongoDB/mongoDBUtils"
+import { bumpDatasetVersion, connectToMongoDB, insertMEDDataObjectIfNotExists } from "../../mongoDB/mongoDBUtils"
 import { ServerConnectionContext } from "../../serverConnection/connectionContext"
 import { MEDDataObject } from "../../workspace/NewMedDataObject"
 import { DataContext } from "../../workspace/dataContext"
@@ -294,6 +294,7 @@ const SubsetCreationToolsDB = ({ currentCollection }) => {
     for (let i = 0; i < data.length; i += 1000) {
       await collection.insertMany(data.slice(i, i + 1000))
     }
+    await bumpDatasetVersion(collection.collectionName)
   }
 
   // Create group with selected rows
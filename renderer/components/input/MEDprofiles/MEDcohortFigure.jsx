@@ -19,7 +19,7 @@ import { XSquare } from "react-bootstrap-icons"
 import { toast } from "react-toastify"
 import { createFolderFromPath } from "../../../utilities/fileManagementUtils"
 import { deepCopy } from "../../../utilities/staticFunctions"
-import { connectToMongoDB, insertMEDDataObjectIfNotExists } from "../../mongoDB/mongoDBUtils"
+import { bumpDatasetVersion, connectToMongoDB, insertMEDDataObjectIfNotExists } from "../../mongoDB/mongoDBUtils"
 import { MEDDataObject } from "../../workspace/NewMedDataObject"
 import { getPathSeparator } from "../../../utilities/fileManagementUtils"
 
@@ -1123,6 +1123,7 @@ class MEDcohortFigureClass extends React.Component {
 
         // Save the new data to the CSV file inside the MongoDB database
         await collection.insertMany(jsonData)
+        await bumpDatasetVersion(existingObjectByAttributes.id)
         MEDDataObject.updateWorkspaceDataObject()
         toast.success(`Time point ${timePoint} exported to the database`)
       }
@@ -1131,6 +1132,7 @@ class MEDcohortFigureClass extends React.Component {
       await db.createCollection(object.id)
       collection = db.collection(object.id)
       await collection.insertMany(jsonData)
+      await bumpDatasetVersion(object.id)
 
       // Insert the object into the database and update workspace
       await insertMEDDataObjectIfNotExists(object)
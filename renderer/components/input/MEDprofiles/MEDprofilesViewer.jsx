@@ -4,7 +4,7 @@ import React, { useContext, useEffect, useState } from "react"
 import { toast } from "react-toastify"
 import { requestBackend } from "../../../utilities/requests"
 import ModulePage from "../../mainPages/moduleBasics/modulePage"
-import { connectToMongoDB, insertMEDDataObjectIfNotExists } from "../../mongoDB/mongoDBUtils"
+import { bumpDatasetVersion, connectToMongoDB, insertMEDDataObjectIfNotExists } from "../../mongoDB/mongoDBUtils"
 import { MEDDataObject } from "../../workspace/NewMedDataObject"
 import { WorkspaceContext } from "../../workspace/workspaceContext"
 import MEDcohortFigure from "./MEDcohortFigure"
@@ -54,6 +54,7 @@ const MEDprofilesViewer = ({ pageId, MEDclassesFolder, MEDprofilesBinaryFile })
       // In case the object already in the DB delete its content
       collection = db.collection(object.id)
       await collection.deleteMany({})
+      await bumpDatasetVersion(object.id)
     }
 
     requestBackend(
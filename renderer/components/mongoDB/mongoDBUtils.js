@@ -28,6 +28,16 @@ export async function connectToMongoDB() {
   return client.db(dbName)
 }
 
+/**
+ * @description Increment the version of a dataset collection, must be called after writing to the collection
+ * so that the python scripts don't use the snapshots and statistics cached for its previous content
+ * @param {String} collectionName name of the collection written
+ */
+export async function bumpDatasetVersion(collectionName) {
+  const db = await connectToMongoDB()
+  await db.collection("datasetVersions").updateOne({ _id: collectionName }, { $inc: { version: 1 } }, { upsert: true })
+}
+
 /**
  * @description Update the name of a MEDDataObject specified by id in the DB
  * @param {String} id Id of the MEDDataObject to update
@@ -149,10 +159,12 @@ export async function insertMEDDataObjectIfNotExists(medData, path = null, jsonD
     const dataCollection = db.collection(medData.id)
     const result = await dataCollection.insertMany(jsonData)
     console.log(`Data inserted with ${result.insertedCount} documents`)
+    await bumpDatasetVersion(medData.id)
   } else if (path) {
     switch (medData.type) {
       case "csv":
         await insertCSVIntoCollection(path, medData.id)
+        await bumpDatasetVersion(medData.id)
         break
       case "html":
         await insertHTMLIntoCollection(path, medData.id)
@@ -178,6 +190,7 @@ export async function insertMEDDataObjectIfNotExists(medData, path = null, jsonD
     if (documentsToCopy.length > 0) {
       const result = await targetCollection.insertMany(documentsToCopy)
       console.log(`Copied ${result.insertedCount} documents from collection ${copyId} to ${medData.id}`)
+      await bumpDatasetVersion(medData.id)
     } else {
       console.log(`No documents found in collection ${copyId} to copy`)
     }
@@ -249,6 +262,7 @@ async function insertBigCSVIntoCollection(filePath, collectionName) {
     if (batch.length >= batchSize) {
       parser.pause();
       collection.insertMany(batch)
+        .then(() => bumpDatasetVersion(collectionName))
         .then(() => { batch = []; parser.resume(); })
         .catch((error) => { console.error("Error inserting batch:", error); parser.abort(); });
     }
@@ -258,6 +272,7 @@ async function insertBigCSVIntoCollection(filePath, collectionName) {
       if (batch.length > 0) {
         collection
           .insertMany(batch)
+          .then(() => bumpDatasetVersion(collectionName))
           .then(() => {
             console.log("Final batch inserted")
             console.log("CSV parsing complete")
@@ -397,6 +412,7 @@ export async function overwriteMEDDataObjectContent(id, jsonData) {
     if (cleaned.length) {
       await collection.insertMany(cleaned);
     }
+    await bumpDatasetVersion(id);
     return true;
   } catch (error) {
     console.error("Error in overwriteMEDDataObjectContent", error);
@@ -436,6 +452,7 @@ export async function deleteMEDDataObject(id) {
     const collections = await db.listCollections({ name: objectId }).toArray()
     if (collections.length > 0) {
       await dataCollection.drop()
+      await bumpDatasetVersion(objectId)
       console.log(`Collection with id ${objectId} deleted`)
     }
   }